@@ -1,19 +1,27 @@
 from fastapi import APIRouter
 
+from app.api.routes.artefacts import router as artefacts_router
 from app.api.routes.assessment import router as assessment_router
+from app.api.routes.audit import router as audit_router
 from app.api.routes.board_brief import router as board_brief_router
+from app.api.routes.governance_pack import router as governance_pack_router
 from app.api.routes.guardrail import router as guardrail_router
 from app.api.routes.health import router as health_router
 from app.api.routes.meta import router as meta_router
 from app.api.routes.policy import router as policy_router
+from app.api.routes.risk_portfolio import router as risk_portfolio_router
 from app.api.routes.risk_register import router as risk_register_router
 
 api_router = APIRouter()
 api_router.include_router(health_router)
 api_router.include_router(meta_router)
+api_router.include_router(audit_router)
 api_router.include_router(guardrail_router)
 
 api_router.include_router(assessment_router)
 api_router.include_router(policy_router)
 api_router.include_router(risk_register_router)
+api_router.include_router(risk_portfolio_router)
 api_router.include_router(board_brief_router)
+api_router.include_router(governance_pack_router)
+api_router.include_router(artefacts_router)
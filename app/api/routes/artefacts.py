@@ -0,0 +1,82 @@
+from collections.abc import Iterator
+from datetime import datetime
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+
+from app.core.config import settings
+from app.core.deps import get_org_id, require_admin_key
+from app.models.artefact import Artefact, ArtefactKind, ArtefactPage, ArtefactSummary
+from app.services.artefact_store import ArtefactRecord, ArtefactStore, artefact_store
+from app.services.audit_index import SortOrder
+
+router = APIRouter(tags=["artefacts"], dependencies=[Depends(require_admin_key)])
+
+
+def _store() -> ArtefactStore:
+    if artefact_store is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Artefact store not enabled",
+        )
+    return artefact_store
+
+
+@router.get("/artefacts", response_model=ArtefactPage, response_model_exclude_none=True)
+def list_artefacts(
+    request: Request,
+    kind: ArtefactKind | None = None,
+    limit: Annotated[int, Query(ge=1)] = 100,
+    cursor: str | None = None,
+    order: SortOrder = "desc",
+) -> ArtefactPage:
+    """
+    The organisation's (X-Org-Id) stored deliverables, newest first by default, one page
+    at a time. Artefacts are listed once the store has committed them.
+    """
+    try:
+        records, next_cursor = _store().query(
+            get_org_id(request),
+            min(limit, settings.artefact_list_max_limit),
+            cursor,
+            kind,
+            order,
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from None
+    return ArtefactPage(
+        artefacts=[
+            ArtefactSummary(
+                id=r.id, kind=r.kind, title=r.title, created_at=datetime.fromisoformat(r.created_at)
+            )
+            for r in records
+        ],
+        next_cursor=next_cursor,
+    )
+
+
+def _ndjson_lines(records: Iterator[ArtefactRecord]) -> Iterator[bytes]:
+    for record in records:
+        yield record.envelope() + b"\n"
+
+
+@router.get("/artefacts/export")
+def export_artefacts(
+    request: Request, kind: ArtefactKind | None = None, order: SortOrder = "asc"
+) -> StreamingResponse:
+    """Every stored deliverable of the organisation as NDJSON (oldest first by default)."""
+    records = _store().export(get_org_id(request), kind, order)
+    return StreamingResponse(_ndjson_lines(records), media_type="application/x-ndjson")
+
+
+@router.get("/artefacts/{artefact_id}", response_model=Artefact)
+def get_artefact(artefact_id: str, request: Request) -> Response:
+    """
+    A stored deliverable by the id its response carried in X-Artefact-Id, exactly as it
+    was sent. Only the organisation that generated it can retrieve it.
+    """
+    record = _store().get(artefact_id, get_org_id(request))
+    if record is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Artefact not found")
+    return Response(content=record.envelope(), media_type="application/json")
@@ -1,18 +1,28 @@
-from fastapi import APIRouter, HTTPException, Request, status
+from tempfile import SpooledTemporaryFile
+from typing import Annotated, Any
+
+from fastapi import APIRouter, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 
 # Reuse your guardrail endpoint logic by importing the regex-based checker
 # (We’ll refactor into a shared service later; for MVP this is fine.)
-from app.api.routes.guardrail import guardrail_check
+from app.api.routes.guardrail import _SPOOL_MEMORY_BYTES, _read_spool, guardrail_check
+from app.core.deps import get_org_id
 from app.models.assessment import AssessmentRequest, AssessmentResponse
 from app.models.guardrail import GuardrailCheckRequest
+from app.services.artefact_store import save_artefact
 from app.services.assessment import run_maturity_assessment
 from app.services.audit import write_audit_event
+from app.services.bulk_assessment import BulkFormat, assess_file
+from app.services.guardrail_rules import guardrail_rules
+from app.services.response_cache import response_cache
 
 router = APIRouter(tags=["assessment"])
 
 
 @router.post("/assess", response_model=AssessmentResponse)
-def assess(payload: AssessmentRequest, request: Request) -> AssessmentResponse:
+def assess(payload: AssessmentRequest, request: Request) -> Response:
     # 1) SAFE: guardrail scan free-text fields before doing anything else
     combined_text = "\n".join(
         [
@@ -25,7 +35,7 @@ def assess(payload: AssessmentRequest, request: Request) -> AssessmentResponse:
     ).strip()
 
     guardrail_result = guardrail_check(
-        GuardrailCheckRequest(text=combined_text, context="assessment"),
+        GuardrailCheckRequest(text=combined_text, context="assessment", mode="preview"),
         request,
     )
 
@@ -50,12 +60,27 @@ def assess(payload: AssessmentRequest, request: Request) -> AssessmentResponse:
                 "message": "Input blocked by SAFE guardrails. Remove sensitive identifiers and retry.",
                 "risk_score": guardrail_result.risk_score,
                 "findings": [f.model_dump() for f in guardrail_result.findings],
-                "redacted_preview": guardrail_result.redacted_text[:500],
+                "redacted_preview": guardrail_result.redacted_text,
             },
         )
 
-    # 2) Deterministic assessment logic (no AI call yet)
-    result = run_maturity_assessment(payload)
+    # 2) Deterministic assessment logic (no AI call yet), served from the response cache
+    #    when the same request was answered before
+    def generate() -> tuple[AssessmentResponse, dict[str, Any]]:
+        result = run_maturity_assessment(payload)
+        return result, {
+            "maturity_score": result.maturity_score,
+            "maturity_level": result.maturity_level,
+            "gaps_count": len(result.top_gaps),
+        }
+
+    cached, hit = response_cache.fetch(str(request.url.path), payload, generate)
+    artefact_id = save_artefact(
+        get_org_id(request),
+        "assessment",
+        f"Maturity Assessment — {payload.profile.org_name} — {payload.use_case.name}",
+        cached.body,
+    )
 
     # 3) Audit allowed request
     write_audit_event(
@@ -64,11 +89,47 @@ def assess(payload: AssessmentRequest, request: Request) -> AssessmentResponse:
         method=request.method,
         client_ip=request.client.host if request.client else None,
         outcome="allow",
-        details={
-            "maturity_score": result.maturity_score,
-            "maturity_level": result.maturity_level,
-            "gaps_count": len(result.top_gaps),
-        },
+        details=cached.audit_details(hit, artefact_id),
+    )
+
+    return cached.response(request, artefact_id)
+
+
+@router.post("/assess/bulk", response_class=StreamingResponse)
+async def assess_bulk(
+    request: Request,
+    input_format: Annotated[
+        BulkFormat | None, Query(alias="format", description="default: detected")
+    ] = None,
+) -> StreamingResponse:
+    """
+    Maturity assessment of a portfolio of use cases in one call. The body is a CSV
+    (with a header) or JSONL of /assess requests; the response is NDJSON, one record
+    per row in input order, then a summary (see app.services.bulk_assessment).
+
+    Rows are guardrail-scanned in batches; blocked and invalid rows are reported, not
+    assessed. Scoring is vectorised over each chunk of rows. Results are spooled and
+    the upload's single audit event written before the response starts.
+    """
+    org_id = get_org_id(request)
+    scanner = guardrail_rules.get(org_id)
+    upload = SpooledTemporaryFile(max_size=_SPOOL_MEMORY_BYTES)
+    output = SpooledTemporaryFile(max_size=_SPOOL_MEMORY_BYTES)
+    with upload:
+        async for chunk in request.stream():
+            upload.write(chunk)
+        upload.seek(0)
+        summary = await run_in_threadpool(assess_file, upload, output, scanner, input_format)
+
+    # Counts only (SAFE: no raw text stored)
+    await run_in_threadpool(
+        write_audit_event,
+        "assessment_bulk_completed",
+        path=str(request.url.path),
+        method=request.method,
+        client_ip=request.client.host if request.client else None,
+        outcome="block" if summary["blocked_count"] else "allow",
+        details={"org_id": org_id, "ruleset_version": scanner.version, **summary},
     )
 
-    return result
+    return StreamingResponse(_read_spool(output), media_type="application/x-ndjson")
@@ -0,0 +1,123 @@
+import json
+from collections.abc import Iterator
+from datetime import datetime
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+
+from app.core.config import settings
+from app.core.deps import require_admin_key
+from app.models.audit import AuditEventPage, AuditRollupReport
+from app.services.audit import all_audit_streams, get_audit_log
+from app.services.audit_index import AuditIndex, AuditQuery, SortOrder, scan
+from app.services.audit_rollups import RollupDimension, RollupQuery
+from app.services.audit_streams import read_merged
+
+router = APIRouter(tags=["audit"], dependencies=[Depends(require_admin_key)])
+
+
+def _index() -> AuditIndex:
+    index = get_audit_log().index
+    if index is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Audit index not enabled",
+        )
+    return index
+
+
+def audit_query(
+    since: Annotated[
+        datetime | None, Query(description="Events at or after (UTC if naive)")
+    ] = None,
+    until: Annotated[datetime | None, Query(description="Events before (UTC if naive)")] = None,
+    event_type: str | None = None,
+    outcome: str | None = None,
+    path: Annotated[str | None, Query(description="http.path of the audited request")] = None,
+    finding_type: Annotated[str | None, Query(description="e.g. email, prompt_injection")] = None,
+) -> AuditQuery:
+    return AuditQuery(since, until, event_type, outcome, path, finding_type)
+
+
+@router.get("/audit/events", response_model=AuditEventPage, response_model_exclude_none=True)
+def audit_events(
+    query: Annotated[AuditQuery, Depends(audit_query)],
+    limit: Annotated[int, Query(ge=1)] = 100,
+    cursor: str | None = None,
+    order: SortOrder = "desc",
+) -> AuditEventPage:
+    """
+    Audit events matching the filters, newest first by default, one page at a time.
+    Events become visible once the audit writer has committed them.
+    """
+    index = _index()
+    try:
+        lines, next_cursor = index.query(
+            query, min(limit, settings.audit_query_max_limit), cursor, order
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from None
+    return AuditEventPage(events=[json.loads(line) for line in lines], next_cursor=next_cursor)
+
+
+def _ndjson_lines(lines: Iterator[str]) -> Iterator[str]:
+    for line in lines:
+        yield line + "\n"
+
+
+@router.get("/audit/events/export")
+def audit_events_export(
+    query: Annotated[AuditQuery, Depends(audit_query)], order: SortOrder = "asc"
+) -> StreamingResponse:
+    """
+    Every matching audit event as NDJSON (oldest first by default), streamed. Without
+    the index, every worker's segments are read and merged in time order instead
+    (oldest first only).
+    """
+    index = get_audit_log().index
+    if index is not None:
+        lines = index.export(query, order)
+    elif order == "asc":
+        lines = scan(query, read_merged(all_audit_streams(), query.since, query.until))
+    else:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Audit index not enabled",
+        )
+    return StreamingResponse(_ndjson_lines(lines), media_type="application/x-ndjson")
+
+
+@router.get("/audit/rollups", response_model=AuditRollupReport)
+def audit_rollup_report(
+    query: Annotated[AuditQuery, Depends(audit_query)],
+    context: Annotated[str | None, Query(description="details.context of the event")] = None,
+    group_by: Annotated[list[RollupDimension] | None, Query(description="default: hour")] = None,
+) -> AuditRollupReport:
+    """
+    Audit event counts per hour (and any other `group_by` dimensions), read from
+    in-memory counters rather than the log. Time bounds have hour resolution. With
+    `finding_type` as a filter or dimension, rows count the events naming each type.
+    Other server workers' counts are as of their last checkpoint.
+    """
+    rollups = get_audit_log().rollups
+    if rollups is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Audit rollups not enabled",
+        )
+    group_by = list(dict.fromkeys(group_by or ["hour"]))
+    rollup_query = RollupQuery(
+        query.since,
+        query.until,
+        query.event_type,
+        query.outcome,
+        query.path,
+        context,
+        query.finding_type,
+    )
+    return AuditRollupReport(
+        group_by=group_by,
+        finding_counts=query.finding_type is not None or "finding_type" in group_by,
+        rows=rollups.report(rollup_query, group_by),
+    )
@@ -1,16 +1,21 @@
-from fastapi import APIRouter, HTTPException, Request, status
+from typing import Any
+
+from fastapi import APIRouter, HTTPException, Request, Response, status
 
 from app.api.routes.guardrail import guardrail_check
+from app.core.deps import get_org_id
 from app.models.board_brief import BoardBriefRequest, BoardBriefResponse
 from app.models.guardrail import GuardrailCheckRequest
+from app.services.artefact_store import save_artefact
 from app.services.audit import write_audit_event
 from app.services.board_brief import generate_board_brief
+from app.services.response_cache import response_cache
 
 router = APIRouter(tags=["board-brief"])
 
 
 @router.post("/board-brief", response_model=BoardBriefResponse)
-def board_brief(payload: BoardBriefRequest, request: Request) -> BoardBriefResponse:
+def board_brief(payload: BoardBriefRequest, request: Request) -> Response:
     combined_text = "\n".join(
         [
             payload.profile.org_name,
@@ -22,7 +27,7 @@ def board_brief(payload: BoardBriefRequest, request: Request) -> BoardBriefRespo
     ).strip()
 
     guardrail_result = guardrail_check(
-        GuardrailCheckRequest(text=combined_text, context="board-brief"),
+        GuardrailCheckRequest(text=combined_text, context="board-brief", mode="preview"),
         request,
     )
 
@@ -45,11 +50,22 @@ def board_brief(payload: BoardBriefRequest, request: Request) -> BoardBriefRespo
                 "message": "Input blocked by SAFE guardrails. Remove identifiers and retry.",
                 "risk_score": guardrail_result.risk_score,
                 "findings": [f.model_dump() for f in guardrail_result.findings],
-                "redacted_preview": guardrail_result.redacted_text[:500],
+                "redacted_preview": guardrail_result.redacted_text,
             },
         )
 
-    result = generate_board_brief(payload)
+    def generate() -> tuple[BoardBriefResponse, dict[str, Any]]:
+        result = generate_board_brief(payload)
+        return result, {
+            "brief_title": result.brief_title,
+            "key_risks_count": len(result.key_risks),
+            "decision_asks_count": len(result.decision_asks),
+        }
+
+    cached, hit = response_cache.fetch(str(request.url.path), payload, generate)
+    artefact_id = save_artefact(
+        get_org_id(request), "board_brief", cached.details["brief_title"], cached.body
+    )
 
     write_audit_event(
         "board_brief_created",
@@ -57,11 +73,7 @@ def board_brief(payload: BoardBriefRequest, request: Request) -> BoardBriefRespo
         method=request.method,
         client_ip=request.client.host if request.client else None,
         outcome="allow",
-        details={
-            "brief_title": result.brief_title,
-            "key_risks_count": len(result.key_risks),
-            "decision_asks_count": len(result.decision_asks),
-        },
+        details=cached.audit_details(hit, artefact_id),
     )
 
-    return result
+    return cached.response(request, artefact_id)
@@ -0,0 +1,97 @@
+from typing import Any
+
+from fastapi import APIRouter, HTTPException, Request, Response, status
+
+from app.api.routes.guardrail import scan_request_text
+from app.core.deps import get_org_id
+from app.models.governance_pack import GovernancePackRequest, GovernancePackResponse
+from app.services.artefact_store import save_artefact
+from app.services.audit import write_audit_event
+from app.services.governance_pack import build_governance_pack
+from app.services.response_cache import response_cache
+
+router = APIRouter(tags=["governance-pack"])
+
+
+@router.post("/governance-pack", response_model=GovernancePackResponse)
+def governance_pack(payload: GovernancePackRequest, request: Request) -> Response:
+    """
+    Assessment, policy, risk register and board brief in one call: one guardrail scan,
+    one audit event.
+    """
+    combined_text = "\n".join(
+        [
+            payload.profile.org_name,
+            payload.profile.sector,
+            payload.use_case.name,
+            payload.use_case.description,
+            payload.notes or "",
+        ]
+    ).strip()
+
+    guardrail_result, guardrail_details = scan_request_text(
+        combined_text, request, context="governance-pack", mode="preview"
+    )
+
+    if not guardrail_result.allow:
+        write_audit_event(
+            "governance_pack_blocked",
+            path=str(request.url.path),
+            method=request.method,
+            client_ip=request.client.host if request.client else None,
+            outcome="block",
+            details={"reason": "guardrail_block", "guardrail": guardrail_details},
+        )
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={
+                "message": "Input blocked by SAFE guardrails. Remove identifiers and retry.",
+                "risk_score": guardrail_result.risk_score,
+                "findings": [f.model_dump() for f in guardrail_result.findings],
+                "redacted_preview": guardrail_result.redacted_text,
+            },
+        )
+
+    def generate() -> tuple[GovernancePackResponse, dict[str, Any]]:
+        result = build_governance_pack(payload)
+        return result, {
+            "assessment": {
+                "maturity_score": result.assessment.maturity_score,
+                "maturity_level": result.assessment.maturity_level,
+                "gaps_count": len(result.assessment.top_gaps),
+            },
+            "policy": {
+                "policy_title": result.policy.policy_title,
+                "review_cadence_days": result.policy.review_cadence_days,
+                "sections_count": len(result.policy.sections),
+            },
+            "risk_register": {
+                "register_title": result.risk_register.register_title,
+                "items_count": len(result.risk_register.items),
+            },
+            "board_brief": {
+                "brief_title": result.board_brief.brief_title,
+                "key_risks_count": len(result.board_brief.key_risks),
+                "decision_asks_count": len(result.board_brief.decision_asks),
+            },
+        }
+
+    cached, hit = response_cache.fetch(str(request.url.path), payload, generate)
+    artefact_id = save_artefact(
+        get_org_id(request),
+        "governance_pack",
+        f"Governance Pack — {payload.profile.org_name} — {payload.use_case.name}",
+        cached.body,
+    )
+
+    # One audit event for the scan and all four artefacts (SAFE: no raw text stored)
+    write_audit_event(
+        "governance_pack_created",
+        path=str(request.url.path),
+        method=request.method,
+        client_ip=request.client.host if request.client else None,
+        outcome="allow",
+        details={"guardrail": guardrail_details, **cached.audit_details(hit, artefact_id)},
+    )
+
+    return cached.response(request, artefact_id)
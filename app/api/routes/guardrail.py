@@ -1,143 +1,250 @@
-import re
-
-from fastapi import APIRouter, Request
-
-from app.models.guardrail import Finding, GuardrailCheckRequest, GuardrailCheckResponse
+import json
+from collections.abc import Iterator
+from tempfile import SpooledTemporaryFile
+from typing import Any
+
+from fastapi import APIRouter, HTTPException, Request, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+
+from app.core.deps import get_org_id
+from app.models.guardrail import (
+    GuardrailBatchRequest,
+    GuardrailBatchResponse,
+    GuardrailCheckRequest,
+    GuardrailCheckResponse,
+    GuardrailSessionEdit,
+    ResponseMode,
+)
 from app.services.audit import write_audit_event
+from app.services.guardrail_cache import check_text_cached
+from app.services.guardrail_executor import GuardrailBusyError, check_batch
+from app.services.guardrail_rules import guardrail_rules
+from app.services.guardrail_session import GuardrailDraftSession
+from app.services.guardrail_stream import GuardrailStreamScanner
 
 router = APIRouter(tags=["guardrail"])
 
 
-EMAIL_RE = re.compile(r"\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}\b")
-PHONE_RE = re.compile(r"\b(?:\+?44\s?7\d{3}|\(?07\d{3}\)?)\s?\d{3}\s?\d{3}\b")
-NI_RE = re.compile(r"\b(?!BG|GB|KN|NK|NT|TN|ZZ)[A-CEGHJ-PR-TW-Z]{2}\d{6}[A-D]\b", re.IGNORECASE)
-CC_RE = re.compile(r"\b(?:\d[ -]*?){13,19}\b")
+def scan_request_text(
+    text: str, request: Request, context: str | None = None, mode: ResponseMode = "redact"
+) -> tuple[GuardrailCheckResponse, dict[str, Any]]:
+    """
+    Guardrail-checks text under the requesting org's rules, without writing an audit event.
+    Returns the result and the audit details describing the check (SAFE: no raw text).
+    """
+    org_id = get_org_id(request)
+    scanner = guardrail_rules.get(org_id)
+
+    try:
+        result = check_text_cached(text, scanner, mode)
+    except GuardrailBusyError:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Guardrail capacity exhausted. Retry shortly.",
+            headers={"Retry-After": "1"},
+        ) from None
+
+    details = {
+        "context": context,
+        "org_id": org_id,
+        "ruleset_version": scanner.version,
+        "risk_score": result.risk_score,
+        "findings": [f.model_dump() for f in result.findings],
+        "text_length": len(text),
+    }
+    return result, details
+
+
+@router.post(
+    "/guardrail/check", response_model=GuardrailCheckResponse, response_model_exclude_none=True
+)
+def guardrail_check(payload: GuardrailCheckRequest, request: Request) -> GuardrailCheckResponse:
+    result, details = scan_request_text(payload.text, request, payload.context, payload.mode)
 
+    # Audit event (SAFE: no raw text stored)
+    client_ip = request.client.host if request.client else None
+    write_audit_event(
+        "guardrail_check",
+        path=str(request.url.path),
+        method=request.method,
+        client_ip=client_ip,
+        outcome="allow" if result.allow else "block",
+        details=details,
+    )
 
-def _luhn_check(number: str) -> bool:
-    digits = [int(d) for d in re.sub(r"\D", "", number)]
-    if len(digits) < 13 or len(digits) > 19:
-        return False
-    checksum = 0
-    parity = len(digits) % 2
-    for i, d in enumerate(digits):
-        if i % 2 == parity:
-            d *= 2
-            if d > 9:
-                d -= 9
-        checksum += d
-    return checksum % 10 == 0
+    return result
+
+
+@router.post(
+    "/guardrail/check/batch",
+    response_model=GuardrailBatchResponse,
+    response_model_exclude_none=True,
+)
+def guardrail_check_batch(
+    payload: GuardrailBatchRequest, request: Request
+) -> GuardrailBatchResponse:
+    org_id = get_org_id(request)
+    scanner = guardrail_rules.get(org_id)
+    results = check_batch(payload.texts, scanner, mode=payload.mode)
+
+    finding_totals: dict[str, int] = {}
+    outcomes = []
+    for i, (text, result) in enumerate(zip(payload.texts, results, strict=True)):
+        for f in result.findings:
+            finding_totals[f.type] = finding_totals.get(f.type, 0) + f.matches_count
+        outcomes.append(
+            {
+                "index": i,
+                "outcome": "allow" if result.allow else "block",
+                "risk_score": result.risk_score,
+                "finding_types": [f.type for f in result.findings],
+                "text_length": len(text),
+            }
+        )
+    blocked = sum(1 for r in results if not r.allow)
+
+    # One audit event per batch, with per-item outcomes (SAFE: no raw text stored)
+    write_audit_event(
+        "guardrail_batch_check",
+        path=str(request.url.path),
+        method=request.method,
+        client_ip=request.client.host if request.client else None,
+        outcome="block" if blocked else "allow",
+        details={
+            "context": payload.context,
+            "org_id": org_id,
+            "ruleset_version": scanner.version,
+            "items_count": len(results),
+            "blocked_count": blocked,
+            "finding_totals": finding_totals,
+            "items": outcomes,
+        },
+    )
 
+    return GuardrailBatchResponse(
+        results=results,
+        allowed_count=len(results) - blocked,
+        blocked_count=blocked,
+    )
 
-def _mask(pattern: re.Pattern, text: str, token: str) -> str:
-    return pattern.sub(token, text)
 
+# NDJSON output is spooled in memory up to this size, then to a temp file
+_SPOOL_MEMORY_BYTES = 1024 * 1024
+_SPOOL_READ_BYTES = 64 * 1024
 
-@router.post("/guardrail/check", response_model=GuardrailCheckResponse)
-def guardrail_check(payload: GuardrailCheckRequest, request: Request) -> GuardrailCheckResponse:
-    text = payload.text
-
-    email_matches = EMAIL_RE.findall(text)
-    phone_matches = PHONE_RE.findall(text)
-    ni_matches = NI_RE.findall(text)
-
-    cc_candidates = CC_RE.findall(text)
-    cc_matches = [c for c in cc_candidates if _luhn_check(c)]
-
-    findings: list[Finding] = []
-    risk_score = 0
-
-    def add_finding(
-        f_type: str, label: str, count: int, severity: str, recommendation: str, score_add: int
-    ):
-        nonlocal risk_score
-        if count > 0:
-            findings.append(
-                Finding(
-                    type=f_type,  # type: ignore[arg-type]
-                    label=label,
-                    matches_count=count,
-                    severity=severity,  # type: ignore[arg-type]
-                    recommendation=recommendation,
-                )
-            )
-            risk_score += score_add
-
-    add_finding(
-        "email",
-        "Email address detected",
-        len(email_matches),
-        "medium",
-        "Replace emails with placeholders like [REDACTED_EMAIL] before using AI.",
-        20 if len(email_matches) > 0 else 0,
-    )
 
-    add_finding(
-        "phone",
-        "Phone number detected",
-        len(phone_matches),
-        "medium",
-        "Replace phone numbers with placeholders like [REDACTED_PHONE].",
-        20 if len(phone_matches) > 0 else 0,
-    )
+def _ndjson(events: list[dict[str, Any]]) -> bytes:
+    return "".join(json.dumps(e, ensure_ascii=False) + "\n" for e in events).encode("utf-8")
 
-    add_finding(
-        "ni_number",
-        "UK National Insurance number detected",
-        len(ni_matches),
-        "high",
-        "Do not send NI numbers to AI. Remove or replace with [REDACTED_NI].",
-        40 if len(ni_matches) > 0 else 0,
-    )
 
-    add_finding(
-        "credit_card",
-        "Possible payment card number detected (Luhn validated)",
-        len(cc_matches),
-        "high",
-        "Do not send card numbers to AI. Remove or replace with [REDACTED_CARD].",
-        40 if len(cc_matches) > 0 else 0,
-    )
+def _read_spool(spool: SpooledTemporaryFile) -> Iterator[bytes]:
+    with spool:
+        spool.seek(0)
+        while chunk := spool.read(_SPOOL_READ_BYTES):
+            yield chunk
 
-    # Cap risk score
-    risk_score = min(risk_score, 100)
 
-    # Redaction suggestions
-    redacted = text
-    if email_matches:
-        redacted = _mask(EMAIL_RE, redacted, "[REDACTED_EMAIL]")
-    if phone_matches:
-        redacted = _mask(PHONE_RE, redacted, "[REDACTED_PHONE]")
-    if ni_matches:
-        redacted = _mask(NI_RE, redacted, "[REDACTED_NI]")
+@router.post("/guardrail/check/stream", response_class=StreamingResponse)
+async def guardrail_check_stream(request: Request, context: str | None = None) -> StreamingResponse:
+    """
+    Streaming variant of /guardrail/check for large documents.
+    The request body is raw UTF-8 text (chunked uploads welcome); the response is NDJSON:
+    finding and redacted-chunk records in document order, then one summary record.
 
-    # Credit card: replace only Luhn-valid matches
-    for cc in cc_matches:
-        redacted = redacted.replace(cc, "[REDACTED_CARD]")
+    The upload is scanned window by window as it arrives and results are spooled, so
+    memory stays bounded; the response starts once the upload completes (HTTP/1.1
+    clients commonly do not read a response while still sending the body).
+    """
+    org_id = get_org_id(request)
+    rules = guardrail_rules.get(org_id)
+    scanner = GuardrailStreamScanner(rules)
+    spool = SpooledTemporaryFile(max_size=_SPOOL_MEMORY_BYTES)
 
-    # Decision: block if any high severity finding exists
-    has_high = any(f.severity == "high" for f in findings)
-    allow = not has_high
+    async for chunk in request.stream():
+        if chunk:
+            # Scanning is CPU-bound: keep it off the event loop
+            events = await run_in_threadpool(scanner.feed, chunk)
+            if events:
+                spool.write(_ndjson(events))
+    events = await run_in_threadpool(scanner.finish)
+    summary = scanner.summary()
+    spool.write(_ndjson([*events, {"event": "summary", **summary.model_dump()}]))
 
     # Audit event (SAFE: no raw text stored)
-    client_ip = request.client.host if request.client else None
-    write_audit_event(
-        "guardrail_check",
+    await run_in_threadpool(
+        write_audit_event,
+        "guardrail_stream_check",
         path=str(request.url.path),
         method=request.method,
-        client_ip=client_ip,
-        outcome="allow" if allow else "block",
+        client_ip=request.client.host if request.client else None,
+        outcome="allow" if summary.allow else "block",
         details={
-            "context": payload.context,
-            "risk_score": risk_score,
-            "findings": [f.model_dump() for f in findings],
-            "text_length": len(text),
+            "context": context,
+            "org_id": org_id,
+            "ruleset_version": rules.version,
+            "risk_score": summary.risk_score,
+            "findings": [f.model_dump() for f in summary.findings],
+            "text_length": summary.text_length,
         },
     )
 
-    return GuardrailCheckResponse(
-        allow=allow,
-        risk_score=risk_score,
-        findings=findings,
-        redacted_text=redacted,
-    )
+    return StreamingResponse(_read_spool(spool), media_type="application/x-ndjson")
+
+
+def _apply_edit(session: GuardrailDraftSession, raw: str) -> dict[str, Any]:
+    edit = GuardrailSessionEdit.model_validate_json(raw)
+    if edit.op == "reset":
+        return session.reset(edit.text)
+    if edit.op == "insert":
+        return session.insert(edit.offset, edit.text)
+    if edit.op == "delete":
+        return session.delete(edit.offset, edit.length)
+    return session.replace(edit.offset, edit.length, edit.text)
+
+
+@router.websocket("/guardrail/session")
+async def guardrail_session(websocket: WebSocket, context: str | None = None) -> None:
+    """
+    As-you-type guardrail checks for a draft held server-side.
+    Client messages are JSON edits (see GuardrailSessionEdit): reset, insert, delete, replace.
+    Each edit rescans only the region around it and is answered with an "update": the
+    rescanned [start, end) range, the matches now inside it and the current verdict.
+    An invalid edit gets an "error" message and leaves the draft unchanged.
+    """
+    org_id = get_org_id(websocket)
+    rules = guardrail_rules.get(org_id)
+    session = GuardrailDraftSession(rules)
+    await websocket.accept()
+
+    try:
+        while True:
+            raw = await websocket.receive_text()
+            try:
+                update = await run_in_threadpool(_apply_edit, session, raw)
+            except ValueError as exc:
+                await websocket.send_json({"event": "error", "detail": str(exc)})
+                continue
+            await websocket.send_json(update)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        summary = session.summary()
+        # One audit event per session (SAFE: no raw text stored)
+        await run_in_threadpool(
+            write_audit_event,
+            "guardrail_session",
+            path=str(websocket.url.path),
+            method="WEBSOCKET",
+            client_ip=websocket.client.host if websocket.client else None,
+            outcome="allow" if summary.allow else "block",
+            details={
+                "context": context,
+                "org_id": org_id,
+                "ruleset_version": rules.version,
+                "edits_count": session.edits,
+                "risk_score": summary.risk_score,
+                "findings": [f.model_dump() for f in summary.findings],
+                "text_length": summary.text_length,
+            },
+        )
@@ -2,6 +2,10 @@ from fastapi import APIRouter, Depends
 
 from app.core.config import settings
 from app.core.deps import require_admin_key
+from app.services.artefact_store import artefact_store
+from app.services.guardrail_cache import guardrail_cache
+from app.services.guardrail_rules import guardrail_rules
+from app.services.response_cache import response_cache
 
 router = APIRouter(tags=["meta"], dependencies=[Depends(require_admin_key)])
 
@@ -22,3 +26,27 @@ def meta():
             "fallback_model": settings.fallback_model,
         },
     }
+
+
+@router.get("/meta/guardrail-cache")
+def guardrail_cache_stats():
+    # Counters only: the cache holds no text
+    return guardrail_cache.stats()
+
+
+@router.get("/meta/response-cache")
+def response_cache_stats():
+    return response_cache.stats()
+
+
+@router.get("/meta/artefact-store")
+def artefact_store_stats():
+    # Counters only: no artefact content
+    return artefact_store.stats() if artefact_store is not None else {"enabled": False}
+
+
+@router.get("/meta/guardrail-rules")
+def guardrail_rules_versions():
+    # Rule set version per org, to confirm a rule file change has been picked up (within
+    # GUARDRAIL_RULES_RELOAD_SECONDS: the request never compiles rules itself)
+    return guardrail_rules.stats()
@@ -1,16 +1,21 @@
-from fastapi import APIRouter, HTTPException, Request, status
+from typing import Any
+
+from fastapi import APIRouter, HTTPException, Request, Response, status
 
 from app.api.routes.guardrail import guardrail_check
+from app.core.deps import get_org_id
 from app.models.guardrail import GuardrailCheckRequest
 from app.models.policy import PolicyRequest, PolicyResponse
+from app.services.artefact_store import save_artefact
 from app.services.audit import write_audit_event
 from app.services.policy import generate_ai_use_policy
+from app.services.response_cache import response_cache
 
 router = APIRouter(tags=["policy"])
 
 
 @router.post("/policy", response_model=PolicyResponse)
-def create_policy(payload: PolicyRequest, request: Request) -> PolicyResponse:
+def create_policy(payload: PolicyRequest, request: Request) -> Response:
     # SAFE: guardrail scan free-text inputs
     combined_text = "\n".join(
         [
@@ -23,7 +28,7 @@ def create_policy(payload: PolicyRequest, request: Request) -> PolicyResponse:
     ).strip()
 
     guardrail_result = guardrail_check(
-        GuardrailCheckRequest(text=combined_text, context="policy"),
+        GuardrailCheckRequest(text=combined_text, context="policy", mode="preview"),
         request,
     )
 
@@ -46,11 +51,22 @@ def create_policy(payload: PolicyRequest, request: Request) -> PolicyResponse:
                 "message": "Input blocked by SAFE guardrails. Remove identifiers and retry.",
                 "risk_score": guardrail_result.risk_score,
                 "findings": [f.model_dump() for f in guardrail_result.findings],
-                "redacted_preview": guardrail_result.redacted_text[:500],
+                "redacted_preview": guardrail_result.redacted_text,
             },
         )
 
-    result = generate_ai_use_policy(payload)
+    def generate() -> tuple[PolicyResponse, dict[str, Any]]:
+        result = generate_ai_use_policy(payload)
+        return result, {
+            "policy_title": result.policy_title,
+            "review_cadence_days": result.review_cadence_days,
+            "sections_count": len(result.sections),
+        }
+
+    cached, hit = response_cache.fetch(str(request.url.path), payload, generate)
+    artefact_id = save_artefact(
+        get_org_id(request), "policy", cached.details["policy_title"], cached.body
+    )
 
     write_audit_event(
         "policy_created",
@@ -58,11 +74,7 @@ def create_policy(payload: PolicyRequest, request: Request) -> PolicyResponse:
         method=request.method,
         client_ip=request.client.host if request.client else None,
         outcome="allow",
-        details={
-            "policy_title": result.policy_title,
-            "review_cadence_days": result.review_cadence_days,
-            "sections_count": len(result.sections),
-        },
+        details=cached.audit_details(hit, artefact_id),
     )
 
-    return result
+    return cached.response(request, artefact_id)
@@ -0,0 +1,165 @@
+from typing import Annotated
+
+from fastapi import APIRouter, HTTPException, Query, Request, status
+
+from app.core.deps import get_org_id
+from app.models.risk_register import (
+    RiskAggregationRequest,
+    RiskItem,
+    RiskPortfolioEntry,
+    RiskPortfolioReport,
+    RiskPortfolioUpdate,
+)
+from app.services.audit import write_audit_event
+from app.services.guardrail_executor import check_batch
+from app.services.guardrail_rules import guardrail_rules
+from app.services.risk_aggregation import (
+    RiskPortfolio,
+    RiskPortfolioFullError,
+    aggregate,
+    risk_portfolios,
+)
+from app.services.risk_register import build_risk_register
+
+router = APIRouter(tags=["risk-portfolio"])
+
+
+def _entry_text(entry: RiskPortfolioEntry) -> str:
+    parts: list[str] = []
+    if entry.request is not None:
+        req = entry.request
+        parts = [
+            req.profile.org_name,
+            req.profile.sector,
+            req.use_case.name,
+            req.use_case.description,
+            req.notes or "",
+        ]
+    elif entry.risk_register is not None:
+        # Every free-text field a client can fill in: reports echo owner roles back
+        parts = [entry.risk_register.register_title]
+        for item in entry.risk_register.items:
+            parts += [item.title, item.description, item.owner_role, *item.controls]
+    return "\n".join(parts).strip()
+
+
+def _entry_items(entry: RiskPortfolioEntry) -> list[RiskItem]:
+    if entry.request is not None:
+        return build_risk_register(entry.request).items
+    return entry.risk_register.items if entry.risk_register is not None else []
+
+
+def _registers(
+    entries: list[RiskPortfolioEntry], request: Request, event_prefix: str
+) -> list[tuple[str, list[RiskItem]]]:
+    """
+    Guardrail-scans every entry's free text in one batch, then returns each entry's
+    register items (built from its request where no register was given).
+    """
+    org_id = get_org_id(request)
+    scanner = guardrail_rules.get(org_id)
+    results = check_batch([_entry_text(e) for e in entries], scanner, mode="spans")
+    blocked = [(e, r) for e, r in zip(entries, results, strict=True) if not r.allow]
+
+    if blocked:
+        finding_totals: dict[str, int] = {}
+        for _, result in blocked:
+            for f in result.findings:
+                finding_totals[f.type] = finding_totals.get(f.type, 0) + f.matches_count
+        write_audit_event(
+            f"{event_prefix}_blocked",
+            path=str(request.url.path),
+            method=request.method,
+            client_ip=request.client.host if request.client else None,
+            outcome="block",
+            details={
+                "reason": "guardrail_block",
+                "org_id": org_id,
+                "ruleset_version": scanner.version,
+                "registers_count": len(entries),
+                "blocked_count": len(blocked),
+                "finding_totals": finding_totals,
+            },
+        )
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={
+                "message": "Input blocked by SAFE guardrails. Remove identifiers and retry.",
+                "blocked": [
+                    {
+                        "register_id": e.register_id,
+                        "risk_score": r.risk_score,
+                        "finding_types": [f.type for f in r.findings],
+                    }
+                    for e, r in blocked
+                ],
+            },
+        )
+
+    return [(e.register_id, _entry_items(e)) for e in entries]
+
+
+def _audit_report(
+    event_type: str, request: Request, report: RiskPortfolioReport, **details: int
+) -> None:
+    write_audit_event(
+        event_type,
+        path=str(request.url.path),
+        method=request.method,
+        client_ip=request.client.host if request.client else None,
+        outcome="allow",
+        details={
+            "org_id": get_org_id(request),
+            **details,
+            "registers_count": report.registers_count,
+            "risks_count": report.risks_count,
+        },
+    )
+
+
+@router.post("/risk-register/aggregate", response_model=RiskPortfolioReport)
+def aggregate_risk_registers(
+    payload: RiskAggregationRequest, request: Request
+) -> RiskPortfolioReport:
+    """
+    Heatmaps (likelihood x impact counts, overall and per category), top risks by
+    risk_score and owner workloads over the given registers or use cases.
+    """
+    registers = _registers(payload.registers, request, "risk_aggregation")
+    report = aggregate(registers, payload.top_n)
+    _audit_report("risk_aggregation_completed", request, report)
+    return report
+
+
+@router.put("/risk-portfolio/registers", response_model=RiskPortfolioReport)
+def update_risk_portfolio(payload: RiskPortfolioUpdate, request: Request) -> RiskPortfolioReport:
+    """
+    Adds or replaces (by register_id) registers in the organisation's live portfolio and
+    removes the `remove` ids; returns the updated report. Only the changed registers
+    are re-counted.
+    """
+    registers = (
+        _registers(payload.registers, request, "risk_portfolio") if payload.registers else []
+    )
+    try:
+        portfolio = risk_portfolios.update(get_org_id(request), registers, payload.remove)
+    except RiskPortfolioFullError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e)) from None
+    report = portfolio.report(payload.top_n)
+    _audit_report(
+        "risk_portfolio_updated",
+        request,
+        report,
+        updated_count=len(registers),
+        removed_count=len(payload.remove),
+    )
+    return report
+
+
+@router.get("/risk-portfolio", response_model=RiskPortfolioReport)
+def risk_portfolio_report(
+    request: Request, top_n: Annotated[int, Query(ge=1, le=100)] = 10
+) -> RiskPortfolioReport:
+    """The organisation's live portfolio report (from partial sums: no recount)."""
+    portfolio = risk_portfolios.get(get_org_id(request))
+    return (portfolio or RiskPortfolio()).report(top_n)  # no registers yet: an empty report
@@ -1,16 +1,21 @@
-from fastapi import APIRouter, HTTPException, Request, status
+from typing import Any
+
+from fastapi import APIRouter, HTTPException, Request, Response, status
 
 from app.api.routes.guardrail import guardrail_check
+from app.core.deps import get_org_id
 from app.models.guardrail import GuardrailCheckRequest
 from app.models.risk_register import RiskRegisterRequest, RiskRegisterResponse
+from app.services.artefact_store import save_artefact
 from app.services.audit import write_audit_event
+from app.services.response_cache import response_cache
 from app.services.risk_register import build_risk_register
 
 router = APIRouter(tags=["risk-register"])
 
 
 @router.post("/risk-register", response_model=RiskRegisterResponse)
-def create_risk_register(payload: RiskRegisterRequest, request: Request) -> RiskRegisterResponse:
+def create_risk_register(payload: RiskRegisterRequest, request: Request) -> Response:
     combined_text = "\n".join(
         [
             payload.profile.org_name,
@@ -22,7 +27,7 @@ def create_risk_register(payload: RiskRegisterRequest, request: Request) -> Risk
     ).strip()
 
     guardrail_result = guardrail_check(
-        GuardrailCheckRequest(text=combined_text, context="risk-register"),
+        GuardrailCheckRequest(text=combined_text, context="risk-register", mode="preview"),
         request,
     )
 
@@ -45,11 +50,21 @@ def create_risk_register(payload: RiskRegisterRequest, request: Request) -> Risk
                 "message": "Input blocked by SAFE guardrails. Remove identifiers and retry.",
                 "risk_score": guardrail_result.risk_score,
                 "findings": [f.model_dump() for f in guardrail_result.findings],
-                "redacted_preview": guardrail_result.redacted_text[:500],
+                "redacted_preview": guardrail_result.redacted_text,
             },
         )
 
-    result = build_risk_register(payload)
+    def generate() -> tuple[RiskRegisterResponse, dict[str, Any]]:
+        result = build_risk_register(payload)
+        return result, {
+            "register_title": result.register_title,
+            "items_count": len(result.items),
+        }
+
+    cached, hit = response_cache.fetch(str(request.url.path), payload, generate)
+    artefact_id = save_artefact(
+        get_org_id(request), "risk_register", cached.details["register_title"], cached.body
+    )
 
     write_audit_event(
         "risk_register_created",
@@ -57,10 +72,7 @@ def create_risk_register(payload: RiskRegisterRequest, request: Request) -> Risk
         method=request.method,
         client_ip=request.client.host if request.client else None,
         outcome="allow",
-        details={
-            "register_title": result.register_title,
-            "items_count": len(result.items),
-        },
+        details=cached.audit_details(hit, artefact_id),
     )
 
-    return result
+    return cached.response(request, artefact_id)
@@ -1,3 +1,5 @@
+from typing import Literal
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -10,6 +12,88 @@ class Settings(BaseSettings):
     # Admin / Security
     admin_api_key: str | None = None
 
+    # Guardrails
+    # Streaming checks scan in windows; the overlap must exceed the longest match
+    guardrail_stream_window_chars: int = 65536
+    guardrail_stream_overlap_chars: int = 512
+    # Batches at least this large are spread across a process pool
+    guardrail_batch_parallel_min_items: int = 256
+    guardrail_pool_workers: int | None = None  # None = one per CPU
+    # Single checks of at least this many chars scan in the pool (None = always inline)
+    guardrail_offload_min_chars: int | None = 32768
+    guardrail_pool_max_queue: int = 32  # offloaded scans running or waiting; beyond -> 503
+    # Verdict cache (stores hashes, findings and offsets only — never text)
+    guardrail_cache_enabled: bool = True
+    guardrail_cache_max_entries: int = 10000
+    guardrail_cache_max_bytes: int = 16 * 1024 * 1024
+    guardrail_cache_ttl_seconds: float = 300.0
+    # As-you-type sessions rescan each edit plus this many chars of context either side
+    guardrail_session_margin_chars: int = 128
+    guardrail_session_max_chars: int = 262144
+    # Per-org rule files (<org_id>.json), loaded at startup; a background thread picks up
+    # changed files every guardrail_rules_reload_seconds (0: never) without a restart
+    guardrail_rules_dir: str = "config/guardrail_rules"
+    guardrail_rules_reload_seconds: float = 5.0
+    # Deny-list automata kept per process (and per pool worker); raised to the number of
+    # distinct deny lists in the loaded rule sets, so workers never rebuild in turn
+    guardrail_deny_list_shared_min: int = 32
+    # Redacted previews (blocked-request errors, "preview" response mode)
+    guardrail_preview_chars: int = 500
+
+    # Deliverable responses (assess, policy, risk register, board brief, governance pack),
+    # serialised and keyed by request body; guardrail scan and audit event still run on hits
+    response_cache_enabled: bool = True
+    response_cache_max_entries: int = 2048
+    response_cache_max_bytes: int = 32 * 1024 * 1024
+    # Bulk assessment rows are validated, guardrail-scanned and scored in chunks of this size
+    assessment_bulk_chunk_rows: int = 10000
+    # Live risk portfolio (heatmaps, top risks, owner workloads) per org, held in memory
+    risk_portfolio_max_registers: int = 50000
+    risk_portfolio_max_orgs: int = 1000
+    # Store of every generated deliverable (list, retrieve by id, export); written by a
+    # background thread in batches. sqlite:///PATH (WAL mode) is the supported backend
+    artefact_store_enabled: bool = True
+    artefact_store_url: str = "sqlite:///logs/artefacts.sqlite3"
+    artefact_store_pool_size: int = 8  # read connections
+    artefact_store_flush_interval_seconds: float = 0.05
+    artefact_store_max_batch: int = 512
+    artefact_store_queue_max: int = 10000  # when full, callers wait (backpressure)
+    artefact_store_durable: bool = False  # respond only once the artefact is committed
+    artefact_store_timeout_seconds: float = 5.0  # longest wait for queue room or a commit -> 503
+    artefact_list_max_limit: int = 1000
+
+    # Audit log: events are queued and appended in batches by a background thread
+    audit_flush_interval_seconds: float = 0.05  # longest an event waits for its batch to fill
+    audit_max_batch: int = 512
+    audit_queue_max_events: int = 10000  # when full, callers wait (backpressure)
+    audit_fsync: Literal["never", "durable", "batch"] = "durable"
+    audit_durable: bool = False  # respond only once the event is written (and fsynced)
+    audit_timeout_seconds: float = 5.0  # longest wait for queue room or a durable write -> 503
+    audit_log_path: str = "logs/audit.jsonl"  # worker 0; others write audit.<id>.jsonl beside it
+    # The active file is rotated into gzipped segments, listed in <segments dir>/manifest.json
+    audit_segments_dir: str = "logs/audit-segments"
+    # Each server worker writes its own stream; None: claim a free slot (0, 1, ...) by lock file
+    audit_worker_id: str | None = None
+    audit_segment_max_bytes: int = 64 * 1024 * 1024
+    audit_segment_max_seconds: float = 86400.0
+    audit_compress_segments: bool = True
+    audit_retention_days: float | None = None  # None = keep every segment
+    # "binary": compact records (about 5x smaller), read back as JSONL by every reader
+    audit_format: Literal["jsonl", "binary"] = "jsonl"
+    # Hash chain over every line plus one HMAC-signed Merkle root per written batch
+    audit_hash_chain: bool = True
+    audit_signing_key: str | None = None  # unset: seals are written but not signed
+    audit_signing_key_id: str = "default"
+    # SQLite index behind the admin audit query API (rebuilt from the log if deleted)
+    audit_index_enabled: bool = True
+    audit_index_path: str = "logs/audit-index.sqlite3"
+    audit_query_max_limit: int = 1000
+    # In-memory counts by hour/event type/outcome/path/context/finding type, checkpointed here
+    audit_rollups_enabled: bool = True
+    audit_rollups_dir: str = "logs/audit-rollups"
+    audit_rollups_checkpoint_seconds: float = 60.0
+    audit_rollups_max_contexts: int = 100  # further contexts count as "other"
+
     # AI Providers
     openai_api_key: str | None = None
     anthropic_api_key: str | None = None
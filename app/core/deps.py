@@ -1,4 +1,5 @@
 from fastapi import Header, HTTPException, status
+from starlette.requests import HTTPConnection
 
 from app.core.config import settings
 
@@ -21,3 +22,11 @@ def require_admin_key(x_admin_key: str | None = Header(default=None)) -> None:
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid admin key",
         )
+
+
+def get_org_id(request: HTTPConnection) -> str | None:
+    """
+    Organisation a request acts for, from the X-Org-Id header; selects per-org guardrail rules.
+    Read from the request (not injected) so internal guardrail calls from other routes see it too.
+    """
+    return request.headers.get("x-org-id") or None
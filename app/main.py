@@ -1,13 +1,71 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request, status
+from fastapi.responses import JSONResponse
 
 from app.api.router import api_router
 from app.core.config import settings
+from app.services.artefact_store import ArtefactStoreBusyError, artefact_store
+from app.services.audit import close_audit_log, get_audit_log
+from app.services.audit_writer import AuditBackpressureError
+from app.services.guardrail_executor import GuardrailBusyError, shutdown_pool
+from app.services.guardrail_rules import guardrail_rules
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Claim this worker's audit stream and recover it (active segment, index) in the
+    # background before the first event
+    get_audit_log().writer.start()
+    # Compile every org's rules before the first request; reloads happen in the background
+    guardrail_rules.start()
+    yield
+    # Stop guardrail pool workers with the server; write out queued audit events
+    guardrail_rules.close()
+    shutdown_pool()
+    close_audit_log()
+    # Store queued artefacts
+    if artefact_store is not None:
+        artefact_store.close()
+
 
 app = FastAPI(
     title=settings.app_name,
     description="Control-first AI governance and compliance agent",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
 # Everything under /api/v1
 app.include_router(api_router, prefix="/api/v1")
+
+
+@app.exception_handler(AuditBackpressureError)
+async def audit_backpressure_handler(request: Request, exc: AuditBackpressureError) -> JSONResponse:
+    # Requests are not served without their audit event; ask the client to retry
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Audit log is busy. Retry shortly."},
+        headers={"Retry-After": "1"},
+    )
+
+
+@app.exception_handler(ArtefactStoreBusyError)
+async def artefact_store_busy_handler(
+    request: Request, exc: ArtefactStoreBusyError
+) -> JSONResponse:
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Artefact store is busy. Retry shortly."},
+        headers={"Retry-After": "1"},
+    )
+
+
+@app.exception_handler(GuardrailBusyError)
+async def guardrail_busy_handler(request: Request, exc: GuardrailBusyError) -> JSONResponse:
+    # Batch scans (batch check, bulk assessment, risk portfolios) shed load like single ones
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Guardrail capacity exhausted. Retry shortly."},
+        headers={"Retry-After": "1"},
+    )
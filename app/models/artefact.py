@@ -0,0 +1,24 @@
+from datetime import datetime
+from typing import Any, Literal
+
+from pydantic import BaseModel, Field
+
+ArtefactKind = Literal["assessment", "policy", "risk_register", "board_brief", "governance_pack"]
+
+
+class ArtefactSummary(BaseModel):
+    id: str
+    kind: ArtefactKind
+    title: str
+    created_at: datetime
+
+
+class Artefact(ArtefactSummary):
+    artefact: dict[str, Any] = Field(..., description="The deliverable's response body, as sent")
+
+
+class ArtefactPage(BaseModel):
+    artefacts: list[ArtefactSummary] = Field(..., description="Newest first by default")
+    next_cursor: str | None = Field(
+        default=None, description="Pass as `cursor` for the next page; absent on the last page"
+    )
@@ -0,0 +1,20 @@
+from typing import Any
+
+from pydantic import BaseModel, Field
+
+
+class AuditEventPage(BaseModel):
+    events: list[dict[str, Any]] = Field(..., description="Audit events, as written to the log")
+    next_cursor: str | None = Field(
+        default=None, description="Pass as `cursor` for the next page; absent on the last page"
+    )
+
+
+class AuditRollupReport(BaseModel):
+    group_by: list[str] = Field(..., description="Dimensions each row is grouped by")
+    finding_counts: bool = Field(
+        ..., description="Rows count events per finding type rather than events"
+    )
+    rows: list[dict[str, Any]] = Field(
+        ..., description="One row per combination of the group_by values, with its count"
+    )
@@ -0,0 +1,22 @@
+from typing import Literal
+
+from pydantic import BaseModel
+
+from app.models.assessment import AIUseCase, AssessmentResponse, OrganisationProfile
+from app.models.board_brief import BoardBriefResponse
+from app.models.policy import PolicyResponse
+from app.models.risk_register import RiskRegisterResponse
+
+
+class GovernancePackRequest(BaseModel):
+    profile: OrganisationProfile
+    use_case: AIUseCase
+    risk_appetite: Literal["low", "medium", "high"] = "low"  # policy
+    notes: str | None = None  # free text, will be guardrail-scanned
+
+
+class GovernancePackResponse(BaseModel):
+    assessment: AssessmentResponse
+    policy: PolicyResponse
+    risk_register: RiskRegisterResponse
+    board_brief: BoardBriefResponse
@@ -1,8 +1,20 @@
 from typing import Literal
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 
-FindingType = Literal["email", "phone", "ni_number", "credit_card", "other"]
+FindingType = Literal[
+    "email",
+    "phone",
+    "ni_number",
+    "credit_card",
+    "prompt_injection",
+    "injection_phrase",
+    "deny_list",
+    "other",
+]
+# redact: full redacted copy; preview: its first GUARDRAIL_PREVIEW_CHARS only;
+# spans: typed match offsets, no text (the client redacts its own copy)
+ResponseMode = Literal["redact", "preview", "spans"]
 
 
 class GuardrailCheckRequest(BaseModel):
@@ -13,6 +25,22 @@ class GuardrailCheckRequest(BaseModel):
         default=None,
         description="Optional context about where this text came from (e.g., 'client email draft')",
     )
+    mode: ResponseMode = Field(
+        default="redact", description="What to return: redacted text, a preview, or spans"
+    )
+
+
+class GuardrailBatchRequest(BaseModel):
+    texts: list[str] = Field(
+        ..., min_length=1, max_length=10000, description="Texts to scan; results keep this order"
+    )
+    context: str | None = Field(
+        default=None,
+        description="Optional context shared by the whole batch (e.g., 'nightly backfill')",
+    )
+    mode: ResponseMode = Field(
+        default="redact", description="What to return per text: redacted text, preview, or spans"
+    )
 
 
 class Finding(BaseModel):
@@ -23,8 +51,73 @@ class Finding(BaseModel):
     recommendation: str
 
 
+class GuardrailSpan(BaseModel):
+    """One redactable match (offsets are characters; spans are sorted and never overlap)."""
+
+    offset: int
+    length: int
+    type: FindingType
+    placeholder: str
+
+
 class GuardrailCheckResponse(BaseModel):
     allow: bool
     risk_score: int = Field(..., ge=0, le=100)
     findings: list[Finding]
-    redacted_text: str
+    redacted_text: str | None = None  # redact and preview modes
+    spans: list[GuardrailSpan] | None = None  # spans mode
+
+
+class GuardrailBatchResponse(BaseModel):
+    results: list[GuardrailCheckResponse]
+    allowed_count: int
+    blocked_count: int
+
+
+class GuardrailStreamSummary(BaseModel):
+    """Final NDJSON record of a streaming check (findings count the whole document)."""
+
+    allow: bool
+    risk_score: int = Field(..., ge=0, le=100)
+    findings: list[Finding]
+    text_length: int
+
+
+class GuardrailSessionEdit(BaseModel):
+    """One client message on the as-you-type session WebSocket (offsets are characters)."""
+
+    op: Literal["reset", "insert", "delete", "replace"]
+    offset: int = Field(default=0, ge=0)
+    length: int = Field(default=0, ge=0, description="Characters removed (delete/replace)")
+    text: str = Field(default="", description="Characters inserted (reset/insert/replace)")
+
+
+class GuardrailDetectorRule(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+    enabled: bool = True
+    severity: Literal["low", "medium", "high"] | None = None  # None = built-in severity
+    score: int | None = Field(default=None, ge=0, le=100)  # None = built-in weight
+
+
+class GuardrailDenyListRule(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+    terms: list[str] = Field(default_factory=list, description="Literal terms to block")
+    case_sensitive: bool = False
+    word_boundary: bool = True  # terms only match as whole words
+
+
+class GuardrailRuleSet(BaseModel):
+    """
+    One organisation's guardrail rules (a JSON rule file). Detectors not listed keep
+    their built-in settings. Unknown keys are rejected so a typo cannot silently
+    loosen a rule set.
+    """
+
+    model_config = ConfigDict(extra="forbid")
+
+    detectors: dict[FindingType, GuardrailDetectorRule] = Field(default_factory=dict)
+    deny_list: GuardrailDenyListRule | None = None
+    block_severity: Literal["low", "medium", "high"] | None = "high"
+    block_threshold: int | None = Field(default=None, ge=0, le=100)
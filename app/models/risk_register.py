@@ -1,6 +1,7 @@
+from collections import Counter
 from typing import Literal
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator, model_validator
 
 from app.models.assessment import AIUseCase, OrganisationProfile
 
@@ -33,8 +34,86 @@ class RiskItem(BaseModel):
     owner_role: str
     review_days: int = Field(..., ge=7, le=365)
 
+    @model_validator(mode="after")
+    def _score_matches(self) -> "RiskItem":
+        # Heatmaps bucket by likelihood and impact, top risks and workloads by score
+        if self.risk_score != self.likelihood * self.impact:
+            raise ValueError("risk_score must equal likelihood * impact")
+        return self
+
 
 class RiskRegisterResponse(BaseModel):
     register_title: str
     version: str = "0.1.0"
     items: list[RiskItem]
+
+
+class RiskPortfolioEntry(BaseModel):
+    """One register of a portfolio: built from `request`, or `risk_register` generated earlier."""
+
+    register_id: str = Field(..., min_length=1, max_length=200)
+    request: RiskRegisterRequest | None = None
+    risk_register: RiskRegisterResponse | None = None
+
+    @model_validator(mode="after")
+    def _one_source(self) -> "RiskPortfolioEntry":
+        if (self.request is None) == (self.risk_register is None):
+            raise ValueError("give exactly one of request or risk_register")
+        return self
+
+
+def _unique_register_ids(entries: list[RiskPortfolioEntry]) -> list[RiskPortfolioEntry]:
+    # Registers are keyed by id: a repeated id would silently keep only one of them
+    duplicates = sorted(i for i, n in Counter(e.register_id for e in entries).items() if n > 1)
+    if duplicates:
+        raise ValueError(f"duplicate register_id: {', '.join(duplicates[:10])}")
+    return entries
+
+
+class RiskAggregationRequest(BaseModel):
+    registers: list[RiskPortfolioEntry] = Field(..., min_length=1, max_length=10000)
+    top_n: int = Field(10, ge=1, le=100)
+
+    _unique_ids = field_validator("registers")(_unique_register_ids)
+
+
+class RiskPortfolioUpdate(BaseModel):
+    # Added or replaced by register_id, then removed (an id in both ends up removed)
+    registers: list[RiskPortfolioEntry] = Field(default_factory=list, max_length=10000)
+    remove: list[str] = Field(default_factory=list, max_length=10000)
+    top_n: int = Field(10, ge=1, le=100)
+
+    _unique_ids = field_validator("registers")(_unique_register_ids)
+
+
+class RiskHeatmap(BaseModel):
+    category: RiskCategory | Literal["all"]
+    risks_count: int
+    counts: list[list[int]]  # counts[likelihood - 1][impact - 1]
+
+
+class PortfolioRisk(BaseModel):
+    register_id: str
+    risk_id: str
+    category: RiskCategory
+    title: str
+    likelihood: int
+    impact: int
+    risk_score: int
+    owner_role: str
+
+
+class OwnerWorkload(BaseModel):
+    owner_role: str
+    risks_count: int
+    registers_count: int
+    total_score: int
+    high_risks_count: int  # risk_score >= 15
+
+
+class RiskPortfolioReport(BaseModel):
+    registers_count: int
+    risks_count: int
+    heatmaps: list[RiskHeatmap]  # "all", then one per category
+    top_risks: list[PortfolioRisk]  # highest risk_score first
+    owner_workloads: list[OwnerWorkload]  # highest total_score first
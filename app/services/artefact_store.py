@@ -0,0 +1,558 @@
+import atexit
+import hashlib
+import json
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Iterator, Sequence
+from concurrent.futures import Future
+from contextlib import contextmanager
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any, NamedTuple, Protocol
+from uuid import UUID, uuid5
+
+from app.core.config import settings
+from app.models.artefact import ArtefactKind
+from app.services.audit_index import SortOrder, decode_cursor, encode_cursor
+
+logger = logging.getLogger(__name__)
+
+# Pause before retrying a batch whose insert failed (disk full, database locked)
+_RETRY_SECONDS = 0.5
+# Rows per read when exporting, so a long export never pins a WAL snapshot
+_EXPORT_PAGE = 1000
+# Ids of recently committed artefacts, so serving the same deliverable again queues nothing
+_RECENT_IDS = 16384
+
+
+class ArtefactStoreBusyError(RuntimeError):
+    """The write queue stayed full (or a durable write did not commit) within the timeout."""
+
+
+class ArtefactRecord(NamedTuple):
+    id: str
+    org_id: str  # "" for requests without X-Org-Id
+    kind: ArtefactKind
+    title: str
+    created_at: str  # UTC ISO 8601 commit time (queue time until then): string order is time order
+    body: bytes  # the deliverable's JSON response body, as sent
+    seq: int = 0  # storage order, the keyset tie-breaker; 0 until committed
+
+    def envelope(self) -> bytes:
+        """{"id", "kind", "title", "created_at", "artefact": <body>} without re-parsing the body."""
+        meta = json.dumps(
+            {"id": self.id, "kind": self.kind, "title": self.title, "created_at": self.created_at},
+            ensure_ascii=False,
+        )
+        return meta[:-1].encode("utf-8") + b', "artefact": ' + self.body + b"}"
+
+
+class ArtefactBackend(Protocol):
+    """Where artefacts are kept: SQLite here; a server database implements the same calls."""
+
+    name: str
+
+    def insert(self, records: Sequence[ArtefactRecord]) -> int:
+        """
+        Stores `records` in one transaction (all or nothing), stamped with the time it
+        takes the write lock, so (created_at, seq) order is commit order. An id already
+        stored keeps its first row; returns how many rows were added.
+        """
+
+    def get(self, artefact_id: str) -> ArtefactRecord | None: ...
+
+    def page(
+        self,
+        org_id: str,
+        kind: ArtefactKind | None,
+        limit: int,
+        after: tuple[str, int] | None,
+        order: SortOrder,
+        with_body: bool,
+    ) -> list[ArtefactRecord]:
+        """Up to `limit` of the org's artefacts after the (created_at, seq) keyset `after`."""
+
+    def close(self) -> None: ...
+
+
+_SCHEMA_VERSION = 1
+# Artefacts are records, not a cache: a database of another version is never dropped
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS artefacts (
+    seq INTEGER PRIMARY KEY,
+    id TEXT NOT NULL UNIQUE,
+    org_id TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    title TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    body BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS artefacts_org_created ON artefacts (org_id, created_at, seq);
+CREATE INDEX IF NOT EXISTS artefacts_org_kind_created
+    ON artefacts (org_id, kind, created_at, seq);
+PRAGMA user_version = {_SCHEMA_VERSION}
+"""
+
+# An id already stored (the same deliverable, queued twice) keeps its first row
+_INSERT = (
+    "INSERT OR IGNORE INTO artefacts (id, org_id, kind, title, created_at, body)"
+    " VALUES (?, ?, ?, ?, ?, ?)"
+)
+_COLUMNS = "id, org_id, kind, title, created_at, {body}, seq"
+_GET = f"SELECT {_COLUMNS.format(body='body')} FROM artefacts WHERE id = ?"
+_STATEMENT_CACHE = 64
+
+
+class _ConnectionPool:
+    """
+    At most `size` connections, each used by one thread at a time (most recently used
+    first, so a quiet server keeps few warm). A caller waits when all are in use.
+    """
+
+    def __init__(self, connect: Callable[[], sqlite3.Connection], size: int):
+        self._connect = connect
+        self.size = size
+        self._idle: queue.LifoQueue[sqlite3.Connection] = queue.LifoQueue()
+        self._open: list[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        conn = self._checkout()
+        try:
+            yield conn
+        finally:
+            with self._lock:
+                if conn in self._open:  # not closed by close() meanwhile
+                    self._idle.put(conn)
+
+    def close(self) -> None:
+        with self._lock:
+            for conn in self._open:
+                conn.close()
+            self._open = []
+            self._idle = queue.LifoQueue()
+
+    def _checkout(self) -> sqlite3.Connection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if len(self._open) < self.size:
+                conn = self._connect()
+                self._open.append(conn)
+                return conn
+            idle = self._idle
+        return idle.get()
+
+
+class SQLiteArtefactBackend:
+    """
+    Artefacts in one SQLite database in WAL mode: reads run on pooled connections
+    against a snapshot and never wait for the writer.
+
+    Rows live in a rowid table (`seq`), with a unique index for retrieval by id and
+    (org, created_at, seq) indexes, overall and per kind, for keyset pages: every page
+    and every lookup is one index range scan, however many rows there are. Statements
+    are fixed strings, so each connection compiles them once and reuses them from its
+    statement cache; batches are inserted with one executemany per transaction.
+    Writes are synchronous=FULL: a committed batch survives power loss.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path: Path, pool_size: int = 8):
+        self.path = Path(path)
+        self._lock = threading.Lock()  # the write connection
+        self._conn: sqlite3.Connection | None = None
+        self._readers = _ConnectionPool(self._reader, pool_size)
+
+    def insert(self, records: Sequence[ArtefactRecord]) -> int:
+        with self._lock:
+            conn = self._writer()
+            with conn:
+                # Stamped once this process holds the database's write lock: another
+                # process's batch commits wholly before or after, and older
+                conn.execute("BEGIN IMMEDIATE")
+                created_at = datetime.now(UTC).isoformat()
+                return conn.executemany(
+                    _INSERT,
+                    ((r.id, r.org_id, r.kind, r.title, created_at, r.body) for r in records),
+                ).rowcount
+
+    def get(self, artefact_id: str) -> ArtefactRecord | None:
+        with self._readers.connection() as conn:
+            row = conn.execute(_GET, (artefact_id,)).fetchone()
+        return ArtefactRecord(*row) if row is not None else None
+
+    def page(
+        self,
+        org_id: str,
+        kind: ArtefactKind | None,
+        limit: int,
+        after: tuple[str, int] | None,
+        order: SortOrder,
+        with_body: bool,
+    ) -> list[ArtefactRecord]:
+        clauses = ["org_id = ?"]
+        params: list[Any] = [org_id]
+        if kind is not None:
+            clauses.append("kind = ?")
+            params.append(kind)
+        if after is not None:
+            clauses.append(f"(created_at, seq) {'>' if order == 'asc' else '<'} (?, ?)")
+            params += after
+        direction = "ASC" if order == "asc" else "DESC"
+        columns = _COLUMNS.format(body="body" if with_body else "X''")
+        # One of a handful of statement texts: all stay in the statement cache
+        sql = (
+            f"SELECT {columns} FROM artefacts"
+            f" WHERE {' AND '.join(clauses)}"
+            f" ORDER BY created_at {direction}, seq {direction} LIMIT ?"
+        )
+        with self._readers.connection() as conn:
+            rows = conn.execute(sql, (*params, limit)).fetchall()
+        return [ArtefactRecord(*row) for row in rows]
+
+    def close(self) -> None:
+        self._readers.close()
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _connect(self) -> sqlite3.Connection:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(
+            self.path, check_same_thread=False, cached_statements=_STATEMENT_CACHE
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def _writer(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = self._connect()
+            conn.execute("PRAGMA synchronous=FULL")
+            # One transaction: processes starting together create it once
+            try:
+                with conn:
+                    conn.execute("BEGIN IMMEDIATE")
+                    (version,) = conn.execute("PRAGMA user_version").fetchone()
+                    if version == 0:
+                        for statement in filter(str.strip, _SCHEMA.split(";")):
+                            conn.execute(statement)
+                    elif version != _SCHEMA_VERSION:
+                        raise RuntimeError(
+                            f"{self.path}: artefact schema version {version},"
+                            f" this server expects {_SCHEMA_VERSION}"
+                        )
+            except BaseException:
+                conn.close()
+                raise
+            self._conn = conn
+        return self._conn
+
+    def _reader(self) -> sqlite3.Connection:
+        with self._lock:
+            self._writer()  # creates the schema on first use
+        conn = self._connect()
+        conn.execute("PRAGMA query_only=ON")
+        conn.execute("PRAGMA mmap_size=268435456")  # lookups read pages without copying
+        return conn
+
+
+def open_backend(url: str, pool_size: int = 8) -> ArtefactBackend:
+    """The backend for `url`; "sqlite:///relative/path" or "sqlite:////absolute/path"."""
+    scheme, sep, rest = url.partition("://")
+    if scheme == "sqlite" and sep and rest.startswith("/") and len(rest) > 1:
+        return SQLiteArtefactBackend(Path(rest[1:]), pool_size)
+    raise ValueError(f"Unsupported artefact store URL: {scheme}://... (expected sqlite:///PATH)")
+
+
+class _Entry(NamedTuple):
+    record: ArtefactRecord | None  # None for flush markers
+    done: Future | None  # set once the batch holding the entry is committed
+
+
+_ID_NAMESPACE = UUID("5c1f4be2-8d6e-4f0a-9a3b-2e7d6c1b9f40")
+
+
+def artefact_id(org_id: str | None, kind: ArtefactKind, body: bytes) -> str:
+    """
+    The id of a deliverable: the same body generated again for the same org (a cached
+    response, a 304 revalidation) is the same artefact, stored once.
+    """
+    digest = hashlib.sha256(body).hexdigest()
+    return str(uuid5(_ID_NAMESPACE, f"{org_id or ''}\0{kind}\0{digest}"))
+
+
+class ArtefactStore:
+    """
+    Stores every generated deliverable, written off the request path.
+
+    `put` stamps the artefact's id (see artefact_id) and queues it, with no database
+    I/O: an id committed recently or still queued is not queued again. One background
+    thread takes everything queued (up to `max_batch`, waiting at most `flush_interval`
+    for a batch to fill) and inserts it in a single transaction, stamped with the
+    commit time; an id already stored keeps its row. A durable `put` returns only once its
+    batch is committed, and its batch does not wait to fill. Until then a queued
+    artefact is served from memory by `get`, so its id can be retrieved as soon as it
+    is returned; queries and exports list committed artefacts.
+
+    The queue holds at most `max_queue` artefacts: when it is full, callers block
+    (backpressure) for up to `timeout` seconds, then get ArtefactStoreBusyError. A
+    durable caller waits as long for its commit; if the artefact is still queued by
+    then, it is withdrawn and the caller gets ArtefactStoreBusyError, and if the
+    writer has already taken it, it is accepted like a non-durable put. A failed
+    insert (sqlite3.Error, OSError) is logged and the batch retried (except at
+    `close`), so artefacts are delayed rather than dropped; any other error fails that
+    batch and the writer carries on. The thread starts on first use; `close` drains
+    the queue and stops it.
+    """
+
+    def __init__(
+        self,
+        backend: ArtefactBackend,
+        flush_interval: float,
+        max_batch: int,
+        max_queue: int,
+        timeout: float = 5.0,
+    ):
+        self.backend = backend
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.timeout = timeout
+        self._queue: queue.Queue[_Entry | None] = queue.Queue(max_queue)
+        self._pending: dict[str, ArtefactRecord] = {}
+        self._recent: OrderedDict[str, None] = OrderedDict()  # guarded by _pending_lock
+        self._pending_lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+        self._closing = threading.Event()
+        self._stats = {"artefacts": 0, "batches": 0, "write_errors": 0}
+
+    def put(
+        self,
+        org_id: str | None,
+        kind: ArtefactKind,
+        title: str,
+        body: bytes,
+        durable: bool = False,
+    ) -> str:
+        """Queues a deliverable's response body, unless stored recently or queued; returns its id."""
+        record_id = artefact_id(org_id, kind, body)
+        record = ArtefactRecord(
+            record_id, org_id or "", kind, title, datetime.now(UTC).isoformat(), body
+        )
+        done: Future | None = Future() if durable else None
+        with self._pending_lock:
+            if record_id in self._recent:
+                self._recent.move_to_end(record_id)
+                return record_id
+            queued = self._pending.setdefault(record.id, record) is not record
+        if queued and not durable:
+            return record.id
+        try:
+            self._enqueue(_Entry(record, done))
+        except ArtefactStoreBusyError:
+            self._forget([record])
+            raise
+        if done is not None:
+            try:
+                done.result(timeout=self.timeout)
+            except TimeoutError:
+                if done.cancel():  # still queued: it will never be stored
+                    self._forget([record])
+                    raise ArtefactStoreBusyError("Artefact not committed in time") from None
+                # Already taken by the writer: accepted, committed shortly
+            except Exception as exc:
+                raise ArtefactStoreBusyError("Artefact not stored") from exc
+        return record.id
+
+    def get(self, artefact_id: str, org_id: str | None) -> ArtefactRecord | None:
+        """The artefact, if it exists and belongs to `org_id`."""
+        record = self._pending.get(artefact_id) or self.backend.get(artefact_id)
+        if record is None or record.org_id != (org_id or ""):
+            return None
+        return record
+
+    def query(
+        self,
+        org_id: str | None,
+        limit: int,
+        cursor: str | None = None,
+        kind: ArtefactKind | None = None,
+        order: SortOrder = "desc",
+    ) -> tuple[list[ArtefactRecord], str | None]:
+        """
+        One page of the org's artefacts (without bodies) and the cursor of the next
+        page (None on the last page). Raises ValueError for an invalid cursor.
+        """
+        after = decode_cursor(cursor) if cursor else None
+        rows = self.backend.page(org_id or "", kind, limit + 1, after, order, with_body=False)
+        if len(rows) <= limit:
+            return rows, None
+        rows = rows[:limit]
+        return rows, encode_cursor(rows[-1].created_at, rows[-1].seq)
+
+    def export(
+        self, org_id: str | None, kind: ArtefactKind | None = None, order: SortOrder = "asc"
+    ) -> Iterator[ArtefactRecord]:
+        """Every artefact of the org, with bodies, read page by page so memory stays bounded."""
+        after = None
+        while True:
+            rows = self.backend.page(org_id or "", kind, _EXPORT_PAGE, after, order, True)
+            yield from rows
+            if len(rows) < _EXPORT_PAGE:
+                return
+            after = (rows[-1].created_at, rows[-1].seq)
+
+    def flush(self) -> None:
+        """Returns once everything queued before the call has been committed."""
+        done: Future = Future()
+        self._enqueue(_Entry(None, done))
+        try:
+            done.result(timeout=self.timeout)
+        except TimeoutError:
+            done.cancel()
+            raise ArtefactStoreBusyError("Artefacts not committed in time") from None
+        except Exception as exc:
+            raise ArtefactStoreBusyError("Artefacts not stored") from exc
+
+    def close(self) -> None:
+        """Commits everything queued, stops the writer thread and closes the backend."""
+        with self._lock:
+            thread = self._thread
+            if thread is not None:
+                self._closing.set()
+                self._queue.put(None)
+                thread.join()
+                self._closing.clear()
+                self._thread = None
+            self.backend.close()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "enabled": True,
+            **self._stats,
+            "backend": self.backend.name,
+            "queued": self._queue.qsize(),
+            "pending": len(self._pending),
+        }
+
+    def _enqueue(self, entry: _Entry) -> None:
+        if self._thread is None:
+            self._start()
+        try:
+            self._queue.put(entry, timeout=self.timeout)
+        except queue.Full:
+            raise ArtefactStoreBusyError("Artefact store queue is full") from None
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="artefact-writer", daemon=True
+                )
+                self._thread.start()
+
+    def _forget(self, records: list[ArtefactRecord], stored: bool = False) -> None:
+        with self._pending_lock:
+            for record in records:
+                if self._pending.get(record.id) is record:
+                    del self._pending[record.id]
+                if stored:
+                    self._recent[record.id] = None
+                    self._recent.move_to_end(record.id)
+            while len(self._recent) > _RECENT_IDS:
+                self._recent.popitem(last=False)
+
+    def _take(self, entry: _Entry, batch: list[_Entry]) -> None:
+        # From here on a waiting caller can no longer withdraw the entry
+        if entry.done is None or entry.done.set_running_or_notify_cancel():
+            batch.append(entry)
+
+    def _run(self) -> None:
+        stopping = False
+        batch: list[_Entry] = []
+        while batch or not stopping:
+            if not batch:
+                entry = self._queue.get()
+                if entry is None:
+                    stopping = True
+                    continue
+                self._take(entry, batch)
+
+            urgent = any(e.done is not None for e in batch)
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.max_batch:
+                try:
+                    if urgent or stopping:
+                        entry = self._queue.get_nowait()
+                    else:
+                        entry = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+                if entry is None:
+                    stopping = True
+                    continue
+                self._take(entry, batch)
+                urgent = urgent or entry.done is not None
+
+            records = [e.record for e in batch if e.record is not None]
+            try:
+                added = self.backend.insert(records) if records else 0
+            except Exception as exc:
+                self._stats["write_errors"] += 1
+                if not isinstance(exc, sqlite3.Error | OSError):
+                    logger.exception("Artefact batch of %d failed; not retried", len(records))
+                elif not (stopping or self._closing.is_set()):
+                    logger.exception("Artefact batch of %d not stored; retrying", len(records))
+                    time.sleep(_RETRY_SECONDS)
+                    continue
+                else:
+                    logger.exception(
+                        "Artefact writer stopped; %d artefacts not stored", len(records)
+                    )
+                self._forget(records)
+                for entry in batch:
+                    if entry.done is not None:
+                        entry.done.set_exception(exc)
+                batch = []
+                continue
+
+            self._forget(records, stored=True)
+            self._stats["artefacts"] += added
+            self._stats["batches"] += 1 if records else 0
+            for entry in batch:
+                if entry.done is not None:
+                    entry.done.set_result(None)
+            batch = []
+
+
+def save_artefact(org_id: str | None, kind: ArtefactKind, title: str, body: bytes) -> str | None:
+    """Stores a deliverable as sent; its artefact id, or None when the store is disabled."""
+    if artefact_store is None:
+        return None
+    return artefact_store.put(org_id, kind, title, body, durable=settings.artefact_store_durable)
+
+
+artefact_store = (
+    ArtefactStore(
+        open_backend(settings.artefact_store_url, settings.artefact_store_pool_size),
+        flush_interval=settings.artefact_store_flush_interval_seconds,
+        max_batch=settings.artefact_store_max_batch,
+        max_queue=settings.artefact_store_queue_max,
+        timeout=settings.artefact_store_timeout_seconds,
+    )
+    if settings.artefact_store_enabled
+    else None
+)
+if artefact_store is not None:
+    # Scripts and tests exit without the app lifespan: still store what is queued
+    atexit.register(artefact_store.close)
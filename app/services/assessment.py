@@ -1,4 +1,12 @@
+from typing import NamedTuple
+
+import numpy as np
+
 from app.models.assessment import ActionItem, AssessmentRequest, AssessmentResponse, Gap
+from app.services.decision_table import DecisionTable, Rule, feature_mask, features
+
+MATURITY_LEVELS = ("initial", "developing", "managed", "optimised")
+_LEVEL_BOUNDS = np.array([25, 50, 75])  # lowest score of each level after the first
 
 
 def _level(score: int) -> str:
@@ -11,128 +19,180 @@ def _level(score: int) -> str:
     return "optimised"
 
 
-def run_maturity_assessment(req: AssessmentRequest) -> AssessmentResponse:
-    """
-    Deterministic scoring for V1 MVP.
-    No LLM calls.
-    """
-    score = 0
-    gaps: list[Gap] = []
-    actions: list[ActionItem] = []
+class _Finding(NamedTuple):
+    score: int
+    gap: Gap | None = None
 
-    # Baseline: regulated orgs need stronger governance
-    if req.profile.regulated:
-        score += 10
-    else:
-        score += 5
 
+_REGULATED = features("regulated")
+_THIRD_PARTIES = features("third_parties")
+_CUSTOMERS = features("user:customers")
+_ANY_DATA = features(
+    "data:public",
+    "data:internal",
+    "data:personal",
+    "data:special_category",
+    "data:financial",
+    "data:health",
+)
+
+_PERSONAL_FINANCIAL = dict(
+    area="Personal/financial data controls",
+    why_it_matters="Customer or financial data requires strong governance and auditability.",
+    recommendation="Add input guardrails, approved prompt patterns, and audit logging for all AI usage.",
+)
+
+# Gaps are listed (and truncated to the top 5) in table order
+_RULES: list[Rule[_Finding]] = [
+    # Baseline: regulated orgs need stronger governance
+    Rule(_Finding(10), all_of=_REGULATED),
+    Rule(_Finding(5), none_of=_REGULATED),
     # Data risk factors
-    data = set(req.use_case.data_types)
-    if "special_category" in data or "health" in data:
-        gaps.append(
+    Rule(
+        _Finding(
+            5,
             Gap(
                 area="Sensitive data handling",
                 severity="high",
                 why_it_matters="Special category/health data increases regulatory and privacy risk.",
                 recommendation="Enforce strict data minimisation, redaction, and approval workflows before AI use.",
-            )
-        )
-        score += 5
-    if "financial" in data or "personal" in data:
-        gaps.append(
-            Gap(
-                area="Personal/financial data controls",
-                severity="high" if "financial" in data else "medium",
-                why_it_matters="Customer or financial data requires strong governance and auditability.",
-                recommendation="Add input guardrails, approved prompt patterns, and audit logging for all AI usage.",
-            )
-        )
-        score += 5
-    if not data:
-        gaps.append(
+            ),
+        ),
+        any_of=features("data:special_category", "data:health"),
+    ),
+    Rule(
+        _Finding(5, Gap(severity="high", **_PERSONAL_FINANCIAL)),
+        any_of=features("data:financial"),
+    ),
+    Rule(
+        _Finding(5, Gap(severity="medium", **_PERSONAL_FINANCIAL)),
+        all_of=features("data:personal"),
+        none_of=features("data:financial"),
+    ),
+    Rule(
+        _Finding(
+            0,
             Gap(
                 area="Data classification",
                 severity="medium",
                 why_it_matters="Unknown data types makes it hard to apply correct controls.",
                 recommendation="Define a simple data classification for the use case (public/internal/personal/special).",
-            )
-        )
-        score += 0
-
+            ),
+        ),
+        none_of=_ANY_DATA,
+    ),
     # Third-party / vendor risk
-    if req.use_case.third_parties:
-        gaps.append(
+    Rule(
+        _Finding(
+            5,
             Gap(
                 area="Third-party risk",
                 severity="high",
                 why_it_matters="External vendors add supply-chain, data residency, and contractual compliance risks.",
                 recommendation="Complete vendor due diligence, DPIA, and ensure contractual controls & logging are in place.",
-            )
-        )
-        score += 5
-    else:
-        score += 10
-
+            ),
+        ),
+        all_of=_THIRD_PARTIES,
+    ),
+    Rule(_Finding(10), none_of=_THIRD_PARTIES),
     # Channel risk
-    channels = set(req.use_case.channels)
-    if "email" in channels or "documents" in channels:
-        score += 10
-    if "voice" in channels:
-        gaps.append(
+    Rule(_Finding(10), any_of=features("channel:email", "channel:documents")),
+    Rule(
+        _Finding(
+            5,
             Gap(
                 area="Voice/call data",
                 severity="medium",
                 why_it_matters="Voice data often contains identifiers and can be hard to redact.",
                 recommendation="Implement redaction/transcription controls and restrict what can be processed.",
-            )
-        )
-        score += 5
-
+            ),
+        ),
+        all_of=features("channel:voice"),
+    ),
     # Users / access scope
-    users = set(req.use_case.users)
-    if "customers" in users:
-        gaps.append(
+    Rule(
+        _Finding(
+            5,
             Gap(
                 area="Customer-facing AI",
                 severity="high",
                 why_it_matters="Customer-facing AI increases reputational and conduct risk.",
                 recommendation="Add human oversight, clear disclaimers, and escalation paths. Log all interactions.",
-            )
-        )
-        score += 5
-    else:
-        score += 10
-
-    # Convert into a capped score with a sensible range
-    score = min(100, max(0, score + 30))  # +30 baseline so most orgs aren’t stuck at 0–20
-
-    # Action plan (always returned)
-    actions.extend(
-        [
-            ActionItem(
-                timeframe="30_days",
-                action="Define AI use policy for this use case and restrict sensitive inputs using guardrails.",
-                owner_role="Compliance / Risk",
-            ),
-            ActionItem(
-                timeframe="60_days",
-                action="Implement audit logging and a simple approval workflow for higher-risk prompts and outputs.",
-                owner_role="IT / Security",
             ),
-            ActionItem(
-                timeframe="90_days",
-                action="Run a DPIA and vendor due diligence (if applicable), then document controls and review cadence.",
-                owner_role="DPO / Governance Lead",
-            ),
-        ]
-    )
+        ),
+        all_of=_CUSTOMERS,
+    ),
+    Rule(_Finding(10), none_of=_CUSTOMERS),
+]
+
+# Action plan (always returned)
+_ACTION_PLAN = (
+    ActionItem(
+        timeframe="30_days",
+        action="Define AI use policy for this use case and restrict sensitive inputs using guardrails.",
+        owner_role="Compliance / Risk",
+    ),
+    ActionItem(
+        timeframe="60_days",
+        action="Implement audit logging and a simple approval workflow for higher-risk prompts and outputs.",
+        owner_role="IT / Security",
+    ),
+    ActionItem(
+        timeframe="90_days",
+        action="Run a DPIA and vendor due diligence (if applicable), then document controls and review cadence.",
+        owner_role="DPO / Governance Lead",
+    ),
+)
 
-    # Keep only top 5 gaps for MVP readability
-    top_gaps = gaps[:5]
 
+def _assessment(findings: list[_Finding]) -> AssessmentResponse:
+    # +30 baseline so most orgs aren’t stuck at 0–20, capped to a sensible range
+    score = min(100, max(0, sum(f.score for f in findings) + 30))
+    gaps = [f.gap for f in findings if f.gap is not None]
     return AssessmentResponse(
         maturity_score=score,
         maturity_level=_level(score),  # type: ignore[arg-type]
-        top_gaps=top_gaps,
-        action_plan=actions,
+        top_gaps=gaps[:5],  # Keep only top 5 gaps for MVP readability
+        action_plan=list(_ACTION_PLAN),
+    )
+
+
+_ASSESSMENTS = DecisionTable(_RULES, _assessment)
+
+_RULE_SCORES = np.array([rule.output.score for rule in _RULES])
+_GAP_RULES = [i for i, rule in enumerate(_RULES) if rule.output.gap is not None]
+# Every gap an assessment can report, in table order (columns of PortfolioScores.gaps)
+GAPS: tuple[Gap, ...] = tuple(_RULES[i].output.gap for i in _GAP_RULES)  # type: ignore[misc]
+
+
+class PortfolioScores(NamedTuple):
+    scores: np.ndarray  # maturity score per row
+    levels: np.ndarray  # index into MATURITY_LEVELS
+    gaps: np.ndarray  # rows x GAPS booleans: the (at most 5) top gaps reported
+
+
+def score_portfolio(masks: np.ndarray) -> PortfolioScores:
+    """
+    `run_maturity_assessment` for many use cases at once, from their feature masks:
+    the same decision table, evaluated as array operations over every row.
+    """
+    matched = _ASSESSMENTS.match_all(masks)
+    scores = np.clip(matched @ _RULE_SCORES + 30, 0, 100)
+    levels = np.searchsorted(_LEVEL_BOUNDS, scores, side="right")
+    gaps = matched[:, _GAP_RULES]
+    gaps &= np.cumsum(gaps, axis=1) <= 5
+    return PortfolioScores(scores, levels, gaps)
+
+
+def run_maturity_assessment(req: AssessmentRequest) -> AssessmentResponse:
+    """
+    Deterministic scoring for V1 MVP.
+    No LLM calls.
+
+    The rules are a decision table over the use case's features, evaluated for every
+    combination at startup: this is a lookup plus a copy of the result's lists.
+    """
+    result = _ASSESSMENTS.lookup(feature_mask(req.profile, req.use_case))
+    return result.model_copy(
+        update={"top_gaps": list(result.top_gaps), "action_plan": list(result.action_plan)}
     )
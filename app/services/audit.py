@@ -1,12 +1,143 @@
+import atexit
 import json
-from datetime import UTC, datetime
+import secrets
+import threading
+from datetime import UTC, datetime, timedelta
 from pathlib import Path
-from typing import Any
-from uuid import uuid4
+from typing import Any, NamedTuple
+from uuid import UUID
 
 from app.core.config import settings
+from app.services.audit_chain import AuditChain
+from app.services.audit_index import AuditIndex
+from app.services.audit_rollups import AuditRollups
+from app.services.audit_segments import AuditSegmentStore
+from app.services.audit_streams import AuditStream, claim_stream, list_streams
+from app.services.audit_writer import AuditWriter
 
-AUDIT_LOG_PATH = Path("logs") / "audit.jsonl"
+AUDIT_BASE_PATH = Path(settings.audit_log_path)
+
+
+class AuditLog(NamedTuple):
+    """This process's audit stream (one per server worker) and what writes and reads it."""
+
+    stream: AuditStream
+    writer: AuditWriter
+    segments: AuditSegmentStore
+    index: AuditIndex | None
+    rollups: AuditRollups | None
+    chain: AuditChain | None
+
+
+_audit_log: AuditLog | None = None
+_audit_log_lock = threading.Lock()
+
+
+def _open_audit_log() -> AuditLog:
+    stream = claim_stream(
+        AUDIT_BASE_PATH, Path(settings.audit_segments_dir), settings.audit_worker_id
+    )
+    index = (
+        AuditIndex(Path(settings.audit_index_path), stream.name)
+        if settings.audit_index_enabled
+        else None
+    )
+    rollups = (
+        AuditRollups(
+            Path(settings.audit_rollups_dir),
+            stream.name,
+            settings.audit_rollups_checkpoint_seconds,
+            settings.audit_retention_days,
+            settings.audit_rollups_max_contexts,
+        )
+        if settings.audit_rollups_enabled
+        else None
+    )
+    segments = AuditSegmentStore(
+        stream.segments_dir,
+        max_bytes=settings.audit_segment_max_bytes,
+        max_seconds=settings.audit_segment_max_seconds,
+        compress=settings.audit_compress_segments,
+        retention_days=settings.audit_retention_days,
+        index=index,
+    )
+    chain = (
+        AuditChain(
+            settings.audit_signing_key.encode() if settings.audit_signing_key else None,
+            settings.audit_signing_key_id,
+        )
+        if settings.audit_hash_chain
+        else None
+    )
+    writer = AuditWriter(
+        stream.active_path,
+        flush_interval=settings.audit_flush_interval_seconds,
+        max_batch=settings.audit_max_batch,
+        max_queue=settings.audit_queue_max_events,
+        fsync=settings.audit_fsync,
+        timeout=settings.audit_timeout_seconds,
+        segments=segments,
+        index=index,
+        rollups=rollups,
+        chain=chain,
+        file_format=settings.audit_format,
+    )
+    # Scripts and tests exit without the app lifespan: still write what is queued
+    atexit.register(writer.close)
+    return AuditLog(stream, writer, segments, index, rollups, chain)
+
+
+def get_audit_log() -> AuditLog:
+    """
+    Opened on first use rather than on import: claiming a stream holds one of the
+    per-worker slots for the life of the process, and scripts that only read the log
+    (the chain verifier) must neither take one nor start a writer.
+    """
+    global _audit_log
+    if _audit_log is None:
+        with _audit_log_lock:
+            if _audit_log is None:
+                _audit_log = _open_audit_log()
+    return _audit_log
+
+
+def close_audit_log() -> None:
+    """Writes out queued events and closes the index, if the log was ever opened."""
+    if _audit_log is None:
+        return
+    _audit_log.writer.close()
+    if _audit_log.index is not None:
+        _audit_log.index.close()
+
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=UTC)
+
+
+class _AuditClock:
+    """Timestamps and event ids that never go backwards within this process."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._last = _EPOCH
+
+    def next(self) -> tuple[str, str]:
+        with self._lock:
+            now = datetime.now(UTC)
+            if now <= self._last:
+                now = self._last + timedelta(microseconds=1)
+            self._last = now
+        # UUIDv7 layout: 48-bit Unix ms, version, sub-ms micros (12 bits), variant, random
+        ms, micros = divmod((now - _EPOCH) // timedelta(microseconds=1), 1000)
+        value = (ms << 80) | (0x7 << 76) | (micros << 64) | (0b10 << 62) | secrets.randbits(62)
+        return now.isoformat(), str(UUID(int=value))
+
+
+_audit_clock = _AuditClock()
+
+
+def all_audit_streams() -> list[AuditStream]:
+    """Every worker's audit stream, for reads that merge them (see read_merged)."""
+    return list_streams(AUDIT_BASE_PATH, Path(settings.audit_segments_dir))
 
 
 def write_audit_event(
@@ -17,29 +148,41 @@ def write_audit_event(
     client_ip: str | None,
     outcome: str,
     details: dict[str, Any],
+    durable: bool | None = None,
 ) -> str:
     """
-    Writes one line per event to logs/audit.jsonl (JSONL format).
-    MVP-friendly audit trail: easy to parse, easy to ship later.
+    Writes one line per event to logs/audit.jsonl (JSONL format; each server worker
+    has its own file, see AuditStream). MVP-friendly audit trail: easy to parse,
+    easy to ship later.
+
+    The line is queued for the background writer; with `durable` (default
+    AUDIT_DURABLE) this returns only once it is on disk. Raises
+    AuditBackpressureError when the writer cannot keep up. The timestamp and the
+    time-ordered event id are stamped as the line is queued, so both only increase
+    along the file.
     """
-    AUDIT_LOG_PATH.parent.mkdir(parents=True, exist_ok=True)
-
-    event_id = str(uuid4())
-    payload = {
-        "event_id": event_id,
-        "timestamp_utc": datetime.now(UTC).isoformat(),
-        "environment": settings.environment,
-        "event_type": event_type,
-        "http": {
-            "path": path,
-            "method": method,
-            "client_ip": client_ip,
-        },
-        "outcome": outcome,
-        "details": details,
-    }
-
-    with AUDIT_LOG_PATH.open("a", encoding="utf-8") as f:
-        f.write(json.dumps(payload, ensure_ascii=False) + "\n")
-
-    return event_id
+    stamped: dict[str, str] = {}
+
+    def build() -> tuple[bytes, str, str]:
+        timestamp, stamped["event_id"] = _audit_clock.next()
+        payload = {
+            "event_id": stamped["event_id"],
+            "timestamp_utc": timestamp,
+            "environment": settings.environment,
+            "event_type": event_type,
+            "http": {
+                "path": path,
+                "method": method,
+                "client_ip": client_ip,
+            },
+            "outcome": outcome,
+            "details": details,
+        }
+        line = json.dumps(payload, ensure_ascii=False) + "\n"
+        return line.encode("utf-8"), timestamp, event_type
+
+    get_audit_log().writer.write_stamped(
+        build, settings.audit_durable if durable is None else durable
+    )
+
+    return stamped["event_id"]
@@ -0,0 +1,350 @@
+"""
+Tamper evidence for the audit log: a hash chain over every line, and one signed
+Merkle root per written batch.
+
+    python -m app.services.audit_chain                 # verify every worker's segments and active file
+    python -m app.services.audit_chain FILE [FILE ...] --workers 4
+
+The exit code is 1 when a link, seal or signature does not verify.
+"""
+
+import argparse
+import hashlib
+import hmac
+import json
+import multiprocessing
+import os
+import sys
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import NamedTuple
+
+from app.services.audit_codec import iter_records, last_line
+from app.services.audit_segments import AuditSegmentStore, SegmentManifest, open_segment
+
+GENESIS = "0" * 64
+SEAL_EVENT_TYPE = "audit_seal"
+
+_TAG = b'"chain":"'
+_SEAL_MARK = b'"event_type": "audit_seal"'
+_SUFFIX_LEN = len(_TAG) + 64 + len(b'"}\n')
+# Lines per verification task; chunks end on a seal so each task checks whole batches
+_CHUNK_LINES = 20000
+
+
+def link(head: str, line: bytes) -> tuple[bytes, str]:
+    """
+    Chains one JSONL object line after `head`: the new head is sha256(head || line),
+    stored as the line's last field ("chain"). Returns the line to write and the new head.
+    """
+    digest = hashlib.sha256(bytes.fromhex(head) + line).hexdigest()
+    body = line[:-2]  # drop "}\n"
+    separator = b"" if body == b"{" else b","
+    return b'%s%s%s%s"}\n' % (body, separator, _TAG, digest.encode()), digest
+
+
+def unlink(line: bytes) -> tuple[bytes, str] | None:
+    """The line as it was before `link`, and its stored chain hash; None if it has none."""
+    if len(line) < _SUFFIX_LEN + 1 or not line.endswith(b'"}\n'):
+        return None
+    tag_start = len(line) - _SUFFIX_LEN
+    if line[tag_start : tag_start + len(_TAG)] != _TAG:
+        return None
+    body = line[:tag_start]
+    if body.endswith(b","):
+        body = body[:-1]
+    elif body != b"{":
+        return None
+    digest = line[tag_start + len(_TAG) : -3]
+    if digest.strip(b"0123456789abcdef"):
+        return None
+    return body + b"}\n", digest.decode()
+
+
+def merkle_root(lines: list[bytes]) -> str:
+    """Root of a binary Merkle tree over the lines (leaf and node hashes domain-separated)."""
+    level = [hashlib.sha256(b"\x00" + line).digest() for line in lines]
+    if not level:
+        return GENESIS
+    while len(level) > 1:
+        paired = [
+            hashlib.sha256(b"\x01" + level[i] + level[i + 1]).digest()
+            for i in range(0, len(level) - 1, 2)
+        ]
+        if len(level) % 2:
+            paired.append(level[-1])  # an odd node is promoted unchanged
+        level = paired
+    return level[0].hex()
+
+
+def _signature(key: bytes, timestamp: str, events: int, root: str, head: str) -> str:
+    message = f"{timestamp}|{events}|{root}|{head}".encode()
+    return hmac.new(key, message, hashlib.sha256).hexdigest()
+
+
+class SealedBatch(NamedTuple):
+    lines: list[bytes]  # the chained event lines, then the chained seal line
+    head: str  # chain head after the seal
+    timestamp: str  # the seal's timestamp_utc
+
+
+class AuditChain:
+    """
+    Chains audit lines and seals each written batch.
+
+    Every line carries sha256(previous line's hash || line), so removing, reordering
+    or editing a line breaks the link of the next one. After each batch the writer
+    appends one "audit_seal" line (itself chained) with the batch's event count,
+    Merkle root and last chain hash, HMAC-SHA256-signed with `key` when one is set:
+    one signature per batch instead of one per event. Hashing and signing run on the
+    audit writer thread, never on the request path.
+    """
+
+    def __init__(self, key: bytes | None = None, key_id: str = "default"):
+        self.key = key
+        self.key_id = key_id
+
+    def seal_batch(self, head: str, lines: list[bytes], timestamp: str = "") -> SealedBatch:
+        """
+        Chains `lines` after `head` and appends their seal. The seal takes `timestamp`
+        (the batch's last event time) so the file stays in timestamp order.
+        """
+        chained = []
+        for line in lines:
+            line, head = link(head, line)
+            chained.append(line)
+        timestamp = timestamp or datetime.now(UTC).isoformat()
+        root = merkle_root(chained)
+        seal = {
+            "events": len(chained),
+            "merkle_root": root,
+            "chain_head": head,
+            "key_id": self.key_id if self.key else None,
+            "signature": (
+                _signature(self.key, timestamp, len(chained), root, head) if self.key else None
+            ),
+        }
+        record = {"timestamp_utc": timestamp, "event_type": SEAL_EVENT_TYPE, "seal": seal}
+        seal_line, head = link(head, json.dumps(record).encode() + b"\n")
+        return SealedBatch([*chained, seal_line], head, timestamp)
+
+
+def recover_head(active_path: Path, segments: AuditSegmentStore | None = None) -> str:
+    """Chain head to continue from: the active file's last line, else the newest segment's."""
+    line = last_line(active_path)
+    if line is not None:
+        linked = unlink(line)
+        if linked is not None:
+            return linked[1]
+    if segments is not None:
+        closed = segments.manifest.segments()
+        if closed and closed[-1].get("chain_head"):
+            return closed[-1]["chain_head"]
+    return GENESIS
+
+
+class VerifyTarget(NamedTuple):
+    path: Path
+    prev: str | None  # chain head before the file's first line; None: not checked
+    expected_head: str | None = None  # the file's last hash per the manifest (truncation check)
+
+
+class VerifyReport(NamedTuple):
+    events: int
+    seals: int
+    unverified_seals: int  # signature not checked: no key given
+    unsealed_events: int  # after the last seal (a batch interrupted mid-write)
+    head: str | None
+    error: str | None  # "<file>:<line>: <reason>" of the first broken link
+
+
+class _ChunkResult(NamedTuple):
+    events: int
+    seals: int
+    unverified: int
+    pending: int
+    error: tuple[int, str] | None
+
+
+def _verify_chunk(
+    start: int, prev: str | None, lines: list[bytes], key: bytes | None
+) -> _ChunkResult:
+    events = seals = unverified = 0
+    batch: list[bytes] = []
+    for number, line in enumerate(lines, start):
+        linked = unlink(line)
+        if linked is None:
+            return _ChunkResult(events, seals, unverified, len(batch), (number, "no chain hash"))
+        original, digest = linked
+        if (
+            prev is not None
+            and hashlib.sha256(bytes.fromhex(prev) + original).hexdigest() != digest
+        ):
+            return _ChunkResult(
+                events, seals, unverified, len(batch), (number, "chain hash mismatch")
+            )
+        # Only seal lines are parsed: the chain already covers every byte of the others
+        try:
+            record = json.loads(original) if _SEAL_MARK in original else {}
+        except ValueError:
+            return _ChunkResult(events, seals, unverified, len(batch), (number, "not JSON"))
+        if not isinstance(record, dict) or record.get("event_type") != SEAL_EVENT_TYPE:
+            batch.append(line)
+            events += 1
+            prev = digest
+            continue
+        seal = record.get("seal") if isinstance(record.get("seal"), dict) else {}
+        signature = seal.get("signature")
+        reason = None
+        if seal.get("events") != len(batch):
+            reason = "seal event count mismatch"
+        elif seal.get("merkle_root") != merkle_root(batch):
+            reason = "Merkle root mismatch"
+        elif seal.get("chain_head") != prev:
+            reason = "seal chain head mismatch"
+        elif key is None:
+            unverified += 1
+        elif not (isinstance(signature, str) and signature.isascii()):
+            reason = "unsigned seal"  # a key is expected: unsigned seals could be forged
+        elif not hmac.compare_digest(
+            signature,
+            _signature(
+                key, str(record.get("timestamp_utc")), len(batch), seal["merkle_root"], prev or ""
+            ),
+        ):
+            reason = "bad seal signature"
+        if reason is not None:
+            return _ChunkResult(events, seals, unverified, len(batch), (number, reason))
+        seals += 1
+        batch = []
+        prev = digest
+    return _ChunkResult(events, seals, unverified, len(batch), None)
+
+
+def _chunks(path: Path):
+    """(first line number, lines) in chunks of about _CHUNK_LINES, each ending on a seal."""
+    chunk: list[bytes] = []
+    start = 1
+    with open_segment(path) as fh:
+        for number, (line, _) in enumerate(iter_records(fh), 1):
+            chunk.append(line)
+            if len(chunk) >= _CHUNK_LINES and _SEAL_MARK in line:
+                yield start, chunk
+                chunk, start = [], number + 1
+    if chunk:
+        yield start, chunk
+
+
+def verify_log(
+    targets: list[VerifyTarget], key: bytes | None = None, workers: int | None = None
+) -> VerifyReport:
+    """
+    Verifies files in order, in parallel: each file is cut into chunks of whole batches,
+    checked by a pool of `workers` processes (default: every core). Every link is
+    checkable on its own (the previous hash is stored in the previous line), so
+    chunks are independent. Stops at the first broken link.
+    """
+    workers = workers or os.cpu_count() or 1
+    pool = (
+        ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"))
+        if workers > 1
+        else None
+    )
+    totals = [0, 0, 0, 0]
+    head: str | None = None
+    pending: deque[tuple[Path, Future[_ChunkResult] | _ChunkResult]] = deque()
+
+    def settle(limit: int) -> str | None:
+        while len(pending) > limit:
+            path, result = pending.popleft()
+            if isinstance(result, Future):
+                result = result.result()
+            for i, value in enumerate(result[:4]):
+                totals[i] += value
+            if result.error is not None:
+                number, reason = result.error
+                return f"{path}:{number}: {reason}"
+        return None
+
+    try:
+        for target in targets:
+            prev = target.prev
+            for start, lines in _chunks(target.path):
+                if pool is None:
+                    pending.append((target.path, _verify_chunk(start, prev, lines, key)))
+                else:
+                    future = pool.submit(_verify_chunk, start, prev, lines, key)
+                    pending.append((target.path, future))
+                linked = unlink(lines[-1])
+                prev = head = linked[1] if linked is not None else None
+                # Bounded read-ahead: at most two chunks per worker in memory
+                error = settle(2 * workers)
+                if error:
+                    return VerifyReport(*totals, None, error)
+            error = settle(0)
+            if error:
+                return VerifyReport(*totals, None, error)
+            if target.expected_head is not None and head != target.expected_head:
+                error = f"{target.path}: last hash differs from the manifest (truncated?)"
+                return VerifyReport(*totals, None, error)
+        return VerifyReport(*totals, head, None)
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+
+def log_targets(active_path: Path, segments_dir: Path) -> list[VerifyTarget]:
+    """
+    One stream's closed segments (oldest first), then its active file, each anchored
+    on the previous.
+    """
+    manifest = SegmentManifest(segments_dir)
+    targets = []
+    prev: str | None = GENESIS
+    expected_seq = 1
+    for segment in manifest.segments():
+        if segment["seq"] != expected_seq:
+            prev = None  # earlier segments were removed by retention: anchor not known
+        targets.append(
+            VerifyTarget(segments_dir / segment["file"], prev, segment.get("chain_head"))
+        )
+        prev = segment.get("chain_head")
+        expected_seq = segment["seq"] + 1
+    if manifest.next_seq() != expected_seq:
+        prev = None
+    if active_path.exists():
+        targets.append(VerifyTarget(active_path, prev))
+    return targets
+
+
+def main(argv: list[str] | None = None) -> int:
+    from app.core.config import settings
+    from app.services.audit import all_audit_streams
+
+    parser = argparse.ArgumentParser(description="Verify the audit log's hash chain and seals")
+    parser.add_argument(
+        "files", nargs="*", type=Path, help="default: every worker's segments and active file"
+    )
+    parser.add_argument("--workers", type=int, default=None, help="default: every core")
+    args = parser.parse_args(argv)
+
+    if args.files:
+        # The links into each file's first line cannot be checked without the manifest
+        targets = [VerifyTarget(path, None) for path in args.files]
+    else:
+        # Each worker's stream is a chain of its own
+        targets = [
+            target
+            for stream in all_audit_streams()
+            for target in log_targets(stream.active_path, stream.segments_dir)
+        ]
+    key = settings.audit_signing_key.encode() if settings.audit_signing_key else None
+    report = verify_log(targets, key, args.workers)
+    print(json.dumps(report._asdict(), indent=2))
+    return 1 if report.error else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,418 @@
+"""
+Compact binary encoding of the audit log, convertible back to JSONL byte for byte.
+
+    python -m app.services.audit_codec to-jsonl FILE [-o OUT]    # binary (or JSONL, .gz) to JSONL
+    python -m app.services.audit_codec to-binary FILE -o OUT
+
+A binary file starts with MAGIC, then holds one record per JSONL line: a varint
+length, a kind byte and the line's JSON value in a tagged encoding. Strings (keys,
+event types, finding types, recommendations, paths...) are interned per file: the
+first occurrence is written once and later ones are a small integer. Canonical
+UUIDs, UTC timestamps and lowercase hex digests (the chain hash, seals' Merkle
+roots and signatures) are stored as 16 bytes, a varint and raw bytes.
+
+Decoding re-serialises the value exactly as the audit writer does, so the JSONL is
+identical to what would have been written, hash chain included. A line that would
+not re-serialise identically (written by another tool, torn, not JSON) is stored
+verbatim instead, so conversion is lossless for any input.
+"""
+
+import argparse
+import json
+import os
+import re
+import struct
+import sys
+from collections import deque
+from collections.abc import Iterator
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+from typing import IO, Any, Literal
+from uuid import UUID
+
+AuditFormat = Literal["jsonl", "binary"]
+
+# Not valid UTF-8 and not "{": a binary file is never mistaken for JSONL
+MAGIC = b"\x89SGAUDIT\x01\n"
+
+_KIND_RAW = 0  # the line, verbatim
+_KIND_VALUE = 1  # a JSON value
+_KIND_CHAINED = 2  # a 32-byte chain hash, then a JSON object (see audit_chain.link)
+
+_NULL, _FALSE, _TRUE, _INT, _FLOAT = range(5)
+_STR_NEW, _STR_REF, _STR_INLINE, _UUID, _TIMESTAMP, _HEX, _LIST, _DICT = range(5, 13)
+# Tags from here on are references to the first interned strings in one byte
+_SHORT_REF = 0x20
+
+# Only short strings are interned, and at most this many per file: long free text is
+# rarely repeated and would only grow the table
+_INTERN_MAX_CHARS = 128
+_INTERN_MAX_STRINGS = 1 << 16
+
+# The field audit_chain.link appends to each line
+_CHAIN_TAG = b'"chain":"'
+_CHAIN_SUFFIX_LEN = len(_CHAIN_TAG) + 64 + len(b'"}\n')
+
+_UUID_RE = re.compile(r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}")
+_HEX_RE = re.compile(r"(?:[0-9a-f]{2}){8,}")  # digests, signatures, ruleset versions
+_TIMESTAMP_RE = re.compile(r"\d{4}-\d\d-\d\dT\d\d:\d\d:\d\d(\.\d{6})?\+00:00")
+_EPOCH = datetime(1970, 1, 1, tzinfo=UTC)
+_DOUBLE = struct.Struct("<d")
+
+_READ_SIZE = 1024 * 1024
+
+
+def _varint(value: int) -> bytes:
+    out = bytearray()
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+def _zigzag(value: int) -> int:
+    return value << 1 if value >= 0 else ((-value) << 1) - 1
+
+
+def _unzigzag(value: int) -> int:
+    return value >> 1 if not value & 1 else -(value >> 1) - 1
+
+
+def _split_chain(line: bytes) -> tuple[bytes, bytes | None]:
+    """The line without its chain field, and the field's hash; (line, None) if it has none."""
+    if len(line) < _CHAIN_SUFFIX_LEN + 1 or not line.endswith(b'"}\n'):
+        return line, None
+    tag_start = len(line) - _CHAIN_SUFFIX_LEN
+    if line[tag_start : tag_start + len(_CHAIN_TAG)] != _CHAIN_TAG:
+        return line, None
+    body = line[:tag_start]
+    if body.endswith(b","):
+        body = body[:-1]
+    elif body != b"{":
+        return line, None
+    digest = line[tag_start + len(_CHAIN_TAG) : -3]
+    if digest.strip(b"0123456789abcdef"):
+        return line, None
+    return body + b"}\n", bytes.fromhex(digest.decode())
+
+
+def _join_chain(line: bytes, digest: bytes) -> bytes:
+    body = line[:-2]
+    separator = b"" if body == b"{" else b","
+    return b'%s%s%s%s"}\n' % (body, separator, _CHAIN_TAG, digest.hex().encode())
+
+
+def _timestamp_micros(value: str) -> int | None:
+    match = _TIMESTAMP_RE.fullmatch(value)
+    # isoformat() omits a zero fraction: ".000000" would not come back as written
+    if match is None or match.group(1) == ".000000":
+        return None
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    return (parsed - _EPOCH) // timedelta(microseconds=1)
+
+
+class BinaryEncoder:
+    """Encodes JSONL lines into records of one binary file (its string table is per file)."""
+
+    def __init__(self) -> None:
+        self._ids: dict[str, int] = {}
+
+    @classmethod
+    def resume(cls, path: Path) -> tuple["BinaryEncoder", int]:
+        """
+        An encoder appending to the binary file `path`, and the end of its last
+        complete record (anything after it is a torn write).
+        """
+        decoder = BinaryDecoder()
+        with open(path, "rb") as fh:
+            if fh.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a binary audit file")
+            last = deque(_binary_records(fh, decoder, 0), maxlen=1)
+        encoder = cls()
+        encoder._ids = {s: i for i, s in enumerate(decoder.strings)}
+        return encoder, last[0][1] if last else len(MAGIC)
+
+    def encode(self, line: bytes) -> bytes:
+        """One length-prefixed record for one JSONL line."""
+        payload = self._payload(line)
+        return _varint(len(payload)) + payload
+
+    def _payload(self, line: bytes) -> bytes:
+        body, digest = _split_chain(line)
+        try:
+            value = json.loads(body)
+            # The audit writer's serialisation; anything else is kept verbatim
+            exact = json.dumps(value, ensure_ascii=False).encode() + b"\n" == body
+        except ValueError:  # not JSON, or not encodable (lone surrogates)
+            exact = False
+        if not exact:
+            return bytes([_KIND_RAW]) + line
+        out = bytearray([_KIND_VALUE] if digest is None else [_KIND_CHAINED])
+        if digest is not None:
+            out += digest
+        self._value(value, out)
+        return bytes(out)
+
+    def _value(self, value: Any, out: bytearray) -> None:
+        if value is None:
+            out.append(_NULL)
+        elif value is True:
+            out.append(_TRUE)
+        elif value is False:
+            out.append(_FALSE)
+        elif isinstance(value, int):
+            out.append(_INT)
+            out += _varint(_zigzag(value))
+        elif isinstance(value, float):
+            out.append(_FLOAT)
+            out += _DOUBLE.pack(value)
+        elif isinstance(value, str):
+            if len(value) == 36 and _UUID_RE.fullmatch(value):
+                out.append(_UUID)
+                out += UUID(value).bytes
+                return
+            micros = _timestamp_micros(value) if len(value) in (25, 32) else None
+            if micros is not None:
+                out.append(_TIMESTAMP)
+                out += _varint(_zigzag(micros))
+                return
+            if _HEX_RE.fullmatch(value):
+                out.append(_HEX)
+                out += _varint(len(value) // 2)
+                out += bytes.fromhex(value)
+                return
+            self._string(value, out)
+        elif isinstance(value, list):
+            out.append(_LIST)
+            out += _varint(len(value))
+            for item in value:
+                self._value(item, out)
+        else:
+            out.append(_DICT)
+            out += _varint(len(value))
+            for key, item in value.items():
+                self._string(key, out)
+                self._value(item, out)
+
+    def _string(self, value: str, out: bytearray) -> None:
+        string_id = self._ids.get(value)
+        if string_id is not None:
+            if string_id < 0x100 - _SHORT_REF:
+                out.append(_SHORT_REF + string_id)
+            else:
+                out.append(_STR_REF)
+                out += _varint(string_id)
+            return
+        data = value.encode("utf-8")
+        if len(value) <= _INTERN_MAX_CHARS and len(self._ids) < _INTERN_MAX_STRINGS:
+            self._ids[value] = len(self._ids)
+            out.append(_STR_NEW)
+        else:
+            out.append(_STR_INLINE)
+        out += _varint(len(data))
+        out += data
+
+
+class BinaryDecoder:
+    """Decodes the records of one binary file, in order, back into JSONL lines."""
+
+    def __init__(self) -> None:
+        self.strings: list[str] = []
+        self._data = b""
+        self._pos = 0
+
+    def decode(self, payload: bytes) -> bytes:
+        kind = payload[0]
+        if kind == _KIND_RAW:
+            return payload[1:]
+        self._data = payload
+        self._pos = 33 if kind == _KIND_CHAINED else 1
+        value = self._value()
+        line = json.dumps(value, ensure_ascii=False).encode() + b"\n"
+        return line if kind == _KIND_VALUE else _join_chain(line, payload[1:33])
+
+    def _varint(self) -> int:
+        data, pos = self._data, self._pos
+        result = shift = 0
+        while True:
+            byte = data[pos]
+            pos += 1
+            result |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                self._pos = pos
+                return result
+            shift += 7
+
+    def _bytes(self, size: int) -> bytes:
+        start = self._pos
+        self._pos += size
+        return self._data[start : self._pos]
+
+    def _value(self) -> Any:
+        tag = self._data[self._pos]
+        self._pos += 1
+        if tag == _NULL:
+            return None
+        if tag == _TRUE:
+            return True
+        if tag == _FALSE:
+            return False
+        if tag == _INT:
+            return _unzigzag(self._varint())
+        if tag == _FLOAT:
+            return _DOUBLE.unpack(self._bytes(8))[0]
+        if tag == _UUID:
+            return str(UUID(bytes=self._bytes(16)))
+        if tag == _TIMESTAMP:
+            return (_EPOCH + timedelta(microseconds=_unzigzag(self._varint()))).isoformat()
+        if tag == _HEX:
+            return self._bytes(self._varint()).hex()
+        if tag == _LIST:
+            return [self._value() for _ in range(self._varint())]
+        if tag == _DICT:
+            result = {}
+            for _ in range(self._varint()):
+                key_tag = self._data[self._pos]
+                self._pos += 1
+                key = self._string(key_tag)
+                result[key] = self._value()
+            return result
+        return self._string(tag)
+
+    def _string(self, tag: int) -> str:
+        if tag >= _SHORT_REF:
+            return self.strings[tag - _SHORT_REF]
+        if tag == _STR_REF:
+            return self.strings[self._varint()]
+        if tag not in (_STR_NEW, _STR_INLINE):
+            raise ValueError(f"Unknown audit record tag {tag}")
+        value = self._bytes(self._varint()).decode("utf-8")
+        if tag == _STR_NEW:
+            self.strings.append(value)
+        return value
+
+
+def _binary_records(
+    fh: IO[bytes], decoder: BinaryDecoder, start: int
+) -> Iterator[tuple[bytes, int]]:
+    """(line, end offset) of each complete record after MAGIC; a torn last record is skipped."""
+    buffer = b""
+    pos = 0
+    offset = len(MAGIC)  # file offset of buffer[0]
+    while True:
+        chunk = fh.read(_READ_SIZE)
+        if not chunk:
+            return
+        buffer = buffer[pos:] + chunk
+        offset += pos
+        pos = 0
+        while True:
+            size = shift = 0
+            cursor = pos
+            while cursor < len(buffer):
+                byte = buffer[cursor]
+                cursor += 1
+                size |= (byte & 0x7F) << shift
+                if byte < 0x80:
+                    break
+                shift += 7
+            else:
+                break  # length prefix not complete yet
+            if cursor + size > len(buffer):
+                break
+            line = decoder.decode(buffer[cursor : cursor + size])
+            pos = cursor + size
+            if offset + pos > start:
+                yield line, offset + pos
+
+
+def iter_records(fh: IO[bytes], start: int = 0) -> Iterator[tuple[bytes, int]]:
+    """
+    (JSONL line, end offset in the file) of each record of an audit file of either
+    format, from the record ending after byte `start`. `fh` must be at the file's start.
+    JSONL is read from `start` directly; a binary file is decoded from its beginning
+    (its string table is), lines before `start` are not returned.
+    """
+    if fh.read(len(MAGIC)) == MAGIC:
+        yield from _binary_records(fh, BinaryDecoder(), start)
+        return
+    offset = fh.seek(start)
+    for line in fh:
+        offset += len(line)
+        yield line, offset
+
+
+def detect_format(path: Path) -> AuditFormat | None:
+    """Format of an audit file by its content; None when it is missing or empty."""
+    try:
+        with open(path, "rb") as fh:
+            head = fh.read(len(MAGIC))
+    except FileNotFoundError:
+        return None
+    if not head:
+        return None
+    return "binary" if head == MAGIC else "jsonl"
+
+
+def last_line(path: Path) -> bytes | None:
+    """Last line of a plain (uncompressed) audit file of either format."""
+    try:
+        with open(path, "rb") as fh:
+            if fh.read(len(MAGIC)) == MAGIC:
+                fh.seek(0)
+                last = deque(iter_records(fh), maxlen=1)
+                return last[0][0] if last else None
+            # JSONL: read backwards from the end
+            end = fh.seek(0, os.SEEK_END)
+            block = b""
+            position = end
+            while position > 0:
+                step = min(64 * 1024, position)
+                position -= step
+                fh.seek(position)
+                block = fh.read(step) + block
+                start = block.rfind(b"\n", 0, len(block) - 1)
+                if start >= 0:
+                    return block[start + 1 :]
+            return block or None
+    except FileNotFoundError:
+        return None
+
+
+def convert(source: IO[bytes], target: IO[bytes], to: AuditFormat) -> int:
+    """Writes every line of `source` (either format) to `target` in format `to`; returns lines."""
+    encoder = BinaryEncoder() if to == "binary" else None
+    if encoder is not None:
+        target.write(MAGIC)
+    lines = 0
+    for line, _ in iter_records(source):
+        target.write(line if encoder is None else encoder.encode(line))
+        lines += 1
+    return lines
+
+
+def main(argv: list[str] | None = None) -> int:
+    from app.services.audit_segments import open_segment
+
+    parser = argparse.ArgumentParser(description="Convert audit files between JSONL and binary")
+    parser.add_argument("command", choices=["to-jsonl", "to-binary"])
+    parser.add_argument("file", type=Path, help="audit file or segment (.gz is decompressed)")
+    parser.add_argument("-o", "--output", type=Path, default=None, help="default: stdout")
+    args = parser.parse_args(argv)
+
+    to: AuditFormat = "jsonl" if args.command == "to-jsonl" else "binary"
+    with open_segment(args.file) as source:
+        if args.output is None:
+            convert(source, sys.stdout.buffer, to)
+        else:
+            with open(args.output, "wb") as target:
+                convert(source, target, to)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
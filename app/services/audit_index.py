@@ -0,0 +1,362 @@
+import base64
+import binascii
+import json
+import logging
+import sqlite3
+import threading
+from collections.abc import Iterable, Iterator
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Literal, NamedTuple
+
+from app.services.audit_codec import iter_records
+from app.services.audit_segments import open_segment, utc_isoformat
+
+logger = logging.getLogger(__name__)
+
+SortOrder = Literal["asc", "desc"]
+
+# Bumped when the schema changes: an index of another version is dropped and rebuilt
+_SCHEMA_VERSION = 2
+_SCHEMA = f"""
+DROP TABLE IF EXISTS events;
+DROP TABLE IF EXISTS event_findings;
+CREATE TABLE events (
+    id INTEGER PRIMARY KEY,
+    ts TEXT NOT NULL,
+    event_type TEXT NOT NULL,
+    outcome TEXT NOT NULL,
+    path TEXT NOT NULL,
+    stream TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    end_offset INTEGER NOT NULL,
+    line TEXT NOT NULL
+);
+CREATE INDEX events_ts ON events (ts);
+CREATE INDEX events_type_ts ON events (event_type, ts);
+CREATE INDEX events_outcome_ts ON events (outcome, ts);
+CREATE INDEX events_path_ts ON events (path, ts);
+CREATE INDEX events_seq ON events (stream, seq, end_offset);
+CREATE TABLE event_findings (
+    finding_type TEXT NOT NULL,
+    ts TEXT NOT NULL,
+    event_id INTEGER NOT NULL,
+    PRIMARY KEY (finding_type, ts, event_id)
+) WITHOUT ROWID;
+PRAGMA user_version = {_SCHEMA_VERSION}
+"""
+
+# Rows per read transaction when exporting, so a long export never pins a WAL snapshot
+_EXPORT_PAGE = 1000
+
+
+class AuditQuery(NamedTuple):
+    """Filters of an audit query; None matches everything. Time bounds are [since, until)."""
+
+    since: datetime | None = None
+    until: datetime | None = None
+    event_type: str | None = None
+    outcome: str | None = None
+    path: str | None = None
+    finding_type: str | None = None
+
+
+def encode_cursor(ts: str, event_id: int) -> str:
+    return base64.urlsafe_b64encode(f"{ts}|{event_id}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[str, int]:
+    """Raises ValueError for a cursor this index did not issue."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        ts, event_id = raw.rsplit("|", 1)
+        return ts, int(event_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError("Invalid cursor") from None
+
+
+def finding_types(details: Any) -> set[str]:
+    """Finding types an event names: its findings, its guardrail scan's, or batch totals."""
+    types: set[str] = set()
+    if not isinstance(details, dict):
+        return types
+    for scope in (details, details.get("guardrail")):
+        if not isinstance(scope, dict):
+            continue
+        for finding in scope.get("findings") or ():
+            if isinstance(finding, dict) and isinstance(finding.get("type"), str):
+                types.add(finding["type"])
+        totals = scope.get("finding_totals")
+        if isinstance(totals, dict):
+            types.update(totals)
+    return types
+
+
+class _Row(NamedTuple):
+    ts: str
+    event_type: str
+    outcome: str
+    path: str
+    line: str
+    finding_types: set[str]
+
+
+def _parse(line: bytes) -> _Row | None:
+    try:
+        event = json.loads(line)
+    except ValueError:
+        return None
+    if not isinstance(event, dict):
+        return None
+    http = event.get("http") if isinstance(event.get("http"), dict) else {}
+    return _Row(
+        str(event.get("timestamp_utc") or ""),
+        str(event.get("event_type") or ""),
+        str(event.get("outcome") or ""),
+        str(http.get("path") or ""),
+        line.decode("utf-8").rstrip("\n"),
+        finding_types(event.get("details")),
+    )
+
+
+def scan(query: AuditQuery, lines: Iterable[bytes]) -> Iterator[str]:
+    """
+    Lines matching the query's field filters, without an index (the caller bounds
+    the time range, see read_merged): one JSON parse per line.
+    """
+    for line in lines:
+        row = _parse(line)
+        if row is None:
+            continue
+        if query.event_type is not None and row.event_type != query.event_type:
+            continue
+        if query.outcome is not None and row.outcome != query.outcome:
+            continue
+        if query.path is not None and row.path != query.path:
+            continue
+        if query.finding_type is not None and query.finding_type not in row.finding_types:
+            continue
+        yield row.line
+
+
+class AuditIndex:
+    """
+    SQLite sidecar index of the audit log, for filtered, paginated queries.
+
+    One row per event: the indexed fields (time, event type, outcome, http.path and
+    the finding types it names), the segment it belongs to, and the JSONL line
+    itself, so a query never has to open (or decompress) a segment. The writer
+    thread adds each batch once it is committed to the log; segment retention drops
+    rows with their segments. The log stays the source of truth: `catch_up` indexes
+    lines written but not indexed before a crash, and segments missing from the
+    index are re-indexed from their files (see AuditSegmentStore).
+
+    Results are ordered by (timestamp, id) and paginated by keyset: a cursor holds
+    the last row's sort key, so every page is one index range scan however deep it
+    is. The database runs in WAL mode: queries read a snapshot and never wait for
+    the writer.
+
+    Every writer process (see AuditStream) shares the database, adding and dropping
+    rows of its own `stream` only; queries cover all streams.
+    """
+
+    def __init__(self, path: Path, stream: str = "0"):
+        self.path = Path(path)
+        self.stream = stream
+        self._lock = threading.Lock()  # the write connection: writer and maintenance threads
+        self._conn: sqlite3.Connection | None = None
+        self._local = threading.local()  # one read connection per thread
+        self._readers: list[sqlite3.Connection] = []
+
+    def add(self, seq: int, records: Iterable[tuple[bytes, int]]) -> None:
+        """Indexes lines of segment `seq`, given with the file offset each ends at."""
+        rows = []
+        for line, offset in records:
+            row = _parse(line)
+            if row is not None:
+                rows.append((row, seq, offset))
+        if rows:
+            self._insert(rows)
+
+    def catch_up(self, seq: int, path: Path) -> None:
+        """Indexes lines of the active file `path` written after its last indexed line."""
+        with self._lock:
+            (indexed,) = (
+                self._writer()
+                .execute(
+                    "SELECT COALESCE(MAX(end_offset), 0) FROM events WHERE stream = ? AND seq = ?",
+                    (self.stream, seq),
+                )
+                .fetchone()
+            )
+        try:
+            with open(path, "rb") as fh:
+                self.add(seq, iter_records(fh, indexed))
+        except FileNotFoundError:
+            pass
+
+    def add_segment(self, seq: int, path: Path) -> None:
+        """Indexes a whole closed segment (in one transaction: all or nothing)."""
+        with open_segment(path) as fh:
+            self.add(seq, iter_records(fh))
+
+    def indexed_segments(self) -> set[int]:
+        with self._lock:
+            rows = self._writer().execute(
+                "SELECT DISTINCT seq FROM events WHERE stream = ?", (self.stream,)
+            )
+            return {seq for (seq,) in rows}
+
+    def drop_segments(self, seqs: set[int]) -> None:
+        marks = ",".join("?" * len(seqs))
+        with self._lock:
+            conn = self._writer()
+            with conn:
+                conn.execute(
+                    "DELETE FROM event_findings WHERE event_id IN "
+                    f"(SELECT id FROM events WHERE stream = ? AND seq IN ({marks}))",
+                    (self.stream, *seqs),
+                )
+                conn.execute(
+                    f"DELETE FROM events WHERE stream = ? AND seq IN ({marks})",
+                    (self.stream, *seqs),
+                )
+
+    def query(
+        self,
+        query: AuditQuery,
+        limit: int,
+        cursor: str | None = None,
+        order: SortOrder = "desc",
+    ) -> tuple[list[str], str | None]:
+        """
+        One page of matching JSONL lines and the cursor of the next page (None on the
+        last page). Raises ValueError for an invalid cursor.
+        """
+        after = decode_cursor(cursor) if cursor else None
+        rows = self._select(query, limit + 1, after, order)
+        if len(rows) <= limit:
+            return [line for _, _, line in rows], None
+        rows = rows[:limit]
+        ts, event_id, _ = rows[-1]
+        return [line for _, _, line in rows], encode_cursor(ts, event_id)
+
+    def export(self, query: AuditQuery, order: SortOrder = "asc") -> Iterator[str]:
+        """Every matching JSONL line, read page by page so memory stays bounded."""
+        after = None
+        while True:
+            rows = self._select(query, _EXPORT_PAGE, after, order)
+            for _, _, line in rows:
+                yield line
+            if len(rows) < _EXPORT_PAGE:
+                return
+            ts, event_id, _ = rows[-1]
+            after = (ts, event_id)
+
+    def close(self) -> None:
+        with self._lock:
+            for conn in self._readers:
+                conn.close()
+            self._readers = []
+            self._local = threading.local()
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _insert(self, rows: list[tuple[_Row, int, int]]) -> None:
+        with self._lock:
+            conn = self._writer()
+            with conn:
+                findings = []
+                for row, seq, end_offset in rows:
+                    event_id = conn.execute(
+                        "INSERT INTO events"
+                        " (ts, event_type, outcome, path, stream, seq, end_offset, line)"
+                        " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                        (
+                            row.ts,
+                            row.event_type,
+                            row.outcome,
+                            row.path,
+                            self.stream,
+                            seq,
+                            end_offset,
+                            row.line,
+                        ),
+                    ).lastrowid
+                    findings += [(t, row.ts, event_id) for t in row.finding_types]
+                if findings:
+                    conn.executemany(
+                        "INSERT INTO event_findings (finding_type, ts, event_id) VALUES (?, ?, ?)",
+                        findings,
+                    )
+
+    def _select(
+        self,
+        query: AuditQuery,
+        limit: int,
+        after: tuple[str, int] | None,
+        order: SortOrder,
+    ) -> list[tuple[str, int, str]]:
+        clauses: list[str] = []
+        params: list[Any] = []
+        if query.finding_type is None:
+            source, ts, event_id = "events e", "e.ts", "e.id"
+        else:
+            # Walk the finding type's own (ts, id) range: rare types cost no more than common ones
+            source = "event_findings f JOIN events e ON e.id = f.event_id"
+            ts, event_id = "f.ts", "f.event_id"
+            clauses.append("f.finding_type = ?")
+            params.append(query.finding_type)
+        if query.since is not None:
+            clauses.append(f"{ts} >= ?")
+            params.append(utc_isoformat(query.since))
+        if query.until is not None:
+            clauses.append(f"{ts} < ?")
+            params.append(utc_isoformat(query.until))
+        for column in ("event_type", "outcome", "path"):
+            value = getattr(query, column)
+            if value is not None:
+                clauses.append(f"e.{column} = ?")
+                params.append(value)
+        if after is not None:
+            op = ">" if order == "asc" else "<"
+            clauses.append(f"({ts}, {event_id}) {op} (?, ?)")
+            params += after
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        direction = "ASC" if order == "asc" else "DESC"
+        sql = (
+            f"SELECT e.ts, e.id, e.line FROM {source} {where}"
+            f" ORDER BY {ts} {direction}, {event_id} {direction} LIMIT ?"
+        )
+        return self._reader().execute(sql, (*params, limit)).fetchall()
+
+    def _connect(self) -> sqlite3.Connection:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")  # the log, not the index, is the record
+        return conn
+
+    def _writer(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = self._connect()
+            # One transaction: processes starting together create (or rebuild) it once
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                (version,) = conn.execute("PRAGMA user_version").fetchone()
+                if version != _SCHEMA_VERSION:
+                    for statement in filter(str.strip, _SCHEMA.split(";")):
+                        conn.execute(statement)
+            self._conn = conn
+        return self._conn
+
+    def _reader(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._connect()
+            with self._lock:
+                self._writer()  # creates the schema on first use
+                self._readers.append(conn)
+                self._local.conn = conn
+        return conn
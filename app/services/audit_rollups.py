@@ -0,0 +1,362 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import Counter
+from collections.abc import Iterable
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+from typing import IO, Any, Literal, NamedTuple
+
+from app.services.audit_chain import SEAL_EVENT_TYPE
+from app.services.audit_codec import iter_records
+from app.services.audit_index import finding_types
+from app.services.audit_segments import AuditSegmentStore, open_segment, utc_isoformat
+
+logger = logging.getLogger(__name__)
+
+RollupDimension = Literal["hour", "event_type", "outcome", "path", "context", "finding_type"]
+
+_CHECKPOINT_VERSION = 1
+_HOUR_LEN = len("2026-01-01T00")  # timestamp_utc prefix naming its hour
+
+
+class _Cell(NamedTuple):
+    """
+    One counter. Cells without a finding type count events; cells with one count the
+    events naming that finding type (an event with two types is in both).
+    """
+
+    hour: str
+    event_type: str
+    outcome: str
+    path: str
+    context: str | None
+    finding_type: str | None
+
+
+class RollupQuery(NamedTuple):
+    """Filters of a rollup report; None matches everything. Time bounds are whole hours."""
+
+    since: datetime | None = None
+    until: datetime | None = None
+    event_type: str | None = None
+    outcome: str | None = None
+    path: str | None = None
+    context: str | None = None
+    finding_type: str | None = None
+
+
+def _cells(line: bytes) -> list[_Cell]:
+    try:
+        event = json.loads(line)
+    except ValueError:
+        return []
+    if not isinstance(event, dict) or event.get("event_type") == SEAL_EVENT_TYPE:
+        return []
+    timestamp = event.get("timestamp_utc")
+    if not isinstance(timestamp, str) or len(timestamp) < _HOUR_LEN:
+        return []
+    http = event.get("http") if isinstance(event.get("http"), dict) else {}
+    details = event.get("details") if isinstance(event.get("details"), dict) else {}
+    context = details.get("context")
+    cell = _Cell(
+        timestamp[:_HOUR_LEN],
+        str(event.get("event_type") or ""),
+        str(event.get("outcome") or ""),
+        str(http.get("path") or ""),
+        context if isinstance(context, str) else None,
+        None,
+    )
+    return [cell, *(cell._replace(finding_type=t) for t in sorted(finding_types(details)))]
+
+
+def _hour(value: datetime, ceiling: bool = False) -> str:
+    """The hour holding `value`; with `ceiling`, the first hour starting at or after it."""
+    hour = datetime.fromisoformat(utc_isoformat(value)).replace(minute=0, second=0, microsecond=0)
+    if ceiling and hour < value.replace(tzinfo=value.tzinfo or UTC):
+        hour += timedelta(hours=1)
+    return hour.isoformat()[:_HOUR_LEN]
+
+
+_DIMENSIONS: tuple[RollupDimension, ...] = (
+    "hour",
+    "event_type",
+    "outcome",
+    "path",
+    "context",
+    "finding_type",
+)
+OTHER_CONTEXT = "other"  # contexts past the cap share this one
+
+
+class _Counts:
+    """
+    Counters by hour, plus running totals per dimension over every hour held (events and
+    findings apart), kept as cells are added and hours dropped. Reports without filters
+    read the totals; others only the hours in their range.
+    """
+
+    def __init__(self) -> None:
+        self.hours: dict[str, Counter[_Cell]] = {}
+        self.totals: dict[tuple[bool, RollupDimension], Counter[Any]] = {
+            (by_finding, dimension): Counter()
+            for by_finding in (False, True)
+            for dimension in _DIMENSIONS
+        }
+        self._encoded: dict[str, str] = {}  # checkpoint text of each hour not changed since
+        self._dirty: set[str] = set()
+
+    def add(self, cell: _Cell, count: int = 1) -> None:
+        self.hours.setdefault(cell.hour, Counter())[cell] += count
+        by_finding = cell.finding_type is not None
+        for dimension in _DIMENSIONS:
+            self.totals[by_finding, dimension][getattr(cell, dimension)] += count
+        self._dirty.add(cell.hour)
+
+    def drop_before(self, hour: str) -> None:
+        """Forgets the hours before `hour` (retention)."""
+        for old in [h for h in self.hours if h < hour]:
+            for cell, count in self.hours.pop(old).items():
+                by_finding = cell.finding_type is not None
+                for dimension in _DIMENSIONS:
+                    totals = self.totals[by_finding, dimension]
+                    key = getattr(cell, dimension)
+                    totals[key] -= count
+                    if totals[key] <= 0:
+                        del totals[key]
+            self._encoded.pop(old, None)
+            self._dirty.discard(old)
+
+    def encoded(self) -> list[str]:
+        """The checkpoint's cells, one text per hour: only hours changed since are encoded."""
+        for hour in self._dirty:
+            self._encoded[hour] = ",".join(
+                json.dumps([*cell, count], separators=(",", ":"))
+                for cell, count in self.hours[hour].items()
+            )
+        self._dirty.clear()
+        return [text for text in self._encoded.values() if text]
+
+    def accumulate(
+        self, totals: Counter[tuple[Any, ...]], query: RollupQuery, group_by: list[RollupDimension]
+    ) -> None:
+        by_finding = query.finding_type is not None or "finding_type" in group_by
+        # Hours starting in [since's hour, until)
+        low = _hour(query.since) if query.since else None
+        high = _hour(query.until, ceiling=True) if query.until else None
+        filters = [
+            (field, value)
+            for field, value in query._asdict().items()
+            if field not in ("since", "until") and value is not None
+        ]
+        if not filters and len(group_by) <= 1 and (group_by in ([], ["hour"]) or not (low or high)):
+            # Running totals: one counter per value, whatever the number of events
+            dimension = group_by[0] if group_by else "hour"
+            for value, count in self.totals[by_finding, dimension].items():
+                if dimension == "hour" and ((low and value < low) or (high and value >= high)):
+                    continue
+                totals[(value,) if group_by else ()] += count
+            return
+        for hour, cells in self.hours.items():
+            if (low and hour < low) or (high and hour >= high):
+                continue
+            for cell, count in cells.items():
+                if (cell.finding_type is not None) != by_finding:
+                    continue
+                if any(getattr(cell, field) != value for field, value in filters):
+                    continue
+                totals[tuple(getattr(cell, field) for field in group_by)] += count
+
+
+def _open_closed_segment(path: Path) -> IO[bytes]:
+    try:
+        return open_segment(path)
+    except FileNotFoundError:
+        return open_segment(path.with_name(path.name + ".gz"))  # compressed meanwhile
+
+
+class AuditRollups:
+    """
+    Audit event counts by hour, event type, outcome, http.path, context and finding
+    type, kept in memory, so "blocks per finding type per hour per endpoint" reads a
+    few counters instead of scanning the log.
+
+    Like AuditIndex, the counters are fed by the audit writer thread after each
+    committed batch and track the log position they cover. They are checkpointed to
+    `<directory>/<stream>.json` (write-to-temp + rename) at most every
+    `checkpoint_seconds` and on close. On startup the checkpoint is loaded and the log
+    written after it replayed; without one, every retained segment is.
+
+    Hours older than `retention_days` are dropped, like the segments holding them. At
+    most `max_contexts` contexts are counted apart; events of further ones count as
+    context "other".
+
+    Each writer process (see AuditStream) counts its own stream; `report` adds the
+    other streams' checkpoints, so their counts lag by up to `checkpoint_seconds`.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        stream: str = "0",
+        checkpoint_seconds: float = 60.0,
+        retention_days: float | None = None,
+        max_contexts: int = 100,
+    ):
+        self.directory = Path(directory)
+        self.stream = stream
+        self.checkpoint_seconds = checkpoint_seconds
+        self.retention_days = retention_days
+        self.max_contexts = max_contexts
+        self.path = self.directory / f"{stream}.json"
+        self._lock = threading.Lock()
+        self._counts = _Counts()
+        self._position: tuple[int, int] | None = None  # (segment seq, end offset) counted up to
+        self._recovered = False
+        self._complete = True  # False after a failed replay: never checkpoint partial counts
+        self._saved = time.monotonic()
+        self._peers: dict[Path, tuple[float, _Counts]] = {}
+
+    def add(self, seq: int, records: Iterable[tuple[bytes, int]]) -> None:
+        """Counts lines of segment `seq`, given with the file offset each ends at."""
+        oldest = self._oldest_hour()
+        for line, end in records:
+            cells = _cells(line)  # parsed outside the lock: a long replay never blocks reports
+            with self._lock:
+                if cells and (oldest is None or cells[0].hour >= oldest):
+                    if cells[0].hour not in self._counts.hours and oldest is not None:
+                        self._counts.drop_before(oldest)  # a new hour: drop the expired ones
+                    context = self._context(cells[0].context)
+                    for cell in cells:
+                        self._counts.add(cell._replace(context=context))
+                self._position = (seq, end)
+        if time.monotonic() - self._saved >= self.checkpoint_seconds:
+            self.save()
+
+    def recover(self, active_path: Path, segments: AuditSegmentStore | None = None) -> None:
+        """Loads the checkpoint and counts what the log holds after it (once per process)."""
+        if self._recovered:
+            return
+        self._recovered = True  # once: a retry would count the replayed part twice
+        self._complete = False
+        checkpoint = self._load(self.path)
+        if checkpoint is not None:
+            self._counts, self._position = checkpoint
+        start_seq, start_offset = self._position or (0, 0)
+        active_seq = 0
+        if segments is not None:
+            for segment in segments.manifest.segments():
+                if segment["seq"] < start_seq:
+                    continue
+                start = start_offset if segment["seq"] == start_seq else 0
+                with _open_closed_segment(segments.directory / segment["file"]) as fh:
+                    self.add(segment["seq"], iter_records(fh, start))
+            active_seq = segments.active_seq
+        try:
+            with open(active_path, "rb") as fh:
+                self.add(
+                    active_seq, iter_records(fh, start_offset if start_seq == active_seq else 0)
+                )
+        except FileNotFoundError:
+            pass
+        self._complete = True
+        self.save()
+
+    def save(self) -> None:
+        """Checkpoints the counters and the log position they cover."""
+        oldest = self._oldest_hour()
+        with self._lock:
+            if self._position is None or not self._complete:
+                return
+            if oldest is not None:
+                self._counts.drop_before(oldest)
+            head = json.dumps(
+                {"version": _CHECKPOINT_VERSION, "stream": self.stream, "position": self._position},
+                separators=(",", ":"),
+            )
+            cells = self._counts.encoded()  # re-encodes only the hours changed since last time
+            self._saved = time.monotonic()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as fh:
+            fh.write(head[:-1])
+            fh.write(',"cells":[')
+            fh.write(",".join(cells))
+            fh.write("]}")
+        os.replace(tmp, self.path)
+
+    def report(
+        self, query: RollupQuery, group_by: Iterable[RollupDimension] = ("hour",)
+    ) -> list[dict[str, Any]]:
+        """
+        Counts matching the filters, one row per combination of the `group_by`
+        dimensions: event counts, or finding counts when the query filters or groups
+        by finding type. Without filters, one dimension reads running totals; otherwise
+        only the hours in the time range are scanned.
+        """
+        group_by = list(dict.fromkeys(group_by))
+        totals: Counter[tuple[Any, ...]] = Counter()
+        with self._lock:
+            self._counts.accumulate(totals, query, group_by)
+        for counts in self._peer_counts():
+            counts.accumulate(totals, query, group_by)
+        rows = []
+        for key in sorted(totals, key=lambda k: tuple("" if v is None else v for v in k)):
+            row: dict[str, Any] = dict(zip(group_by, key, strict=True))
+            if "hour" in row:
+                row["hour"] = f"{row['hour']}:00:00+00:00"
+            row["count"] = totals[key]
+            rows.append(row)
+        return rows
+
+    def _oldest_hour(self) -> str | None:
+        """The first hour still retained, or None to keep everything."""
+        if self.retention_days is None:
+            return None
+        return _hour(datetime.now(UTC) - timedelta(days=self.retention_days))
+
+    def _context(self, context: str | None) -> str | None:
+        known = self._counts.totals[False, "context"]
+        if context is None or context in known or len(known) < self.max_contexts:
+            return context
+        return OTHER_CONTEXT
+
+    def _peer_counts(self) -> list[_Counts]:
+        """The other streams' last checkpoints (re-read only when they change)."""
+        peers = []
+        for path in sorted(self.directory.glob("*.json")):
+            if path == self.path:
+                continue
+            try:
+                mtime = path.stat().st_mtime
+            except FileNotFoundError:
+                continue
+            cached = self._peers.get(path)
+            if cached is None or cached[0] != mtime:
+                checkpoint = self._load(path)
+                cached = (mtime, checkpoint[0] if checkpoint is not None else _Counts())
+                self._peers[path] = cached
+            peers.append(cached[1])
+        return peers
+
+    def _load(self, path: Path) -> tuple[_Counts, tuple[int, int]] | None:
+        try:
+            with open(path, encoding="utf-8") as fh:
+                data = json.load(fh)
+        except FileNotFoundError:
+            return None
+        except ValueError:
+            logger.warning("Ignoring unreadable audit rollup checkpoint %s", path)
+            return None
+        if data.get("version") != _CHECKPOINT_VERSION:
+            return None
+        counts = _Counts()
+        for *fields, count in data["cells"]:
+            counts.add(_Cell(*fields), count)
+        oldest = self._oldest_hour()
+        if oldest is not None:
+            counts.drop_before(oldest)
+        seq, offset = data["position"]
+        return counts, (seq, offset)
@@ -0,0 +1,311 @@
+import gzip
+import json
+import logging
+import os
+import queue
+import shutil
+import sqlite3
+import threading
+import time
+from collections.abc import Callable
+from datetime import UTC, datetime, timedelta
+from functools import partial
+from pathlib import Path
+from typing import IO, TYPE_CHECKING, Any
+
+from app.services.audit_codec import iter_records
+
+if TYPE_CHECKING:
+    from app.services.audit_index import AuditIndex
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = "manifest.json"
+_MANIFEST_VERSION = 1
+
+
+def utc_isoformat(value: datetime) -> str:
+    """A datetime in the format of timestamp_utc (naive means UTC): string order is time order."""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=UTC)
+    return value.astimezone(UTC).isoformat()
+
+
+def open_segment(path: Path) -> IO[bytes]:
+    """Opens a segment for reading, compressed or not."""
+    return gzip.open(path, "rb") if path.suffix == ".gz" else open(path, "rb")
+
+
+class SegmentStats:
+    """Running summary of a segment: what its manifest entry records."""
+
+    def __init__(self) -> None:
+        self.first_ts: str | None = None
+        self.last_ts: str | None = None
+        self.events = 0
+        self.bytes = 0
+        self.event_types: dict[str, int] = {}
+        self.opened = time.time()  # when the first event arrived (age-based rotation)
+
+    def add(self, timestamp: str, event_type: str, size: int) -> None:
+        if self.first_ts is None:
+            self.first_ts = timestamp
+            self.opened = time.time()
+        # ISO-8601 UTC strings of one format: string order is time order
+        self.last_ts = max(self.last_ts or timestamp, timestamp)
+        self.events += 1
+        self.bytes += size
+        self.event_types[event_type] = self.event_types.get(event_type, 0) + 1
+
+    @classmethod
+    def from_file(cls, path: Path) -> "SegmentStats":
+        """Rebuilds the summary of an existing segment (the active file after a restart)."""
+        stats = cls()
+        with open_segment(path) as fh:
+            # Sizes as stored (a binary file's records, see audit_codec), not as JSONL
+            position = 0
+            for line, end in iter_records(fh):
+                size, position = end - position, end
+                try:
+                    event = json.loads(line)
+                    stats.add(event["timestamp_utc"], event["event_type"], size)
+                except (ValueError, KeyError, TypeError):
+                    stats.bytes += size
+        if stats.first_ts is not None:
+            stats.opened = datetime.fromisoformat(stats.first_ts).timestamp()
+        return stats
+
+
+class SegmentManifest:
+    """
+    manifest.json of a segment directory: one entry per closed segment, oldest first,
+    with its time range, event count and event-type histogram so readers can skip
+    segments without opening them. Saved by write-to-temp + rename, so readers see
+    either the old or the new manifest, never a partial one. Sequence numbers are never
+    reused, even once retention has removed every segment.
+    """
+
+    def __init__(self, directory: Path):
+        self.path = directory / MANIFEST_NAME
+        self._lock = threading.Lock()
+        self._segments: list[dict[str, Any]] = []
+        self._next_seq = 1
+        self._load()
+
+    def segments(self) -> list[dict[str, Any]]:
+        with self._lock:
+            return [dict(s) for s in self._segments]
+
+    def next_seq(self) -> int:
+        """Sequence number the next closed segment (the current active file) will get."""
+        with self._lock:
+            return self._next_seq
+
+    def add(self, entry: dict[str, Any]) -> None:
+        with self._lock:
+            self._segments.append(entry)
+            self._next_seq = max(self._next_seq, entry["seq"] + 1)
+            self._save()
+
+    def update(self, seq: int, **changes: Any) -> None:
+        with self._lock:
+            for segment in self._segments:
+                if segment["seq"] == seq:
+                    segment.update(changes)
+            self._save()
+
+    def remove(self, seqs: set[int]) -> None:
+        with self._lock:
+            self._segments = [s for s in self._segments if s["seq"] not in seqs]
+            self._save()
+
+    def _load(self) -> None:
+        try:
+            with open(self.path, encoding="utf-8") as fh:
+                data = json.load(fh)
+        except FileNotFoundError:
+            return
+        self._segments = data["segments"]
+        self._next_seq = data.get(
+            "next_seq", max((s["seq"] for s in self._segments), default=0) + 1
+        )
+
+    def _save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump(
+                {
+                    "version": _MANIFEST_VERSION,
+                    "next_seq": self._next_seq,
+                    "segments": self._segments,
+                },
+                fh,
+                indent=1,
+            )
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp, self.path)
+
+
+class AuditSegmentStore:
+    """
+    Time- and size-bounded segments for the audit log.
+
+    The writer appends to the active file and calls `rotate` when `should_rotate`
+    says the next batch would take it past `max_bytes`, or its first event is older
+    than `max_seconds`. Rotation is a rename into `directory` plus a manifest entry,
+    done on the writer thread; compressing the closed segment (gzip) and deleting
+    segments older than `retention_days` happen on a maintenance thread, so writers
+    never wait for either. Segments left uncompressed by a crash are picked up on
+    the next start.
+
+    With an index, expired segments are also dropped from it, and segments it has
+    never seen (a new or deleted index file) are indexed on the maintenance thread.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        max_bytes: int,
+        max_seconds: float,
+        compress: bool = True,
+        retention_days: float | None = None,
+        index: "AuditIndex | None" = None,
+    ):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.max_seconds = max_seconds
+        self.compress = compress
+        self.retention_days = retention_days
+        self.index = index
+        self.manifest = SegmentManifest(self.directory)
+        self.active = SegmentStats()
+        self._work: queue.Queue[Callable[[], None] | None] = queue.Queue()
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def active_seq(self) -> int:
+        """Sequence number the active file will have once rotated."""
+        return self.manifest.next_seq()
+
+    def recover(self, active_path: Path) -> None:
+        """
+        Summarises an existing active file, resumes interrupted compressions and
+        indexes closed segments missing from the index.
+        """
+        self.active = (
+            SegmentStats.from_file(active_path) if active_path.exists() else SegmentStats()
+        )
+        segments = self.manifest.segments()
+        for segment in segments:
+            if self.compress and not segment["file"].endswith(".gz"):
+                self._schedule(partial(self._compress, segment["seq"]))
+        if self.index is not None:
+            indexed = self.index.indexed_segments()
+            for segment in segments:
+                if segment["seq"] not in indexed:
+                    self._schedule(partial(self._backfill, segment["seq"]))
+
+    def observe(self, timestamp: str, event_type: str, size: int) -> None:
+        self.active.add(timestamp, event_type, size)
+
+    def should_rotate(self, incoming_bytes: int) -> bool:
+        if not self.active.events:
+            return False
+        return (
+            self.active.bytes + incoming_bytes > self.max_bytes
+            or time.time() - self.active.opened >= self.max_seconds
+        )
+
+    def rotate(self, active_path: Path, chain_head: str | None = None) -> None:
+        """
+        Moves the (closed) active file into the segment directory and records it, with
+        the hash of its last line when the log is hash-chained.
+        """
+        stats = self.active
+        seq = self.manifest.next_seq()
+        first = datetime.fromisoformat(stats.first_ts).strftime("%Y%m%dT%H%M%SZ")
+        name = f"audit-{first}-{seq:06d}.jsonl"
+        self.directory.mkdir(parents=True, exist_ok=True)
+        os.replace(active_path, self.directory / name)
+        entry = {
+            "seq": seq,
+            "file": name,
+            "first_ts": stats.first_ts,
+            "last_ts": stats.last_ts,
+            "events": stats.events,
+            "bytes": stats.bytes,
+            "event_types": stats.event_types,
+        }
+        if chain_head is not None:
+            entry["chain_head"] = chain_head
+        self.manifest.add(entry)
+        self.active = SegmentStats()
+        if self.compress:
+            self._schedule(partial(self._compress, seq))
+        elif self.retention_days is not None:
+            self._schedule(None)
+
+    def segment_paths(self) -> list[Path]:
+        return [self.directory / s["file"] for s in self.manifest.segments()]
+
+    def drain(self) -> None:
+        """Waits until scheduled compressions, backfills and retention have run."""
+        self._work.join()
+
+    def _schedule(self, task: Callable[[], None] | None) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._maintain, name="audit-segments", daemon=True
+                )
+                self._thread.start()
+        self._work.put(task)
+
+    def _maintain(self) -> None:
+        while True:
+            task = self._work.get()
+            try:
+                if task is not None:
+                    task()
+                self._apply_retention()
+            except (OSError, sqlite3.Error):
+                logger.exception("Audit segment maintenance failed (%s)", task)
+            finally:
+                self._work.task_done()
+
+    def _compress(self, seq: int) -> None:
+        segment = next((s for s in self.manifest.segments() if s["seq"] == seq), None)
+        if segment is None or segment["file"].endswith(".gz"):
+            return
+        source = self.directory / segment["file"]
+        target = source.with_name(source.name + ".gz")
+        tmp = target.with_suffix(".gz.tmp")
+        with open(source, "rb") as src, gzip.open(tmp, "wb", compresslevel=6) as dst:
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+        with open(tmp, "rb") as fh:
+            os.fsync(fh.fileno())
+        os.replace(tmp, target)
+        self.manifest.update(seq, file=target.name, compressed_bytes=target.stat().st_size)
+        source.unlink()
+
+    def _backfill(self, seq: int) -> None:
+        segment = next((s for s in self.manifest.segments() if s["seq"] == seq), None)
+        if segment is not None and self.index is not None:
+            self.index.add_segment(seq, self.directory / segment["file"])
+
+    def _apply_retention(self) -> None:
+        if self.retention_days is None:
+            return
+        cutoff = (datetime.now(UTC) - timedelta(days=self.retention_days)).isoformat()
+        expired = [s for s in self.manifest.segments() if s["last_ts"] < cutoff]
+        if not expired:
+            return
+        # Manifest first: readers never look for a file that is already gone
+        self.manifest.remove({s["seq"] for s in expired})
+        if self.index is not None:
+            self.index.drop_segments({s["seq"] for s in expired})
+        for segment in expired:
+            (self.directory / segment["file"]).unlink(missing_ok=True)
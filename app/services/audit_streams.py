@@ -0,0 +1,144 @@
+import heapq
+import json
+import re
+from collections.abc import Iterator
+from datetime import datetime
+from pathlib import Path
+from typing import IO, NamedTuple
+
+from app.services.audit_codec import iter_records
+from app.services.audit_segments import SegmentManifest, open_segment, utc_isoformat
+
+try:
+    import fcntl
+except ImportError:  # not POSIX: one writer process, always stream "0"
+    fcntl = None  # type: ignore[assignment]
+
+_STREAM_NAME = re.compile(r"[A-Za-z0-9_-]+")
+_TIMESTAMP = b'"timestamp_utc": "'
+_WORKER_DIR = "worker-"
+
+# Lock files of the slots this process holds; kept open (and locked) until it exits
+_held_locks: list[IO[bytes]] = []
+
+
+class AuditStream(NamedTuple):
+    """
+    One writer process's audit log: its active file and segment directory. Stream "0"
+    uses the base paths, so a single-process deployment keeps its existing layout;
+    stream "n" writes audit.n.jsonl and keeps its segments in worker-n/.
+    """
+
+    name: str
+    active_path: Path
+    segments_dir: Path
+
+
+def stream_paths(name: str, log_path: Path, segments_dir: Path) -> AuditStream:
+    if not _STREAM_NAME.fullmatch(name):
+        raise ValueError(f"Invalid audit worker id: {name!r}")
+    if name == "0":
+        return AuditStream(name, log_path, segments_dir)
+    return AuditStream(
+        name,
+        log_path.with_name(f"{log_path.stem}.{name}{log_path.suffix}"),
+        segments_dir / f"{_WORKER_DIR}{name}",
+    )
+
+
+def claim_stream(log_path: Path, segments_dir: Path, name: str | None = None) -> AuditStream:
+    """
+    The stream this process writes. Without an explicit name, takes the lowest free
+    slot (0, 1, 2, ...) by locking its lock file for the life of the process, so each
+    `uvicorn --workers N` worker gets its own files and a restarted worker takes over
+    the slot (and the files) of the one it replaces.
+    """
+    if name is not None or fcntl is None:
+        return stream_paths(name or "0", log_path, segments_dir)
+    log_path.parent.mkdir(parents=True, exist_ok=True)
+    slot = 0
+    while True:
+        lock = open(log_path.with_name(f".{log_path.stem}.{slot}.lock"), "ab")
+        try:
+            fcntl.flock(lock.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock.close()
+            slot += 1
+            continue
+        _held_locks.append(lock)
+        return stream_paths(str(slot), log_path, segments_dir)
+
+
+def list_streams(log_path: Path, segments_dir: Path) -> list[AuditStream]:
+    """Every stream with an active file or a segment directory, running or not."""
+    names = {"0"}
+    prefix = f"{log_path.stem}."
+    for path in log_path.parent.glob(f"{prefix}*{log_path.suffix}"):
+        names.add(path.name[len(prefix) : -len(log_path.suffix)])
+    if segments_dir.is_dir():
+        names.update(
+            p.name[len(_WORKER_DIR) :]
+            for p in segments_dir.iterdir()
+            if p.is_dir() and p.name.startswith(_WORKER_DIR)
+        )
+    streams = []
+    for name in sorted(names, key=lambda n: (not n.isdigit(), n.zfill(8))):
+        try:
+            streams.append(stream_paths(name, log_path, segments_dir))
+        except ValueError:
+            continue
+    return streams
+
+
+def _timestamp(line: bytes) -> str:
+    # timestamp_utc is written before any nested details: the first match is the event's
+    start = line.find(_TIMESTAMP)
+    if start >= 0:
+        start += len(_TIMESTAMP)
+        return line[start : line.find(b'"', start)].decode()
+    try:
+        return str(json.loads(line).get("timestamp_utc") or "")
+    except (ValueError, AttributeError):
+        return ""
+
+
+def _read_stream(stream: AuditStream, since: str | None, until: str | None) -> Iterator[bytes]:
+    paths = [
+        stream.segments_dir / s["file"]
+        for s in SegmentManifest(stream.segments_dir).segments()
+        # The manifest's time ranges skip segments outside the window unopened
+        if not (since and s["last_ts"] < since) and not (until and s["first_ts"] >= until)
+    ]
+    paths.append(stream.active_path)
+    for path in paths:
+        try:
+            fh = open_segment(path)
+        except FileNotFoundError:
+            try:
+                fh = open_segment(path.with_name(path.name + ".gz"))  # compressed meanwhile
+            except FileNotFoundError:
+                continue  # expired meanwhile, or no active file yet
+        with fh:
+            yield from (line for line, _ in iter_records(fh))
+
+
+def read_merged(
+    streams: list[AuditStream], since: datetime | None = None, until: datetime | None = None
+) -> Iterator[bytes]:
+    """
+    Audit lines of all streams in timestamp order, within [since, until). Each stream
+    is already in timestamp order (see write_audit_event), so this is a streaming
+    k-way merge: memory stays at one line per stream.
+    """
+    low = utc_isoformat(since) if since else None
+    high = utc_isoformat(until) if until else None
+    merged = heapq.merge(
+        *(((_timestamp(line), line) for line in _read_stream(s, low, high)) for s in streams),
+        key=lambda item: item[0],
+    )
+    for timestamp, line in merged:
+        if low and timestamp < low:
+            continue
+        if high and timestamp >= high:
+            continue
+        yield line
@@ -0,0 +1,369 @@
+import logging
+import os
+import queue
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import Future
+from itertools import accumulate
+from pathlib import Path
+from typing import Any, BinaryIO, Literal, NamedTuple
+
+from app.services.audit_chain import GENESIS, SEAL_EVENT_TYPE, AuditChain, recover_head
+from app.services.audit_codec import MAGIC, AuditFormat, BinaryEncoder, detect_format
+from app.services.audit_index import AuditIndex
+from app.services.audit_rollups import AuditRollups
+from app.services.audit_segments import AuditSegmentStore
+
+logger = logging.getLogger(__name__)
+
+FsyncPolicy = Literal["never", "durable", "batch"]
+
+# Pause before retrying a batch whose write failed (disk full, volume gone)
+_RETRY_SECONDS = 0.5
+
+
+class AuditBackpressureError(RuntimeError):
+    """The audit queue stayed full (or a durable write did not commit) within the timeout."""
+
+
+class _Entry(NamedTuple):
+    data: bytes  # one complete JSONL line; empty for flush markers
+    done: Future | None  # set once the batch holding the entry is committed
+    timestamp: str = ""  # the event's timestamp_utc and event_type, for segment stats
+    event_type: str = ""
+
+
+class AuditWriter:
+    """
+    Appends audit lines to a JSONL file from one background thread (group commit).
+
+    Callers only encode their event and queue it; the writer thread takes everything
+    queued (up to `max_batch` entries), waiting at most `flush_interval` for a batch
+    to fill, and appends it with a single write on a file it keeps open. A batch
+    holding a durable entry is written without waiting and, unless the policy is
+    "never", fsynced before its callers are released:
+
+    - fsync "never": left to the OS; "durable": only batches with durable entries;
+      "batch": every batch.
+
+    The queue holds at most `max_queue` entries. When it is full, callers block
+    (backpressure) for up to `timeout` seconds, then get AuditBackpressureError; a
+    durable caller waits as long for its commit. A failed write (OSError) is logged and
+    the same batch retried, so events are delayed rather than dropped (except at
+    `close`, which does not retry). Whatever part of the batch reached the file is cut
+    off first, so a retry never duplicates lines or seals them from a stale chain head.
+    Any other error fails that batch's callers and the writer carries on with the next.
+    The thread starts on first use; `close` drains the queue and stops it.
+
+    With a segment store, the file is rotated into time- and size-bounded segments
+    between batches (see AuditSegmentStore). With an index, each committed batch is
+    then added to it (see AuditIndex); an index failure is logged and counted but
+    does not fail the batch, which is already in the log. With a chain, lines are
+    hash-chained and each batch is followed by its signed seal (see AuditChain).
+    With rollups, committed batches are counted too (see AuditRollups), and their
+    checkpoint is saved on `close`.
+
+    With `file_format` "binary", lines are stored as compact binary records (see
+    audit_codec) and everything reading the log decodes them back to the same JSONL.
+    An existing active file keeps the format it was started in until it is rotated.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        flush_interval: float,
+        max_batch: int,
+        max_queue: int,
+        fsync: FsyncPolicy = "durable",
+        timeout: float = 5.0,
+        segments: AuditSegmentStore | None = None,
+        index: AuditIndex | None = None,
+        rollups: AuditRollups | None = None,
+        chain: AuditChain | None = None,
+        file_format: AuditFormat = "jsonl",
+    ):
+        self.path = Path(path)
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.fsync = fsync
+        self.timeout = timeout
+        self.segments = segments
+        self.index = index
+        self.rollups = rollups
+        self.chain = chain
+        self.file_format = file_format
+        self._chain_head = GENESIS
+        self._truncate_to: int | None = None  # file size before a batch not yet committed
+        self._queue: queue.Queue[_Entry | None] = queue.Queue(max_queue)
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+        self._order_lock = threading.Lock()  # see write_stamped
+        self._closing = threading.Event()  # close() does not wait for failing writes
+        self._file: BinaryIO | None = None
+        self._encoder: BinaryEncoder | None = None  # the open file's, when it is binary
+        self._stats = {
+            "events": 0,
+            "batches": 0,
+            "fsyncs": 0,
+            "seals": 0,
+            "write_errors": 0,
+            "index_errors": 0,
+            "rollups_errors": 0,
+        }
+
+    def write(
+        self, data: bytes, durable: bool = False, *, timestamp: str = "", event_type: str = ""
+    ) -> None:
+        """Queues one complete JSONL line; with `durable`, returns once it is committed."""
+        self._submit(self._entry(data, durable, timestamp, event_type))
+
+    def write_stamped(
+        self, build: Callable[[], tuple[bytes, str, str]], durable: bool = False
+    ) -> None:
+        """
+        Like `write`, for a line built by `build` (returning line, timestamp, event_type)
+        while holding the queue's order lock: lines reach the file in the order they were
+        built, so timestamps and ids stamped inside `build` never go backwards in it.
+        """
+        if not self._order_lock.acquire(timeout=self.timeout):
+            raise AuditBackpressureError("Audit queue is full")
+        try:
+            data, timestamp, event_type = build()
+            entry = self._entry(data, durable, timestamp, event_type)
+            self._enqueue(entry)
+        finally:
+            self._order_lock.release()
+        self._wait(entry)
+
+    def start(self) -> None:
+        """Starts the writer thread now, so its recovery work does not wait for an event."""
+        self._submit(_Entry(b"", None))
+
+    def flush(self) -> None:
+        """Returns once everything queued before the call has been committed."""
+        self._submit(_Entry(b"", Future()))
+
+    def close(self) -> None:
+        """Commits everything queued and stops the writer thread (a later write restarts it)."""
+        with self._lock:
+            thread = self._thread
+            if thread is None:
+                return
+            self._closing.set()
+            self._queue.put(None)
+            thread.join()
+            self._closing.clear()
+            self._thread = None
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            self._update_rollups(lambda _: self.rollups.save())
+
+    def stats(self) -> dict[str, Any]:
+        return {**self._stats, "queued": self._queue.qsize(), "fsync": self.fsync}
+
+    def _entry(self, data: bytes, durable: bool, timestamp: str, event_type: str) -> _Entry:
+        if self.chain is not None and not data.endswith(b"}\n"):
+            raise ValueError("Chained audit lines must be JSON objects")
+        return _Entry(data, Future() if durable else None, timestamp, event_type)
+
+    def _submit(self, entry: _Entry) -> None:
+        self._enqueue(entry)
+        self._wait(entry)
+
+    def _enqueue(self, entry: _Entry) -> None:
+        if self._thread is None:
+            self._start()
+        try:
+            self._queue.put(entry, timeout=self.timeout)
+        except queue.Full:
+            raise AuditBackpressureError("Audit queue is full") from None
+
+    def _wait(self, entry: _Entry) -> None:
+        if entry.done is not None:
+            try:
+                entry.done.result(timeout=self.timeout)
+            except TimeoutError:
+                raise AuditBackpressureError("Audit write not committed in time") from None
+            except Exception as exc:
+                raise AuditBackpressureError("Audit write failed") from exc
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        stopping = False
+        batch: list[_Entry] = []
+        while batch or not stopping:
+            if not batch:
+                entry = self._queue.get()
+                if entry is None:
+                    stopping = True
+                    continue
+                batch.append(entry)
+
+            urgent = any(e.done is not None for e in batch)
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.max_batch:
+                try:
+                    if urgent or stopping:
+                        entry = self._queue.get_nowait()
+                    else:
+                        entry = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+                if entry is None:
+                    stopping = True
+                    continue
+                batch.append(entry)
+                urgent = urgent or entry.done is not None
+
+            try:
+                self._commit(batch, urgent)
+            except Exception as exc:
+                self._stats["write_errors"] += 1
+                self._close_file()
+                try:
+                    self._discard_partial()
+                except OSError:
+                    logger.exception("Partial audit batch not removed yet; retried before the next")
+                if not isinstance(exc, OSError):
+                    logger.exception("Audit batch of %d entries failed; not retried", len(batch))
+                elif not (stopping or self._closing.is_set()):
+                    logger.exception("Audit batch of %d entries not written; retrying", len(batch))
+                    time.sleep(_RETRY_SECONDS)
+                    continue
+                else:
+                    logger.exception("Audit writer stopped; %d entries not written", len(batch))
+                for entry in batch:
+                    if entry.done is not None:
+                        entry.done.set_exception(exc)
+                batch = []
+                continue
+
+            for entry in batch:
+                if entry.done is not None:
+                    entry.done.set_result(None)
+            batch = []
+
+    def _commit(self, batch: list[_Entry], urgent: bool) -> None:
+        segments = self.segments
+        if self._file is None:
+            self._discard_partial()
+            if segments is not None:
+                segments.recover(self.path)
+            self._update_index(lambda seq: self.index.catch_up(seq, self.path))
+            self._update_rollups(lambda seq: self.rollups.recover(self.path, segments))
+            if self.chain is not None:
+                self._chain_head = recover_head(self.path, segments)
+        # (line, timestamp, event_type) of everything this batch writes
+        records = [(e.data, e.timestamp, e.event_type) for e in batch if e.data]
+        head = self._chain_head
+        if self.chain is not None and records:
+            sealed = self.chain.seal_batch(
+                head, [line for line, _, _ in records], max(ts for _, ts, _ in records)
+            )
+            records = [
+                (line, timestamp, event_type)
+                for line, (_, timestamp, event_type) in zip(sealed.lines[:-1], records, strict=True)
+            ]
+            records.append((sealed.lines[-1], sealed.timestamp, SEAL_EVENT_TYPE))
+            head = sealed.head
+        lines = [line for line, _, _ in records]
+        # The JSONL size: an upper bound for a binary batch
+        if segments is not None and segments.should_rotate(sum(map(len, lines))):
+            self._close_file()
+            segments.rotate(self.path, chain_head=self._chain_head if self.chain else None)
+        file = self._file if self._file is not None else self._open_file()
+        stored = lines if self._encoder is None else [self._encoder.encode(x) for x in lines]
+        offset = self._truncate_to = file.seek(0, os.SEEK_END)
+        # One write per batch: O_APPEND keeps concurrent appenders from interleaving lines
+        _write_all(file, b"".join(stored))
+        if self.fsync == "batch" or (self.fsync == "durable" and urgent):
+            os.fsync(file.fileno())
+            self._stats["fsyncs"] += 1
+        # Committed: only now does the batch count, for the chain and for a retry
+        self._truncate_to = None
+        self._chain_head = head
+        if segments is not None:
+            for (_, timestamp, event_type), record in zip(records, stored, strict=True):
+                segments.observe(timestamp, event_type, len(record))
+        self._stats["events"] += sum(1 for e in batch if e.data)
+        self._stats["batches"] += 1
+        if self.chain is not None and records:
+            self._stats["seals"] += 1
+        ends = list(accumulate((len(record) for record in stored), initial=offset))[1:]
+        self._update_index(lambda seq: self.index.add(seq, zip(lines, ends, strict=True)))
+        self._update_rollups(lambda seq: self.rollups.add(seq, zip(lines, ends, strict=True)))
+
+    def _update_index(self, update: Callable[[int], None]) -> None:
+        if self.index is None:
+            return
+        # Rows are tagged with the segment the active file will become when rotated
+        seq = self.segments.active_seq if self.segments is not None else 0
+        try:
+            update(seq)
+        except Exception:  # the batch is in the log already; the index can be rebuilt
+            self._stats["index_errors"] += 1
+            logger.exception("Audit index not updated (delete the index file to rebuild it)")
+
+    def _update_rollups(self, update: Callable[[int], None]) -> None:
+        if self.rollups is None:
+            return
+        seq = self.segments.active_seq if self.segments is not None else 0
+        try:
+            update(seq)
+        except Exception:  # as for the index
+            self._stats["rollups_errors"] += 1
+            logger.exception("Audit rollups not updated (delete the checkpoint to rebuild them)")
+
+    def _discard_partial(self) -> None:
+        """
+        Cuts off whatever a batch that failed mid-write or before its fsync left in the
+        file. Raises OSError if that fails too; it is tried again before the next write.
+        """
+        if self._truncate_to is None:
+            return
+        try:
+            os.truncate(self.path, self._truncate_to)
+        except FileNotFoundError:
+            pass
+        self._truncate_to = None
+
+    def _open_file(self) -> BinaryIO:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        file_format = detect_format(self.path) or self.file_format
+        file = self._file = open(self.path, "ab", buffering=0)
+        size = file.seek(0, os.SEEK_END)
+        if file_format == "jsonl":
+            self._encoder = None
+        elif not size:
+            _write_all(file, MAGIC)
+            self._encoder = BinaryEncoder()
+        else:
+            # The string table of the records already in the file
+            self._encoder, end = BinaryEncoder.resume(self.path)
+            if end < size:
+                # A batch torn by a crash: records after it would not be decodable
+                logger.warning("Dropping %d bytes of a torn audit record", size - end)
+                file.truncate(end)
+        return file
+
+    def _close_file(self) -> None:
+        self._encoder = None  # resumed from the file on reopen, whatever the last write did
+        if self._file is not None:
+            try:
+                self._file.close()
+            except OSError:
+                pass
+            self._file = None
+
+
+def _write_all(file: BinaryIO, data: bytes) -> None:
+    view = memoryview(data)
+    while view:
+        view = view[file.write(view) :]
@@ -0,0 +1,243 @@
+"""
+Maturity assessment of a whole portfolio of AI use cases from one CSV or JSONL file.
+
+    python -m app.services.bulk_assessment FILE [-o OUT] [--format csv|jsonl] [--org ORG_ID]
+
+JSONL rows are /assess request bodies ({"profile": ..., "use_case": ..., "notes": ...}),
+optionally with an "id" echoed back. CSV rows have one column per field, named as in
+the models (org_name, sector, org_size, geography, regulated, name, description,
+data_types, channels, users, third_parties, notes, id); list cells are ";"-separated
+and empty cells take the field's default.
+
+Rows are processed in chunks: each chunk is validated, guardrail-scanned as one batch
+and its feature masks scored together (see assessment.score_portfolio). Output is
+NDJSON, one record per row in input order, then a summary record.
+"""
+
+import argparse
+import csv
+import json
+import sys
+from collections import Counter
+from collections.abc import Iterable, Iterator
+from itertools import islice
+from pathlib import Path
+from typing import IO, Any, Literal
+
+import numpy as np
+from pydantic import ValidationError
+
+from app.core.config import settings
+from app.models.assessment import AIUseCase, AssessmentRequest, OrganisationProfile
+from app.services.assessment import GAPS, MATURITY_LEVELS, score_portfolio
+from app.services.decision_table import feature_mask
+from app.services.guardrail import GuardrailScanner
+from app.services.guardrail_executor import check_batch
+
+BulkFormat = Literal["csv", "jsonl"]
+
+_LIST_SEPARATOR = ";"
+_LIST_FIELDS = {"data_types", "channels", "users"}
+_PROFILE_FIELDS = set(OrganisationProfile.model_fields)
+_USE_CASE_FIELDS = set(AIUseCase.model_fields)
+
+
+def detect_format(head: bytes) -> BulkFormat:
+    """JSONL when the first non-blank character opens an object, CSV otherwise."""
+    return "jsonl" if head.lstrip(b"\xef\xbb\xbf \t\r\n").startswith(b"{") else "csv"
+
+
+def _csv_request(row: dict[str | None, Any]) -> dict[str, Any]:
+    profile: dict[str, Any] = {}
+    use_case: dict[str, Any] = {}
+    request: dict[str, Any] = {"profile": profile, "use_case": use_case}
+    for column, cell in row.items():
+        if column is None or not isinstance(cell, str) or not cell.strip():
+            continue  # surplus cells, missing cells, empty cells (defaults apply)
+        column = column.strip()
+        value: Any = cell.strip()
+        if column in _LIST_FIELDS:
+            value = [v.strip() for v in value.split(_LIST_SEPARATOR) if v.strip()]
+        if column in _PROFILE_FIELDS:
+            profile[column] = value
+        elif column in _USE_CASE_FIELDS:
+            use_case[column] = value
+        else:
+            request[column] = value
+    return request
+
+
+def read_rows(lines: Iterable[str], fmt: BulkFormat) -> Iterator[Any]:
+    """Rows of a CSV (with a header line) or JSONL file as request dicts, in file order."""
+    if fmt == "csv":
+        for row in csv.DictReader(lines):
+            yield _csv_request(row)
+        return
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            yield None
+
+
+def _scan_text(req: AssessmentRequest) -> str:
+    # The free-text fields /assess scans, joined the same way
+    return "\n".join(
+        [
+            req.profile.org_name,
+            req.profile.sector,
+            req.use_case.name,
+            req.use_case.description,
+            req.notes or "",
+        ]
+    ).strip()
+
+
+def _gaps_json(flags: np.ndarray) -> str:
+    return json.dumps(
+        [{"area": g.area, "severity": g.severity} for g, on in zip(GAPS, flags, strict=True) if on],
+        ensure_ascii=False,
+    )
+
+
+class BulkAssessment:
+    """
+    Assesses rows chunk by chunk: `run` yields one NDJSON line per row, then the summary.
+
+    Row records (SAFE: no input text; validation errors carry no input values):
+      {"event": "assessment", "row", "id"?, "maturity_score", "maturity_level", "top_gaps"}
+      {"event": "blocked", "row", "id"?, "risk_score", "finding_types"}
+      {"event": "invalid", "row", "id"?, "errors"}
+    `row` is the 1-based record number (CSV: excluding the header); `top_gaps` lists
+    area and severity of the gaps /assess would return. The summary's `finding_totals`
+    counts guardrail matches over every scanned row, blocked or not.
+    """
+
+    def __init__(self, scanner: GuardrailScanner, chunk_rows: int | None = None):
+        self.scanner = scanner
+        self.chunk_rows = chunk_rows or settings.assessment_bulk_chunk_rows
+        self.rows = 0
+        self.blocked = 0
+        self.invalid = 0
+        self.levels: Counter[str] = Counter()
+        self.finding_totals: Counter[str] = Counter()
+
+    def run(self, rows: Iterable[Any]) -> Iterator[str]:
+        rows = iter(rows)
+        while chunk := list(islice(rows, self.chunk_rows)):
+            yield from self._chunk(chunk)
+        yield json.dumps({"event": "summary", **self.summary()}, separators=(",", ":")) + "\n"
+
+    def summary(self) -> dict[str, Any]:
+        return {
+            "rows_count": self.rows,
+            "assessed_count": self.rows - self.blocked - self.invalid,
+            "blocked_count": self.blocked,
+            "invalid_count": self.invalid,
+            "maturity_levels": dict(self.levels),
+            "finding_totals": dict(self.finding_totals),
+        }
+
+    def _chunk(self, chunk: list[Any]) -> list[str]:
+        first_row = self.rows + 1
+        self.rows += len(chunk)
+        prefixes: list[str] = []
+        lines: list[str | None] = []
+        valid: list[tuple[int, AssessmentRequest]] = []
+        for i, data in enumerate(chunk):
+            row_id = data.pop("id", None) if isinstance(data, dict) else None
+            prefixes.append(
+                f'"row":{first_row + i},'
+                + (f'"id":{json.dumps(row_id, ensure_ascii=False)},' if row_id is not None else "")
+            )
+            try:
+                valid.append((i, AssessmentRequest.model_validate(data)))
+                lines.append(None)
+            except ValidationError as e:
+                errors = e.errors(include_url=False, include_context=False, include_input=False)
+                lines.append(
+                    f'{{"event":"invalid",{prefixes[i]}"errors":{json.dumps(errors, default=str)}}}\n'
+                )
+                self.invalid += 1
+
+        # One guardrail batch per chunk (spread over the process pool when large)
+        results = check_batch([_scan_text(req) for _, req in valid], self.scanner, mode="spans")
+        allowed: list[tuple[int, AssessmentRequest]] = []
+        for (i, req), result in zip(valid, results, strict=True):
+            for f in result.findings:  # allowed rows' findings (phone numbers, say) count too
+                self.finding_totals[f.type] += f.matches_count
+            if result.allow:
+                allowed.append((i, req))
+                continue
+            types = [f.type for f in result.findings]
+            lines[i] = (
+                f'{{"event":"blocked",{prefixes[i]}"risk_score":{result.risk_score},'
+                f'"finding_types":{json.dumps(types)}}}\n'
+            )
+            self.blocked += 1
+
+        masks = np.fromiter(
+            (feature_mask(req.profile, req.use_case) for _, req in allowed),
+            dtype=np.uint64,
+            count=len(allowed),
+        )
+        scores = score_portfolio(masks)
+        # Few distinct gap lists in any portfolio: render each once
+        gap_sets, gap_index = np.unique(scores.gaps, axis=0, return_inverse=True)
+        gap_json = [_gaps_json(flags) for flags in gap_sets]
+        for (i, _), score, level, gaps in zip(
+            allowed, scores.scores.tolist(), scores.levels.tolist(), gap_index.tolist(), strict=True
+        ):
+            self.levels[MATURITY_LEVELS[level]] += 1
+            lines[i] = (
+                f'{{"event":"assessment",{prefixes[i]}"maturity_score":{score},'
+                f'"maturity_level":"{MATURITY_LEVELS[level]}","top_gaps":{gap_json[gaps]}}}\n'
+            )
+        return [line for line in lines if line is not None]
+
+
+def assess_file(
+    source: IO[bytes], target: IO[bytes], scanner: GuardrailScanner, fmt: BulkFormat | None = None
+) -> dict[str, Any]:
+    """Assesses every row of `source`, writing NDJSON to `target`; returns the summary."""
+    if fmt is None:
+        fmt = detect_format(source.read(64))
+        source.seek(0)
+    bulk = BulkAssessment(scanner)
+    lines = (
+        line.decode("utf-8-sig" if n == 0 else "utf-8", "replace") for n, line in enumerate(source)
+    )
+    for line in bulk.run(read_rows(lines, fmt)):
+        target.write(line.encode("utf-8"))
+    return bulk.summary()
+
+
+def main(argv: list[str] | None = None) -> int:
+    from app.services.guardrail_executor import shutdown_pool
+    from app.services.guardrail_rules import guardrail_rules
+
+    parser = argparse.ArgumentParser(description="Assess a portfolio of AI use cases")
+    parser.add_argument("file", type=Path, help="CSV (with header) or JSONL of use cases")
+    parser.add_argument("-o", "--output", type=Path, default=None, help="default: stdout")
+    parser.add_argument("--format", choices=["csv", "jsonl"], default=None, help="default: detect")
+    parser.add_argument("--org", default=None, help="guardrail rules of this org id")
+    args = parser.parse_args(argv)
+
+    guardrail_rules.reload()
+    scanner = guardrail_rules.get(args.org)
+    try:
+        with open(args.file, "rb") as source:
+            if args.output is None:
+                assess_file(source, sys.stdout.buffer, scanner, args.format)
+            else:
+                with open(args.output, "wb") as target:
+                    assess_file(source, target, scanner, args.format)
+    finally:
+        shutdown_pool()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,149 @@
+from collections.abc import Callable, Iterator, Sequence
+from typing import Generic, NamedTuple, TypeVar
+
+import numpy as np
+
+from app.models.assessment import AIUseCase, OrganisationProfile
+
+# Every input the deliverable rules may depend on, one bit each
+FEATURES = (
+    *(
+        f"data:{t}"
+        for t in ("public", "internal", "personal", "special_category", "financial", "health")
+    ),
+    *(f"channel:{c}" for c in ("email", "chat", "voice", "documents", "web")),
+    *(f"user:{u}" for u in ("staff", "contractors", "customers")),
+    "third_parties",
+    "regulated",
+    *(f"appetite:{a}" for a in ("low", "medium", "high")),
+    *(f"size:{s}" for s in ("micro", "sme", "enterprise")),
+)
+_BITS = {name: 1 << i for i, name in enumerate(FEATURES)}
+
+
+def features(*names: str) -> int:
+    """Bitmask of the named features (raises KeyError for an unknown one)."""
+    mask = 0
+    for name in names:
+        mask |= _BITS[name]
+    return mask
+
+
+# Features of which a request has exactly one
+_EXCLUSIVE = (
+    features("appetite:low", "appetite:medium", "appetite:high"),
+    features("size:micro", "size:sme", "size:enterprise"),
+)
+
+
+def feature_mask(
+    profile: OrganisationProfile, use_case: AIUseCase, risk_appetite: str | None = None
+) -> int:
+    names = [
+        *(f"data:{t}" for t in use_case.data_types),
+        *(f"channel:{c}" for c in use_case.channels),
+        *(f"user:{u}" for u in use_case.users),
+        f"size:{profile.org_size}",
+    ]
+    if use_case.third_parties:
+        names.append("third_parties")
+    if profile.regulated:
+        names.append("regulated")
+    if risk_appetite is not None:
+        names.append(f"appetite:{risk_appetite}")
+    return features(*names)
+
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class Rule(NamedTuple, Generic[T]):
+    """
+    One row of a decision table: `output` applies when every `all_of` feature, at
+    least one `any_of` feature (if any are given) and no `none_of` feature is present.
+    """
+
+    output: T
+    all_of: int = 0
+    any_of: int = 0
+    none_of: int = 0
+
+    def matches(self, mask: int) -> bool:
+        return (
+            mask & self.all_of == self.all_of
+            and (not self.any_of or bool(mask & self.any_of))
+            and not mask & self.none_of
+        )
+
+
+def _bits(mask: int) -> Iterator[int]:
+    while mask:
+        bit = mask & -mask
+        yield bit
+        mask ^= bit
+
+
+def _reachable(relevant: int) -> list[int]:
+    """Every combination of the `relevant` features a request can have."""
+    exclusive = 0
+    for group in _EXCLUSIVE:
+        exclusive |= group
+    combos = [0]
+    for bit in _bits(relevant & ~exclusive):
+        combos += [combo | bit for combo in combos]
+    for group in _EXCLUSIVE:
+        used = group & relevant
+        if used:
+            # One of the group's features, or one the table does not look at
+            choices = [*_bits(used), *([0] if used != group else [])]
+            combos = [combo | choice for combo in combos for choice in choices]
+    return combos
+
+
+class DecisionTable(Generic[T, R]):
+    """
+    Rules as data, evaluated against a feature bitmask (see `feature_mask`).
+
+    At construction every reachable combination of the features the rules look at is
+    evaluated, and `build` turns each distinct list of matching outputs into the
+    artefact part it describes, once. `lookup` is then a dict access: generators
+    only fill in the per-request (org and use case) strings. Built values are
+    shared between requests and must not be mutated.
+    """
+
+    def __init__(self, rules: Sequence[Rule[T]], build: Callable[[list[T]], R]):
+        self.rules = tuple(rules)
+        self.relevant = 0
+        for rule in self.rules:
+            self.relevant |= rule.all_of | rule.any_of | rule.none_of
+        self._build = build
+        self._all_of = np.array([r.all_of for r in self.rules], dtype=np.uint64)
+        self._any_of = np.array([r.any_of for r in self.rules], dtype=np.uint64)
+        self._none_of = np.array([r.none_of for r in self.rules], dtype=np.uint64)
+        built: dict[tuple[int, ...], R] = {}
+        self._results: dict[int, R] = {}
+        for mask in _reachable(self.relevant):
+            matched = tuple(i for i, rule in enumerate(self.rules) if rule.matches(mask))
+            if matched not in built:
+                built[matched] = build([self.rules[i].output for i in matched])
+            self._results[mask] = built[matched]
+
+    def evaluate(self, mask: int) -> list[T]:
+        """Outputs of the rules matching `mask`, in table order."""
+        return [rule.output for rule in self.rules if rule.matches(mask)]
+
+    def match_all(self, masks: np.ndarray) -> np.ndarray:
+        """Vectorised `Rule.matches`: rows x rules booleans for a uint64 array of masks."""
+        masks = masks.astype(np.uint64, copy=False).reshape(-1, 1)
+        return (
+            ((masks & self._all_of) == self._all_of)
+            & (((masks & self._any_of) != 0) | (self._any_of == 0))
+            & ((masks & self._none_of) == 0)
+        )
+
+    def lookup(self, mask: int) -> R:
+        result = self._results.get(mask & self.relevant)
+        if result is None:  # a combination no request can have (e.g. two appetites)
+            result = self._build(self.evaluate(mask))
+        return result
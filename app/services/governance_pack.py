@@ -0,0 +1,34 @@
+from app.models.assessment import AssessmentRequest
+from app.models.board_brief import BoardBriefRequest
+from app.models.governance_pack import GovernancePackRequest, GovernancePackResponse
+from app.models.policy import PolicyRequest
+from app.models.risk_register import RiskRegisterRequest
+from app.services.assessment import run_maturity_assessment
+from app.services.board_brief import generate_board_brief
+from app.services.policy import generate_ai_use_policy
+from app.services.risk_register import build_risk_register
+
+
+def build_governance_pack(req: GovernancePackRequest) -> GovernancePackResponse:
+    """
+    All four artefacts for one use case; the board brief is built from the other three.
+    The generators are deterministic and take microseconds, so they run in sequence:
+    fanning them out to threads would cost more than the work itself.
+    """
+    common = {"profile": req.profile, "use_case": req.use_case, "notes": req.notes}
+
+    assessment = run_maturity_assessment(AssessmentRequest(**common))
+    policy = generate_ai_use_policy(PolicyRequest(**common, risk_appetite=req.risk_appetite))
+    risk_register = build_risk_register(RiskRegisterRequest(**common))
+    board_brief = generate_board_brief(
+        BoardBriefRequest(
+            **common, assessment=assessment, policy=policy, risk_register=risk_register
+        )
+    )
+
+    return GovernancePackResponse(
+        assessment=assessment,
+        policy=policy,
+        risk_register=risk_register,
+        board_brief=board_brief,
+    )
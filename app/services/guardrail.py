@@ -0,0 +1,499 @@
+import hashlib
+import re
+import string
+from bisect import bisect_left
+from collections.abc import Callable, Iterator
+from functools import partial
+from itertools import accumulate, groupby
+from typing import NamedTuple
+
+from app.core.config import settings
+from app.models.guardrail import (
+    Finding,
+    FindingType,
+    GuardrailCheckResponse,
+    GuardrailSpan,
+    ResponseMode,
+)
+from app.services.guardrail_injection import (
+    INJECTION_REACH,
+    PHRASE_LEVEL,
+    find_prompt_injections,
+)
+
+# Reference pattern; detection uses the equivalent linear `_find_emails`
+EMAIL_RE = re.compile(r"\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}\b")
+_EMAIL_DOMAIN_RE = re.compile(r"[A-Za-z0-9.-]+\.[A-Za-z]{2,}\b")
+_EMAIL_LOCAL_CHARS = frozenset(string.ascii_letters + string.digits + "._%+-")
+PHONE_RE = re.compile(r"\b(?:\+?44\s?7\d{3}|\(?07\d{3}\)?)\s?\d{3}\s?\d{3}\b")
+NI_RE = re.compile(r"\b(?!BG|GB|KN|NK|NT|TN|ZZ)[A-CEGHJ-PR-TW-Z]{2}\d{6}[A-D]\b", re.IGNORECASE)
+
+# Payment cards are tokenized rather than matched with one regex (see `_find_cards`)
+_DIGIT_RUN_RE = re.compile(r"\d+(?:[ -]+\d+)*")
+_SEPARATORS_RE = re.compile(r"([ -]+)")
+CARD_MIN_DIGITS = 13
+CARD_MAX_DIGITS = 19
+
+
+class Span(NamedTuple):
+    """A typed match: text[start:end] was flagged by the detector for `type`."""
+
+    start: int
+    end: int
+    type: FindingType
+
+
+class Detector(NamedTuple):
+    type: FindingType
+    label: str
+    severity: str
+    recommendation: str
+    score: int
+    placeholder: str
+    find: Callable[[str], Iterator[tuple[int, int]]]
+    # How far from a match the text can change what `find` reports: incremental scans
+    # (streams, draft sessions) keep at least this much context around what they scan
+    reach: int = 0
+
+
+_LUHN_DOUBLED = (0, 2, 4, 6, 8, 1, 3, 5, 7, 9)
+
+
+def _luhn_check(number: str, start: int = 0, end: int | None = None) -> bool:
+    """
+    Luhn check over the digits of number[start:end], skipping separators.
+    Walks the string in place: no re.sub, no digit list.
+    """
+    if end is None:
+        end = len(number)
+    checksum = 0
+    count = 0
+    for k in range(end - 1, start - 1, -1):
+        ch = number[k]
+        if not ch.isdecimal():
+            continue
+        d = int(ch)
+        if count & 1:
+            d = _LUHN_DOUBLED[d]
+        checksum += d
+        count += 1
+    return CARD_MIN_DIGITS <= count <= CARD_MAX_DIGITS and checksum % 10 == 0
+
+
+def _regex_spans(pattern: re.Pattern, text: str) -> Iterator[tuple[int, int]]:
+    for m in pattern.finditer(text):
+        yield m.span()
+
+
+def _is_word_char(text: str, i: int) -> bool:
+    ch = text[i]
+    return ch.isalnum() or ch == "_"
+
+
+def _luhn_prefix_sums(digits: str) -> tuple[list[int], list[int]]:
+    """
+    Batched Luhn validation for a whole digit run. Returns prefix sums of the
+    digits weighted for a candidate whose last digit sits on an even index (odd
+    indexes doubled) and on an odd index (even indexes doubled). The checksum of
+    digits [a, b) is then one subtraction on the table picked by the parity of b.
+    """
+    values = list(map(int, digits))
+    doubled = list(map(_LUHN_DOUBLED.__getitem__, values))
+    ends_even = values[:]
+    ends_even[1::2] = doubled[1::2]
+    ends_odd = doubled
+    ends_odd[1::2] = values[1::2]
+    return [0, *accumulate(ends_even)], [0, *accumulate(ends_odd)]
+
+
+def _card_candidates(text: str, run_start: int, run: str) -> Iterator[tuple[int, int]]:
+    """
+    Luhn-valid card numbers within one run of digit groups joined by spaces/dashes.
+    A candidate starts on a group boundary and ends at the first group end that
+    brings it to 13+ digits; it is rejected if that overshoots 19 digits or the
+    run ends glued to a word character. Every group holds at least one digit, so
+    each start looks at most 13 groups ahead: the run is processed in linear time.
+    """
+    parts = _SEPARATORS_RE.split(run)  # digits, separators, digits, ...
+    groups = parts[0::2]
+    digits = "".join(groups)
+    if len(digits) < CARD_MIN_DIGITS:
+        return
+
+    n = len(groups)
+    bounds = list(accumulate(map(len, parts), initial=run_start))  # group g is [2g, 2g+1]
+    offsets = list(accumulate(map(len, groups), initial=0))  # digits before each group
+    # Sentinels so every lookahead window is in range; hitting one means "ran out"
+    offsets.extend([len(digits) + CARD_MIN_DIGITS] * CARD_MIN_DIGITS)
+
+    # The run can only start a candidate at its first group on a word boundary
+    first = 1 if run_start > 0 and _is_word_char(text, run_start - 1) else 0
+    run_end = run_start + len(run)
+    glued_end = run_end < len(text) and _is_word_char(text, run_end)
+    ends_even, ends_odd = _luhn_prefix_sums(digits)
+
+    i = first
+    while i < n:
+        a = offsets[i]
+        k = bisect_left(offsets, a + CARD_MIN_DIGITS, i + 1, i + CARD_MIN_DIGITS + 1)
+        if k > n:
+            return
+        b = offsets[k]
+        if b - a <= CARD_MAX_DIGITS and (k < n or not glued_end):
+            weighted = ends_even if b & 1 else ends_odd  # last digit index is b - 1
+            if (weighted[b] - weighted[a]) % 10 == 0:
+                yield bounds[2 * i], bounds[2 * k - 1]
+                i = k
+                continue
+        i += 1
+
+
+def _find_cards(text: str) -> Iterator[tuple[int, int]]:
+    """
+    Linear-time payment card detection (replaces the backtracking CC_RE).
+    Runs of digit groups separated only by spaces/dashes are found with an
+    unambiguous pattern, then split into groups and Luhn-checked in batches.
+    """
+    for run in _DIGIT_RUN_RE.finditer(text):
+        if run.end() - run.start() >= CARD_MIN_DIGITS:
+            yield from _card_candidates(text, run.start(), run.group())
+
+
+def _find_emails(text: str) -> Iterator[tuple[int, int]]:
+    """
+    Same matches as EMAIL_RE.finditer, in linear time. The regex retries every word
+    boundary of a long local-part run ("1-1-1-...") to the end, which is quadratic.
+    Here each "@" is found with str.find, the domain is matched forward from it and
+    the local part is walked back once to its leftmost word boundary.
+    """
+    last_end = 0
+    at = text.find("@")
+    while at != -1:
+        domain = _EMAIL_DOMAIN_RE.match(text, at + 1)
+        if domain is not None:
+            run = at
+            while run > last_end and text[run - 1] in _EMAIL_LOCAL_CHARS:
+                run -= 1
+            for start in range(run, at):
+                if _is_word_char(text, start) != (start > 0 and _is_word_char(text, start - 1)):
+                    last_end = domain.end()
+                    yield start, last_end
+                    break
+        at = text.find("@", max(at + 1, last_end))
+
+
+# Order matters: it is both the findings order and the redaction priority
+# (an email span wins over a phone span that overlaps it, and so on).
+DETECTORS: tuple[Detector, ...] = (
+    Detector(
+        type="email",
+        label="Email address detected",
+        severity="medium",
+        recommendation="Replace emails with placeholders like [REDACTED_EMAIL] before using AI.",
+        score=20,
+        placeholder="[REDACTED_EMAIL]",
+        find=_find_emails,
+    ),
+    Detector(
+        type="phone",
+        label="Phone number detected",
+        severity="medium",
+        recommendation="Replace phone numbers with placeholders like [REDACTED_PHONE].",
+        score=20,
+        placeholder="[REDACTED_PHONE]",
+        find=partial(_regex_spans, PHONE_RE),
+    ),
+    Detector(
+        type="ni_number",
+        label="UK National Insurance number detected",
+        severity="high",
+        recommendation="Do not send NI numbers to AI. Remove or replace with [REDACTED_NI].",
+        score=40,
+        placeholder="[REDACTED_NI]",
+        find=partial(_regex_spans, NI_RE),
+    ),
+    Detector(
+        type="credit_card",
+        label="Possible payment card number detected (Luhn validated)",
+        severity="high",
+        recommendation="Do not send card numbers to AI. Remove or replace with [REDACTED_CARD].",
+        score=40,
+        placeholder="[REDACTED_CARD]",
+        find=_find_cards,
+    ),
+    Detector(
+        type="prompt_injection",
+        label="Possible prompt injection detected",
+        severity="high",
+        recommendation=(
+            "Remove instructions aimed at the AI system (e.g. 'ignore previous instructions') "
+            "or replace with [REDACTED_INJECTION]."
+        ),
+        score=40,
+        placeholder="[REDACTED_INJECTION]",
+        find=find_prompt_injections,
+        reach=INJECTION_REACH,
+    ),
+    # One override or exfiltration phrase on its own is common in policy text: reported
+    # for review, not blocked by default
+    Detector(
+        type="injection_phrase",
+        label="Instruction-like phrase detected (single prompt-injection signal)",
+        severity="medium",
+        recommendation=(
+            "Check the phrase is not addressed to the AI system; rephrase or replace with "
+            "[REDACTED_INJECTION] if it is."
+        ),
+        score=10,
+        placeholder="[REDACTED_INJECTION]",
+        find=partial(find_prompt_injections, level=PHRASE_LEVEL),
+        reach=INJECTION_REACH,
+    ),
+)
+
+
+def _no_matches(text: str) -> Iterator[tuple[int, int]]:
+    return iter(())
+
+
+# Data-driven detectors: only org rule sets that configure them include them, after the
+# built-ins, with `find` bound to the org's data (see guardrail_rules.compile_rules)
+DENY_LIST_DETECTOR = Detector(
+    type="deny_list",
+    label="Deny-listed term detected (customer, project or account reference)",
+    severity="high",
+    recommendation="Remove deny-listed names and references or replace with [REDACTED_TERM].",
+    score=40,
+    placeholder="[REDACTED_TERM]",
+    find=_no_matches,
+)
+
+PLACEHOLDERS: dict[str, str] = {d.type: d.placeholder for d in (*DETECTORS, DENY_LIST_DETECTOR)}
+
+
+_SEVERITY_RANK = {"low": 1, "medium": 2, "high": 3}
+
+
+def ruleset_version(
+    detectors: tuple[Detector, ...],
+    block_severity: str | None = "high",
+    block_threshold: int | None = None,
+) -> str:
+    """
+    Fingerprint of the configurable parts of a rule set; keys cached results.
+    Detection code itself only changes with a deploy, which starts with an empty cache.
+    """
+    h = hashlib.sha256()
+    for d in detectors:
+        for part in (d.type, d.severity, str(d.score), d.placeholder, d.label, d.recommendation):
+            h.update(part.encode("utf-8") + b"\0")
+        # Data-driven finders (deny lists) fingerprint their data
+        h.update(getattr(d.find, "fingerprint", "").encode("utf-8") + b"\0")
+    h.update(f"{block_severity}\0{block_threshold}".encode())
+    return h.hexdigest()[:16]
+
+
+class GuardrailScanner(NamedTuple):
+    """
+    A compiled, immutable rule set: detectors in priority order plus the block policy.
+    Detectors share the module's compiled patterns, so building one compiles nothing;
+    instances are safe to share between threads and to pickle into pool workers.
+    """
+
+    detectors: tuple[Detector, ...]
+    block_severity: str | None  # block on any finding at or above this severity
+    block_threshold: int | None  # block when the risk score reaches this
+    version: str
+
+
+def compile_scanner(
+    detectors: tuple[Detector, ...] = DETECTORS,
+    block_severity: str | None = "high",
+    block_threshold: int | None = None,
+) -> GuardrailScanner:
+    return GuardrailScanner(
+        detectors=detectors,
+        block_severity=block_severity,
+        block_threshold=block_threshold,
+        version=ruleset_version(detectors, block_severity, block_threshold),
+    )
+
+
+# Built-in rules: block on any high severity finding
+DEFAULT_SCANNER = compile_scanner()
+
+
+def scan(text: str, detectors: tuple[Detector, ...] = DETECTORS) -> list[Span]:
+    """
+    Runs every detector over the original text once and returns all typed spans,
+    in detector order. Spans from different detectors may overlap; see `resolve_overlaps`.
+    No copies of the text are made.
+    """
+    spans: list[Span] = []
+    for detector in detectors:
+        f_type = detector.type
+        spans.extend(Span(start, end, f_type) for start, end in detector.find(text))
+    return spans
+
+
+def resolve_overlaps(spans: list[Span]) -> list[Span]:
+    """
+    Keeps the spans that would survive sequential masking: a span is dropped when it
+    overlaps a span from an earlier detector. Returns spans sorted by start offset.
+    Expects spans grouped by detector with each group sorted, as `scan` returns them.
+    """
+    kept: list[Span] = []
+    for _, group in groupby(spans, key=lambda s: s.type):
+        merged: list[Span] = []
+        i = 0
+        for span in group:
+            while i < len(kept) and kept[i].end <= span.start:
+                merged.append(kept[i])
+                i += 1
+            if i < len(kept) and kept[i].start < span.end:
+                continue
+            merged.append(span)
+        merged.extend(kept[i:])
+        kept = merged
+    return kept
+
+
+def redact(
+    text: str,
+    spans: list[Span],
+    placeholders: dict[str, str] = PLACEHOLDERS,
+    limit: int | None = None,
+) -> str:
+    """
+    Builds the redacted text in a single pass from non-overlapping, sorted spans.
+    With `limit`, returns only its first `limit` characters, copying no more of the
+    input than that.
+    """
+    if limit is None:
+        if not spans:
+            return text
+        parts: list[str] = []
+        pos = 0
+        for span in spans:
+            parts.append(text[pos : span.start])
+            parts.append(placeholders[span.type])
+            pos = span.end
+        parts.append(text[pos:])
+        return "".join(parts)
+
+    parts = []
+    pos = 0
+    remaining = limit
+    for span in spans:
+        before = text[pos : min(span.start, pos + remaining)]
+        placeholder = placeholders[span.type][: remaining - len(before)]
+        parts += (before, placeholder)
+        remaining -= len(before) + len(placeholder)
+        if remaining <= 0:
+            break
+        pos = span.end
+    else:
+        parts.append(text[pos : pos + remaining])
+    return "".join(parts)
+
+
+def score_findings(
+    counts: dict[str, int], scanner: GuardrailScanner = DEFAULT_SCANNER
+) -> tuple[list[Finding], int, bool]:
+    """
+    Turns per-detector match counts into findings, a capped risk score and the allow decision.
+    """
+    findings: list[Finding] = []
+    risk_score = 0
+    for detector in scanner.detectors:
+        count = counts.get(detector.type, 0)
+        if count > 0:
+            findings.append(
+                Finding(
+                    type=detector.type,
+                    label=detector.label,
+                    matches_count=count,
+                    severity=detector.severity,  # type: ignore[arg-type]
+                    recommendation=detector.recommendation,
+                )
+            )
+            risk_score += detector.score
+
+    # Cap risk score
+    risk_score = min(risk_score, 100)
+
+    # Decision: block on a finding at or above the rule set's severity, or on its threshold
+    allow = True
+    if scanner.block_severity is not None:
+        floor = _SEVERITY_RANK[scanner.block_severity]
+        allow = not any(_SEVERITY_RANK[f.severity] >= floor for f in findings)
+    if scanner.block_threshold is not None and risk_score >= scanner.block_threshold:
+        allow = False
+
+    return findings, risk_score, allow
+
+
+def count_spans(spans: list[Span], counts: dict[str, int] | None = None) -> dict[str, int]:
+    counts = {} if counts is None else counts
+    for span in spans:
+        counts[span.type] = counts.get(span.type, 0) + 1
+    return counts
+
+
+class GuardrailVerdict(NamedTuple):
+    """
+    Everything a check decides about a text, without the text itself:
+    redaction is re-applied from the (resolved, sorted) spans when needed.
+    """
+
+    allow: bool
+    risk_score: int
+    findings: tuple[Finding, ...]
+    spans: tuple[Span, ...]
+
+
+def evaluate(text: str, scanner: GuardrailScanner = DEFAULT_SCANNER) -> GuardrailVerdict:
+    spans = scan(text, scanner.detectors)
+    findings, risk_score, allow = score_findings(count_spans(spans), scanner)
+    return GuardrailVerdict(allow, risk_score, tuple(findings), tuple(resolve_overlaps(spans)))
+
+
+def to_response(
+    text: str, verdict: GuardrailVerdict, mode: ResponseMode = "redact"
+) -> GuardrailCheckResponse:
+    """
+    Builds the response for `mode`: only "redact" copies the whole text; "preview"
+    stops after `guardrail_preview_chars` and "spans" copies none of it.
+    """
+    redacted_text = spans = None
+    if mode == "spans":
+        spans = [
+            GuardrailSpan(
+                offset=s.start,
+                length=s.end - s.start,
+                type=s.type,  # type: ignore[arg-type]
+                placeholder=PLACEHOLDERS[s.type],
+            )
+            for s in verdict.spans
+        ]
+    else:
+        limit = settings.guardrail_preview_chars if mode == "preview" else None
+        redacted_text = redact(text, list(verdict.spans), limit=limit)
+    return GuardrailCheckResponse(
+        allow=verdict.allow,
+        risk_score=verdict.risk_score,
+        findings=list(verdict.findings),
+        redacted_text=redacted_text,
+        spans=spans,
+    )
+
+
+def check_text(
+    text: str, scanner: GuardrailScanner = DEFAULT_SCANNER, mode: ResponseMode = "redact"
+) -> GuardrailCheckResponse:
+    """
+    Deterministic SAFE guardrail check.
+    Scores each detector once, applies the scanner's block policy and returns a redacted
+    copy (or a preview, or the match spans: see `to_response`).
+    """
+    return to_response(text, evaluate(text, scanner), mode)
@@ -0,0 +1,74 @@
+import hashlib
+import time
+from collections.abc import Callable
+
+from app.core.config import settings
+from app.models.guardrail import GuardrailCheckResponse, ResponseMode
+from app.services.guardrail import (
+    DEFAULT_SCANNER,
+    GuardrailScanner,
+    GuardrailVerdict,
+    to_response,
+)
+from app.services.guardrail_executor import evaluate_offloaded
+from app.services.lru_cache import ByteBudgetLRU
+
+# Rough per-object costs (CPython, 64-bit) used for the memory cap
+_ENTRY_BYTES = 320  # key, OrderedDict slot, entry tuple
+_SPAN_BYTES = 88
+_FINDING_BYTES = 480
+
+
+def _verdict_size(verdict: GuardrailVerdict) -> int:
+    return _ENTRY_BYTES + _SPAN_BYTES * len(verdict.spans) + _FINDING_BYTES * len(verdict.findings)
+
+
+class GuardrailResultCache(ByteBudgetLRU[GuardrailVerdict]):
+    """
+    LRU cache of guardrail verdicts keyed by sha256(ruleset version + text).
+
+    SAFE: neither the text nor the redacted text is stored. Entries hold the decision,
+    findings and match offsets only; redaction is re-applied to the caller's text on a hit.
+    Bounded by entry count and approximate memory; entries expire after `ttl_seconds`.
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        max_bytes: int,
+        ttl_seconds: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        super().__init__(max_entries, max_bytes, ttl_seconds, clock)
+
+    @staticmethod
+    def key(text: str, ruleset_version: str) -> bytes:
+        h = hashlib.sha256(ruleset_version.encode("utf-8"))
+        h.update(b"\0")
+        h.update(text.encode("utf-8", "surrogatepass"))
+        return h.digest()
+
+    def _size(self, value: GuardrailVerdict) -> int:
+        return _verdict_size(value)
+
+
+guardrail_cache = GuardrailResultCache(
+    max_entries=settings.guardrail_cache_max_entries,
+    max_bytes=settings.guardrail_cache_max_bytes,
+    ttl_seconds=settings.guardrail_cache_ttl_seconds,
+)
+
+
+def check_text_cached(
+    text: str, scanner: GuardrailScanner = DEFAULT_SCANNER, mode: ResponseMode = "redact"
+) -> GuardrailCheckResponse:
+    """check_text with verdict caching; identical text under the same rules is scanned once."""
+    if not settings.guardrail_cache_enabled:
+        return to_response(text, evaluate_offloaded(text, scanner), mode)
+
+    key = guardrail_cache.key(text, scanner.version)
+    verdict = guardrail_cache.get(key)
+    if verdict is None:
+        verdict = evaluate_offloaded(text, scanner)
+        guardrail_cache.put(key, verdict)
+    return to_response(text, verdict, mode)
@@ -0,0 +1,198 @@
+import hashlib
+import sys
+from array import array
+from collections import OrderedDict, deque
+from collections.abc import Iterable, Iterator
+from threading import Lock
+from typing import Any
+
+from app.core.config import settings
+from app.services.guardrail import _is_word_char
+from app.services.guardrail_injection import _fold
+
+# Transitions live in one flat dict keyed by (state << 21) | codepoint:
+# far smaller than a dict per trie node when there are tens of thousands of terms
+_CHAR_BITS = 21
+_CHAR_MASK = (1 << _CHAR_BITS) - 1
+
+# Automata kept alive for sharing between orgs with identical lists (and between
+# batches inside a pool worker, where each slice unpickles its scanner). At least one
+# per deny list in use (see share), or workers scanning for more orgs than
+# it holds would rebuild an automaton for nearly every slice
+_shared_max = settings.guardrail_deny_list_shared_min
+_shared: OrderedDict[str, "DenyList"] = OrderedDict()
+_shared_lock = Lock()
+
+
+def _fingerprint(terms: tuple[str, ...], case_sensitive: bool, word_boundary: bool) -> str:
+    h = hashlib.sha256(f"{case_sensitive}\0{word_boundary}\0".encode())
+    for term in terms:
+        h.update(term.encode("utf-8", "surrogatepass") + b"\0")
+    return h.hexdigest()[:16]
+
+
+def _normalise(terms: Iterable[str], case_sensitive: bool) -> tuple[str, ...]:
+    stripped = (t.strip() for t in terms)
+    return tuple(sorted({t if case_sensitive else _fold(t) for t in stripped if t}))
+
+
+class DenyList:
+    """
+    Aho-Corasick automaton over a deny list of literal terms.
+
+    Matching is one pass over the text whatever the number of terms: each character
+    follows one transition (or a few failure links), and every term ending there is
+    reported through the output links. Overlapping matches are then reduced to the
+    leftmost-longest ones. Instances are immutable once built; call one as a
+    detector `find` function. Build through `build_deny_list` to share automata.
+    """
+
+    def __init__(self, terms: tuple[str, ...], case_sensitive: bool, word_boundary: bool):
+        self.terms = terms  # normalised: stripped, folded unless case_sensitive, sorted
+        self.case_sensitive = case_sensitive
+        self.word_boundary = word_boundary
+        self.fingerprint = _fingerprint(terms, case_sensitive, word_boundary)
+
+        goto: dict[int, int] = {}
+        term_len = array("i", [0])  # length of the term ending at a state, 0 if none
+        for term in terms:
+            state = 0
+            for ch in term:
+                key = (state << _CHAR_BITS) | ord(ch)
+                nxt = goto.get(key)
+                if nxt is None:
+                    nxt = goto[key] = len(term_len)
+                    term_len.append(0)
+                state = nxt
+            term_len[state] = len(term)
+
+        children: dict[int, list[tuple[int, int]]] = {}
+        for key, child in goto.items():
+            children.setdefault(key >> _CHAR_BITS, []).append((key & _CHAR_MASK, child))
+
+        # Breadth-first, so a state's failure target is always resolved before it
+        n = len(term_len)
+        fail = array("i", bytes(4 * n))
+        out = array("i", bytes(4 * n))  # nearest state on the failure chain ending a term
+        queue = deque(child for _, child in children.get(0, ()))
+        for state in queue:
+            out[state] = state if term_len[state] else 0
+        while queue:
+            state = queue.popleft()
+            for code, child in children.get(state, ()):
+                f = fail[state]
+                while f and (f << _CHAR_BITS) | code not in goto:
+                    f = fail[f]
+                target = goto.get((f << _CHAR_BITS) | code, 0)
+                fail[child] = target
+                out[child] = child if term_len[child] else out[target]
+                queue.append(child)
+
+        self._goto = goto
+        self._fail = fail
+        self._out = out
+        self._term_len = term_len
+        self.states = n
+        self.approx_bytes = (
+            sys.getsizeof(goto)
+            + sum(sys.getsizeof(k) + sys.getsizeof(v) for k, v in goto.items())
+            + sum(sys.getsizeof(a) for a in (fail, out, term_len))
+            + sys.getsizeof(terms)
+            + sum(map(sys.getsizeof, terms))
+        )
+
+    def __reduce__(self):
+        # Pool workers rebuild (once, via the shared cache) instead of unpickling the tables,
+        # and keep as many automata as the server does
+        return _unpickle, (self.terms, self.case_sensitive, self.word_boundary, _shared_max)
+
+    def __call__(self, text: str) -> Iterator[tuple[int, int]]:
+        folded = text if self.case_sensitive else _fold(text)
+        goto, fail, out, term_len = self._goto, self._fail, self._out, self._term_len
+        check_bounds = self.word_boundary
+        size = len(text)
+
+        matches: list[tuple[int, int]] = []
+        state = 0
+        for end, code in enumerate(map(ord, folded), 1):
+            while True:
+                nxt = goto.get((state << _CHAR_BITS) | code)
+                if nxt is not None:
+                    state = nxt
+                    break
+                if not state:
+                    break
+                state = fail[state]
+            m = out[state]
+            while m:
+                start = end - term_len[m]
+                if not check_bounds or (
+                    (start == 0 or not _is_word_char(text, start - 1))
+                    and (end == size or not _is_word_char(text, end))
+                ):
+                    matches.append((start, end))
+                m = out[fail[m]]
+
+        # Leftmost-longest, non-overlapping
+        matches.sort(key=lambda se: (se[0], -se[1]))
+        last_end = 0
+        for start, end in matches:
+            if start >= last_end:
+                yield start, end
+                last_end = end
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "terms": len(self.terms),
+            "states": self.states,
+            "approx_bytes": self.approx_bytes,
+            "fingerprint": self.fingerprint,
+        }
+
+
+def build_deny_list(
+    terms: Iterable[str], case_sensitive: bool = False, word_boundary: bool = True
+) -> DenyList:
+    """
+    Returns the automaton for a deny list, building it only if an identical list
+    (same terms and options) is not already in use.
+    """
+    normalised = _normalise(terms, case_sensitive)
+    fingerprint = _fingerprint(normalised, case_sensitive, word_boundary)
+    with _shared_lock:
+        deny_list = _shared.get(fingerprint)
+        if deny_list is not None:
+            _shared.move_to_end(fingerprint)
+            return deny_list
+    deny_list = DenyList(normalised, case_sensitive, word_boundary)
+    with _shared_lock:
+        _shared[fingerprint] = deny_list
+        while len(_shared) > _shared_max:
+            _shared.popitem(last=False)
+    return deny_list
+
+
+def share(deny_lists: Iterable[DenyList]) -> None:
+    """
+    Keeps every automaton the loaded rule sets use shared in this process, sizing the
+    cache for them (never below GUARDRAIL_DENY_LIST_SHARED_MIN). Pool workers adopt the
+    size with the next scanner they unpickle.
+    """
+    global _shared_max
+    in_use = {d.fingerprint: d for d in deny_lists}
+    with _shared_lock:
+        _shared_max = max(settings.guardrail_deny_list_shared_min, len(in_use))
+        for fingerprint, deny_list in in_use.items():
+            _shared[fingerprint] = deny_list
+            _shared.move_to_end(fingerprint)
+        while len(_shared) > _shared_max:
+            _shared.popitem(last=False)
+
+
+def _unpickle(
+    terms: tuple[str, ...], case_sensitive: bool, word_boundary: bool, shared_max: int
+) -> DenyList:
+    global _shared_max
+    with _shared_lock:
+        _shared_max = max(_shared_max, shared_max)
+    return build_deny_list(terms, case_sensitive, word_boundary)
@@ -0,0 +1,123 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from threading import BoundedSemaphore, Lock
+
+from app.core.config import settings
+from app.models.guardrail import GuardrailCheckResponse, ResponseMode
+from app.services.guardrail import (
+    DEFAULT_SCANNER,
+    GuardrailScanner,
+    GuardrailVerdict,
+    check_text,
+    evaluate,
+)
+
+_pool: ProcessPoolExecutor | None = None
+_pool_lock = Lock()
+_queue_slots: BoundedSemaphore | None = None
+
+
+class GuardrailBusyError(RuntimeError):
+    """Too many large scans already queued for the pool; shed load rather than wait."""
+
+
+def _pool_workers() -> int:
+    return settings.guardrail_pool_workers or os.cpu_count() or 1
+
+
+def get_pool() -> ProcessPoolExecutor:
+    """
+    Lazily started, process-wide pool for CPU-bound guardrail scans.
+    Uses spawn so workers never inherit the server's threads or open files.
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ProcessPoolExecutor(
+                    max_workers=_pool_workers(),
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+    return _pool
+
+
+def shutdown_pool() -> None:
+    global _pool, _queue_slots
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True, cancel_futures=True)
+            _pool = None
+        _queue_slots = None
+
+
+def _get_queue_slots() -> BoundedSemaphore:
+    global _queue_slots
+    if _queue_slots is None:
+        with _pool_lock:
+            if _queue_slots is None:
+                _queue_slots = BoundedSemaphore(settings.guardrail_pool_max_queue)
+    return _queue_slots
+
+
+def evaluate_offloaded(text: str, scanner: GuardrailScanner = DEFAULT_SCANNER) -> GuardrailVerdict:
+    """
+    `evaluate`, run where it costs other requests least. Texts shorter than
+    `guardrail_offload_min_chars` scan inline: a pickle round trip would cost more
+    than the scan. Longer texts scan in the process pool, so the calling thread
+    waits without holding this process's GIL and small requests keep flowing.
+    At most `guardrail_pool_max_queue` offloaded scans run or wait at once;
+    beyond that GuardrailBusyError is raised.
+    """
+    min_chars = settings.guardrail_offload_min_chars
+    if min_chars is None or len(text) < min_chars:
+        return evaluate(text, scanner)
+
+    slots = _get_queue_slots()
+    if not slots.acquire(blocking=False):
+        raise GuardrailBusyError("Guardrail pool queue is full")
+    try:
+        return get_pool().submit(evaluate, text, scanner).result()
+    finally:
+        slots.release()
+
+
+def _check_texts(
+    scanner: GuardrailScanner, mode: ResponseMode, texts: list[str]
+) -> list[GuardrailCheckResponse]:
+    # Runs inside a pool worker: one pickled round trip per slice, not per text
+    return [check_text(text, scanner, mode) for text in texts]
+
+
+def check_batch(
+    texts: list[str],
+    scanner: GuardrailScanner = DEFAULT_SCANNER,
+    parallel_min_items: int | None = None,
+    mode: ResponseMode = "redact",
+) -> list[GuardrailCheckResponse]:
+    """
+    Guardrail-checks every text, keeping input order.
+    Small batches run inline; larger ones are sliced across the process pool, taking
+    one of the `guardrail_pool_max_queue` slots `evaluate_offloaded` uses for the whole
+    batch: when none is free, GuardrailBusyError is raised.
+    """
+    if parallel_min_items is None:
+        parallel_min_items = settings.guardrail_batch_parallel_min_items
+    workers = _pool_workers()
+    if len(texts) < parallel_min_items or workers < 2:
+        return _check_texts(scanner, mode, texts)
+
+    # A few slices per worker keeps the pool busy when text sizes are uneven
+    slice_size = max(1, -(-len(texts) // (workers * 4)))
+    slices = [texts[i : i + slice_size] for i in range(0, len(texts), slice_size)]
+    slots = _get_queue_slots()
+    if not slots.acquire(blocking=False):
+        raise GuardrailBusyError("Guardrail pool queue is full")
+    try:
+        results: list[GuardrailCheckResponse] = []
+        for chunk in get_pool().map(partial(_check_texts, scanner, mode), slices):
+            results.extend(chunk)
+        return results
+    finally:
+        slots.release()
@@ -0,0 +1,290 @@
+import base64
+import binascii
+import re
+from bisect import bisect_left, bisect_right
+from collections.abc import Iterator
+
+# Stage 2 heuristics: (anchors, pattern, weight). Every alternative of a pattern contains
+# one of its anchors, so stage 1 can find every place a heuristic might match with plain
+# substring searches on the lower-cased text. Patterns run on that text too, and leave
+# the leading word boundary to `_matches`: that lets `re` skip ahead on the first
+# character, about three times faster than \b(?:...) with IGNORECASE.
+_HEURISTICS: tuple[tuple[tuple[str, ...], re.Pattern, int], ...] = (
+    # Instruction override
+    (
+        ("ignore", "disregard", "forget"),
+        re.compile(
+            r"(?:ignore|disregard|forget)\s+(?:(?:all|any|the|your|of)\s+)*"
+            r"(?:(?:previous|prior|above|earlier|preceding|system|original|initial|existing)\s+"
+            r"(?:instructions?|prompts?|rules|directions?|guidelines|guardrails|context)"
+            r"|(?:everything|anything)\s+(?:above|before|prior))\b"
+        ),
+        3,
+    ),
+    # System prompt exfiltration
+    (
+        ("prompt", "instruction"),
+        re.compile(
+            r"(?:reveal|show|print|repeat|output|leak|display|tell\s+me)\b[^.\n]{0,30}?"
+            r"\b(?:system\s+prompt|hidden\s+(?:prompt|instructions)|initial\s+(?:prompt|instructions)"
+            r"|your\s+(?:instructions|prompt))\b"
+        ),
+        3,
+    ),
+    # Jailbreak vocabulary
+    (
+        ("jailbr", "developer mode", "anything now"),
+        re.compile(r"(?:jailbreak(?:ed|ing)?|jailbroken|developer mode|do anything now)\b"),
+        2,
+    ),
+    # Role switch
+    (
+        ("you are now", "pretend"),
+        re.compile(r"(?:you are now|pretend\s+(?:to\s+be|you\s+are))\b"),
+        1,
+    ),
+)
+# Chat-template role markers never reach the threshold on their own, so they need no
+# anchors: they are only scored in windows that already have points
+_ROLE_MARKER_RE = re.compile(
+    r"<\|(?:im_start|im_end|system|assistant|user)\|>|\[/?inst\]|<</?sys>>"
+)
+_ROLE_MARKER_WEIGHT = 2
+INJECTION_THRESHOLD = 3
+# A window reaching the threshold with one signal (a single override or exfiltration
+# phrase, which ordinary policy text also uses) is only a phrase; with two or more
+# independent signals (heuristics, role markers, payloads) it is an injection
+PHRASE_LEVEL = 1
+INJECTION_LEVEL = 2
+
+# Encoded payloads: long base64 runs, probed on bytes (translate + find) before any regex
+_B64_MIN_RUN = 40
+_B64_ALPHABET = bytes(
+    1 if chr(i).isascii() and (chr(i).isalnum() or chr(i) in "+/") else 0 for i in range(256)
+)
+_B64_PROBE = b"\x01" * _B64_MIN_RUN
+_ENCODED_RE = re.compile(rf"[A-Za-z0-9+/]{{{_B64_MIN_RUN},}}={{0,2}}")
+# Longer runs are data (attachments, keys), not something a model is asked to decode
+_B64_MAX_RUN = 2048
+# Match kinds after the heuristic indexes: payloads decoding to a phrase, payloads
+# decoding to an injection (two signals on their own), role markers
+_ENCODED = len(_HEURISTICS)
+_ENCODED_INJECTION = _ENCODED + 1
+_ROLE_MARKERS = _ENCODED + 2
+_WEIGHTS = [weight for _, _, weight in _HEURISTICS] + [
+    INJECTION_THRESHOLD,
+    INJECTION_THRESHOLD,
+    _ROLE_MARKER_WEIGHT,
+]
+_SIGNALS = [1] * len(_HEURISTICS) + [1, 2, 1]
+
+_WINDOW_CHARS = 240
+# Stage 1 skips hits of one anchor closer than this to the last one it kept, and
+# widens that one's region to cover the windows of those it skipped
+_HIT_STRIDE = _WINDOW_CHARS // 2
+_ANCHOR_MAX = max(len(a) for anchors, _, _ in _HEURISTICS for a in anchors)
+# How far from a flagged span the text can change whether it is flagged: each hit only
+# scores its own window, so a span depends on the windows that contain it and on any
+# payload in them. Streams and draft sessions keep this much context around what they
+# scan (see Detector.reach); the last term is slack for matches near window edges.
+INJECTION_REACH = 2 * (_WINDOW_CHARS + _ANCHOR_MAX) + _B64_MAX_RUN + 256
+
+Region = tuple[int, int, int, list[tuple[int, int, int]]]
+
+
+def _fold(text: str) -> str:
+    """Lower-cases without changing the length, so offsets index the original text."""
+    lowered = text.lower()
+    if len(lowered) == len(text):
+        return lowered
+    return "".join(low if len(low := ch.lower()) == 1 else ch for ch in text)
+
+
+def _prefilter(text: str, folded: str) -> list[Region]:
+    """
+    Stage 1: merged (start, end, kinds, payloads) regions covering the window of every
+    anchor hit and encoded payload, `kinds` having a bit per heuristic index hit inside
+    and `payloads` the (start, end, kind) of each payload. Empty for most text.
+    """
+    hits: list[tuple[int, int, int]] = []
+    for kind, (anchors, _, _) in enumerate(_HEURISTICS):
+        for anchor in anchors:
+            i = folded.find(anchor)
+            while i != -1:
+                hits.append((i, i + len(anchor) + _HIT_STRIDE, kind))
+                i = folded.find(anchor, i + _HIT_STRIDE)
+    if _B64_PROBE in text.encode("utf-8", "surrogatepass").translate(_B64_ALPHABET):
+        hits.extend(
+            (*m.span(), _ENCODED + level - PHRASE_LEVEL)
+            for m in _ENCODED_RE.finditer(text)
+            if m.end() - m.start() <= _B64_MAX_RUN and (level := _payload_level(m.group()))
+        )
+    if not hits:
+        return []
+
+    hits.sort()
+    regions: list[Region] = []
+    for start, end, kind in hits:
+        a, b = max(start - _WINDOW_CHARS, 0), min(end + _WINDOW_CHARS, len(text))
+        if not regions or a > regions[-1][1]:
+            regions.append((a, b, 0, []))
+        region_start, region_end, kinds, payloads = regions[-1]
+        if kind >= _ENCODED:
+            payloads.append((start, end, kind))
+        else:
+            kinds |= 1 << kind
+        regions[-1] = (region_start, max(region_end, b), kinds, payloads)
+    return regions
+
+
+def _matches(pattern: re.Pattern, folded: str, start: int, end: int) -> list[tuple[int, int]]:
+    """Matches of a pattern in folded[start:end] that begin at a word boundary."""
+    found = []
+    m = pattern.search(folded, start, end)
+    while m:
+        s = m.start()
+        if s == 0 or not (folded[s - 1].isalnum() or folded[s - 1] == "_"):
+            found.append(m.span())
+            m = pattern.search(folded, m.end(), end)
+        else:
+            m = pattern.search(folded, s + 1, end)
+    return found
+
+
+def _level(score: int, signals: int) -> int:
+    """0, PHRASE_LEVEL or INJECTION_LEVEL for a window's score and signal count."""
+    if score < INJECTION_THRESHOLD:
+        return 0
+    return INJECTION_LEVEL if signals >= 2 else PHRASE_LEVEL
+
+
+def _score(folded: str) -> int:
+    """
+    Stage 2 over the whole of `folded` as one window: its level. Each heuristic counts
+    once, however often it matches.
+    """
+    score = signals = 0
+    for _, pattern, weight in _HEURISTICS:
+        if _matches(pattern, folded, 0, len(folded)):
+            score += weight
+            signals += 1
+    if (
+        score
+        and _level(score, signals) < INJECTION_LEVEL
+        and _matches(_ROLE_MARKER_RE, folded, 0, len(folded))
+    ):
+        score += _ROLE_MARKER_WEIGHT
+        signals += 1
+    return _level(score, signals)
+
+
+def _decode_payload(blob: str) -> str | None:
+    data = blob.rstrip("=")
+    try:
+        decoded = base64.b64decode(data + "=" * (-len(data) % 4), validate=True).decode("utf-8")
+    except (binascii.Error, UnicodeDecodeError):
+        return None
+    printable = sum(ch.isprintable() or ch.isspace() for ch in decoded)
+    return decoded if printable >= 0.9 * len(decoded) else None
+
+
+def _payload_level(blob: str) -> int:
+    """The level of the text a base64 run decodes to, scored on its own; 0 if none."""
+    decoded = _decode_payload(blob)
+    return _score(_fold(decoded)) if decoded else 0
+
+
+def _flag_region(folded: str, region: Region, level: int) -> list[tuple[int, int]]:
+    """
+    Stage 2 over one region: scores the window of each hit in it on its own, and
+    returns the matches whose highest-scoring window is at `level`, sorted. A
+    heuristic counts once per window, however often it matches, and only with a
+    match wholly inside it.
+    """
+    start, end, kinds, payloads = region
+    # Each heuristic runs once over the whole region; windows then pick their matches
+    found = [
+        _matches(pattern, folded, start, end) if kinds >> kind & 1 else []
+        for kind, (_, pattern, _) in enumerate(_HEURISTICS)
+    ]
+    found.append([(s, e) for s, e, kind in payloads if kind == _ENCODED])
+    found.append([(s, e) for s, e, kind in payloads if kind == _ENCODED_INJECTION])
+    if not any(found):
+        return []  # role markers alone never reach the threshold
+    found.append([])  # role markers, searched for once a window needs them
+    # Matches of one kind never overlap, so their ends are sorted as well
+    starts = [[s for s, _ in spans] for spans in found]
+    ends = [[e for _, e in spans] for spans in found]
+    flagged = [bytearray(len(spans)) for spans in found]
+    markers_searched = False
+
+    windows = [(s - _WINDOW_CHARS, e + _WINDOW_CHARS) for s, e, _ in payloads]
+    for kind, (anchors, _, _) in enumerate(_HEURISTICS):
+        if kinds >> kind & 1:
+            for anchor in anchors:
+                i = folded.find(anchor, start, end)
+                while i != -1:
+                    windows.append((i - _WINDOW_CHARS, i + len(anchor) + _WINDOW_CHARS))
+                    i = folded.find(anchor, i + len(anchor), end)
+
+    for window_start, window_end in windows:
+        score = signals = 0
+        inside: list[tuple[int, int, int]] = []
+        for kind, spans in enumerate(found):
+            if kind == _ROLE_MARKERS:
+                if not score or _level(score, signals) == INJECTION_LEVEL:
+                    break
+                if not markers_searched:
+                    spans[:] = _matches(_ROLE_MARKER_RE, folded, start, end)
+                    starts[kind], ends[kind] = [s for s, _ in spans], [e for _, e in spans]
+                    flagged[kind] = bytearray(len(spans))
+                    markers_searched = True
+            if not spans:
+                continue
+            i = bisect_left(starts[kind], window_start)
+            if i < len(spans) and ends[kind][i] <= window_end:
+                score += _WEIGHTS[kind]
+                signals += _SIGNALS[kind]
+                inside.append((kind, i, bisect_right(ends[kind], window_end)))
+        window_level = _level(score, signals)
+        if window_level == INJECTION_LEVEL:
+            for kind, i, j in inside:
+                flagged[kind][i:j] = b"\x02" * (j - i)
+        elif window_level:
+            for kind, i, j in inside:
+                flagged[kind][i:j] = flagged[kind][i:j].replace(b"\x00", b"\x01")
+
+    return sorted(
+        span
+        for spans, marks in zip(found, flagged, strict=True)
+        for span, mark in zip(spans, marks, strict=True)
+        if mark == level
+    )
+
+
+def find_prompt_injections(text: str, level: int = INJECTION_LEVEL) -> Iterator[tuple[int, int]]:
+    """
+    Two-stage prompt-injection detector. A literal prefilter rejects most text in a
+    few substring searches. Each of its hits is then scored on the window of
+    _WINDOW_CHARS either side by the heuristics (instruction override, prompt
+    exfiltration, jailbreak and role-switch phrasing, chat-template role markers,
+    base64 payloads that decode to any of these). A window scoring at least
+    INJECTION_THRESHOLD is at INJECTION_LEVEL with two or more independent signals,
+    else at PHRASE_LEVEL; yields the matched phrases whose highest window is at
+    `level`, merged into non-overlapping spans. Windows are scored one by one, never
+    chained, so whether a span is flagged only depends on text within INJECTION_REACH
+    of it.
+    """
+    folded = _fold(text)
+    for region in _prefilter(text, folded):
+        spans = _flag_region(folded, region, level)
+        if not spans:
+            continue
+        merged_start, merged_end = spans[0]
+        for s, e in spans[1:]:
+            if s < merged_end:
+                merged_end = max(merged_end, e)
+            else:
+                yield merged_start, merged_end
+                merged_start, merged_end = s, e
+        yield merged_start, merged_end
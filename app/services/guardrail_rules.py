@@ -0,0 +1,193 @@
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Any, NamedTuple
+
+from pydantic import ValidationError
+
+from app.core.config import settings
+from app.models.guardrail import GuardrailRuleSet
+from app.services.guardrail import (
+    DEFAULT_SCANNER,
+    DENY_LIST_DETECTOR,
+    DETECTORS,
+    GuardrailScanner,
+    compile_scanner,
+)
+from app.services.guardrail_denylist import DenyList, build_deny_list, share
+
+logger = logging.getLogger(__name__)
+
+_RULE_SUFFIX = ".json"
+
+
+def compile_rules(rules: GuardrailRuleSet) -> GuardrailScanner:
+    """
+    Builds the scanner for one rule set from the built-in detectors, keeping their
+    priority order, plus a deny-list detector when the rule set has terms.
+    """
+    candidates = list(DETECTORS)
+    if rules.deny_list is not None and rules.deny_list.terms:
+        deny_list = build_deny_list(
+            rules.deny_list.terms, rules.deny_list.case_sensitive, rules.deny_list.word_boundary
+        )
+        candidates.append(DENY_LIST_DETECTOR._replace(find=deny_list))
+
+    detectors = []
+    for detector in candidates:
+        rule = rules.detectors.get(detector.type)
+        if rule is None:
+            detectors.append(detector)
+        elif rule.enabled:
+            detectors.append(
+                detector._replace(
+                    severity=rule.severity or detector.severity,
+                    score=detector.score if rule.score is None else rule.score,
+                )
+            )
+    return compile_scanner(tuple(detectors), rules.block_severity, rules.block_threshold)
+
+
+def _scanner_stats(scanner: GuardrailScanner) -> dict[str, Any]:
+    stats: dict[str, Any] = {"version": scanner.version}
+    for detector in scanner.detectors:
+        if isinstance(detector.find, DenyList):
+            stats["deny_list"] = detector.find.stats()
+    return stats
+
+
+class _RuleFile(NamedTuple):
+    stamp: tuple[int, int]  # (mtime_ns, size): a change in either triggers a recompile
+    scanner: GuardrailScanner | None  # None = never loaded successfully
+
+
+class GuardrailRuleRegistry:
+    """
+    Per-organisation guardrail scanners, one rule file per org: `<rules_dir>/<org_id>.json`.
+
+    Each file is compiled once into an immutable GuardrailScanner. `start` loads every
+    file before the server takes requests, then a background thread re-checks the
+    directory every `reload_seconds`; only changed files are recompiled, and the org ->
+    scanner map is replaced in a single assignment so a request never sees a
+    half-updated set. `get` only reads that map: a request never compiles (deny-list
+    automata take seconds for large lists). A file that fails to load keeps its
+    previous scanner. Requests without an org, or for an org without a rule file (or
+    before the first load), get the default scanner.
+
+    The org is whatever X-Org-Id the caller sends: nothing authenticates it in V1, so a
+    caller can pick any org's rules (or none). Keep the default rules the strictest, and
+    deploy behind a gateway that sets X-Org-Id from the caller's credentials.
+    """
+
+    def __init__(
+        self,
+        rules_dir: Path,
+        reload_seconds: float,
+        default: GuardrailScanner = DEFAULT_SCANNER,
+    ):
+        self.rules_dir = rules_dir
+        self.reload_seconds = reload_seconds
+        self.default = default
+        self._files: dict[str, _RuleFile] = {}
+        self._scanners: dict[str, GuardrailScanner] = {}
+        self._lock = threading.Lock()  # one reload at a time
+        self._thread: threading.Thread | None = None
+        self._stopping = threading.Event()
+
+    def get(self, org_id: str | None) -> GuardrailScanner:
+        if org_id is None:
+            return self.default
+        return self._scanners.get(org_id, self.default)
+
+    def reload(self) -> None:
+        """Recompiles changed rule files now, on the calling thread."""
+        with self._lock:
+            self._reload()
+
+    def start(self) -> None:
+        """Loads every rule file, then keeps them current from a background thread."""
+        self.reload()
+        if self._thread is None and self.reload_seconds > 0:
+            self._stopping.clear()
+            self._thread = threading.Thread(
+                target=self._run, name="guardrail-rules-reload", daemon=True
+            )
+            self._thread.start()
+
+    def close(self) -> None:
+        """Stops the background reloads; the loaded rules stay in use."""
+        thread = self._thread
+        if thread is not None:
+            self._stopping.set()
+            thread.join()
+            self._thread = None
+
+    def stats(self) -> dict[str, Any]:
+        scanners = self._scanners
+        return {
+            "rules_dir": str(self.rules_dir),
+            "default_version": self.default.version,
+            "orgs": {
+                org_id: _scanner_stats(scanner) for org_id, scanner in sorted(scanners.items())
+            },
+        }
+
+    def _run(self) -> None:
+        while not self._stopping.wait(self.reload_seconds):
+            try:
+                self.reload()
+            except Exception:
+                logger.exception("Guardrail rules not reloaded; keeping the current set")
+
+    def _reload(self) -> None:
+        files: dict[str, _RuleFile] = {}
+        try:
+            entries = list(os.scandir(self.rules_dir))
+        except FileNotFoundError:
+            entries = []
+        for entry in entries:
+            if not entry.name.endswith(_RULE_SUFFIX) or not entry.is_file():
+                continue
+            org_id = entry.name[: -len(_RULE_SUFFIX)]
+            previous = self._files.get(org_id)
+            try:
+                st = entry.stat()
+            except FileNotFoundError:
+                # Deleted or renamed since the listing: keep the last good rules until the next
+                # check sees the directory as it now is
+                if previous is not None:
+                    files[org_id] = previous
+                continue
+            stamp = (st.st_mtime_ns, st.st_size)
+            if previous is not None and previous.stamp == stamp:
+                files[org_id] = previous
+                continue
+            files[org_id] = _RuleFile(stamp, self._load(entry.path, previous))
+
+        if files != self._files:
+            scanners = {org_id: f.scanner for org_id, f in files.items() if f.scanner is not None}
+            share(
+                d.find
+                for scanner in scanners.values()
+                for d in scanner.detectors
+                if isinstance(d.find, DenyList)
+            )
+            self._files = files
+            self._scanners = scanners
+
+    def _load(self, path: str, previous: _RuleFile | None) -> GuardrailScanner | None:
+        try:
+            with open(path, encoding="utf-8") as fh:
+                rules = GuardrailRuleSet.model_validate(json.load(fh))
+        except (OSError, ValueError, ValidationError) as exc:
+            logger.error("Guardrail rule file %s not loaded: %s", path, exc)
+            return previous.scanner if previous is not None else None
+        return compile_rules(rules)
+
+
+guardrail_rules = GuardrailRuleRegistry(
+    rules_dir=Path(settings.guardrail_rules_dir),
+    reload_seconds=settings.guardrail_rules_reload_seconds,
+)
@@ -0,0 +1,198 @@
+from typing import Any
+
+from app.core.config import settings
+from app.models.guardrail import GuardrailStreamSummary
+from app.services.guardrail import (
+    DEFAULT_SCANNER,
+    GuardrailScanner,
+    Span,
+    count_spans,
+    scan,
+    score_findings,
+)
+
+
+def _joins(ch: str, far: str) -> bool:
+    """
+    Whether `ch` (next to a rescan edge) belongs to the same token as the text on its
+    far side. Whitespace separates tokens, except spaces between digit groups: card
+    numbers are grouped from the start of their digit run.
+    """
+    if not ch.isspace():
+        return True
+    return ch == " " and (far.isdecimal() or far == " " or far == "-")
+
+
+def _token_start(text: str, i: int) -> int:
+    while i > 0 and _joins(text[i - 1], text[i - 2] if i >= 2 else ""):
+        i -= 1
+    return i
+
+
+def _token_end(text: str, i: int) -> int:
+    n = len(text)
+    while i < n and _joins(text[i], text[i + 1] if i + 1 < n else ""):
+        i += 1
+    return i
+
+
+def _span_event(span: Span) -> dict[str, Any]:
+    return {"type": span.type, "offset": span.start, "length": span.end - span.start}
+
+
+class GuardrailDraftSession:
+    """
+    Guardrail state for a draft edited in place (as-you-type checks).
+
+    Holds the text and the index of every detector match. An edit rescans only the
+    edited range plus `margin` characters each side, widened to whole tokens (and
+    whole digit runs) and to any match it touches, so both ends of the rescanned
+    region sit on whitespace and detectors see the same context as in a full scan.
+    Matches containing whitespace (phone numbers, multi-word deny-list terms) longer
+    than `margin` may be missed when they are formed by an edit. Detectors with a
+    reach (Detector.reach) get at least that margin, and the rescan sees that much
+    context beyond the region, so their matches always agree with a full scan.
+
+    The match index is split at a movable gap, like a gap buffer: `_head` holds
+    matches starting before the gap (absolute offsets, sorted by start) and `_tail`
+    the rest as offsets from the end of the text (tail[-1] is the leftmost), which
+    stay valid however much text is inserted or deleted before them. An edit only
+    moves matches near it, so typing costs about the same whatever the draft size.
+
+    Each edit returns an update: the rescanned region with the matches now inside it
+    (clients replace their highlights in that range) and the current verdict.
+    """
+
+    def __init__(
+        self,
+        scanner: GuardrailScanner = DEFAULT_SCANNER,
+        margin: int | None = None,
+        max_chars: int | None = None,
+    ):
+        self._scanner = scanner
+        # Detectors that weigh text around a match need the edit's whole reach rescanned
+        self._reach = max((d.reach for d in scanner.detectors), default=0)
+        self._margin = max(margin or settings.guardrail_session_margin_chars, self._reach)
+        self._max_chars = max_chars or settings.guardrail_session_max_chars
+        self.text = ""
+        self._head: list[Span] = []
+        self._tail: list[Span] = []
+        self._max_len = 0  # longest match seen: bounds the look-back for matches covering a point
+        self._counts: dict[str, int] = {}
+        self.edits = 0
+
+    @property
+    def spans(self) -> list[Span]:
+        n = len(self.text)
+        return self._head + [Span(n - s.start, n - s.end, s.type) for s in reversed(self._tail)]
+
+    def reset(self, text: str) -> dict[str, Any]:
+        return self.replace(0, len(self.text), text)
+
+    def insert(self, offset: int, text: str) -> dict[str, Any]:
+        return self.replace(offset, 0, text)
+
+    def delete(self, offset: int, length: int) -> dict[str, Any]:
+        return self.replace(offset, length, "")
+
+    def replace(self, offset: int, length: int, text: str) -> dict[str, Any]:
+        """Replaces `length` characters at `offset` with `text` and rescans around the edit."""
+        old = self.text
+        if offset < 0 or length < 0 or offset + length > len(old):
+            raise ValueError(f"Edit [{offset}, {offset + length}) is outside the draft")
+        if len(old) - length + len(text) > self._max_chars:
+            raise ValueError(f"Draft would exceed {self._max_chars} characters")
+
+        edit_end = offset + length
+        inserted_end = offset + len(text)
+        delta = len(text) - length
+        head, tail = self._head, self._tail
+
+        # Matches touching the edited range are dropped; their extent joins the region
+        self._move_gap(offset, len(old))
+        removed = self._pop_head_covering(offset)
+        a = min([offset - self._margin, *(s.start for s in removed)])
+        b = inserted_end + self._margin
+        for s in removed:
+            b = max(b, s.end + delta if s.end >= edit_end else inserted_end)
+        while tail and len(old) - tail[-1].start < edit_end:
+            s = tail.pop()
+            removed.append(Span(len(old) - s.start, len(old) - s.end, s.type))
+            b = max(b, len(old) - s.end + delta if len(old) - s.end >= edit_end else inserted_end)
+
+        new = old[:offset] + text + old[edit_end:]
+        n = len(new)
+        self.text = new
+        self.edits += 1
+
+        # Widen to token boundaries and over matches the region touches, until stable.
+        # The scan sees `reach` more characters either side, and the region also takes
+        # in whatever it finds across its edges.
+        a, b = max(a, 0), min(b, n)
+        while True:
+            a, b = _token_start(new, a), _token_end(new, b)
+            touched = self._pop_head_covering(a)
+            while tail and n - tail[-1].start < b:
+                s = tail.pop()
+                touched.append(Span(n - s.start, n - s.end, s.type))
+            if touched:
+                removed.extend(touched)
+                a = min(a, *(s.start for s in touched))
+                b = max(b, *(s.end for s in touched))
+                continue
+            lo, hi = max(a - self._reach, 0), min(b + self._reach, n)
+            found = [
+                Span(s.start + lo, s.end + lo, s.type)
+                for s in scan(new[lo:hi], self._scanner.detectors)
+                if s.start + lo < b and s.end + lo > a
+            ]
+            wider = min([a, *(s.start for s in found)]), max([b, *(s.end for s in found)])
+            if wider == (a, b):
+                break
+            a, b = wider
+
+        found.sort(key=lambda s: s.start)
+        head.extend(found)  # every match left in the head starts before a
+        self._max_len = max([self._max_len, *(s.end - s.start for s in found)])
+        for s in removed:
+            self._counts[s.type] -= 1
+        count_spans(found, self._counts)
+
+        return {
+            "event": "update",
+            "seq": self.edits,
+            "start": a,
+            "end": b,
+            "spans": [_span_event(s) for s in found],
+            **self.summary().model_dump(),
+        }
+
+    def summary(self) -> GuardrailStreamSummary:
+        findings, risk_score, allow = score_findings(self._counts, self._scanner)
+        return GuardrailStreamSummary(
+            allow=allow,
+            risk_score=risk_score,
+            findings=findings,
+            text_length=len(self.text),
+        )
+
+    def _move_gap(self, pos: int, n: int) -> None:
+        """Moves matches between head and tail so the head holds exactly those starting before pos."""
+        head, tail = self._head, self._tail
+        while head and head[-1].start >= pos:
+            s = head.pop()
+            tail.append(Span(n - s.start, n - s.end, s.type))
+        while tail and n - tail[-1].start < pos:
+            s = tail.pop()
+            head.append(Span(n - s.start, n - s.end, s.type))
+
+    def _pop_head_covering(self, pos: int) -> list[Span]:
+        """Removes and returns head matches ending after pos (only the last few can)."""
+        head = self._head
+        i = len(head)
+        while i and head[i - 1].start + self._max_len > pos:
+            i -= 1
+        covering = [s for s in head[i:] if s.end > pos]
+        if covering:
+            head[i:] = [s for s in head[i:] if s.end <= pos]
+        return covering
@@ -0,0 +1,146 @@
+import codecs
+from typing import Any
+
+from app.core.config import settings
+from app.models.guardrail import GuardrailStreamSummary
+from app.services.guardrail import (
+    DEFAULT_SCANNER,
+    GuardrailScanner,
+    Span,
+    count_spans,
+    redact,
+    resolve_overlaps,
+    scan,
+    score_findings,
+)
+
+# Word-boundary checks only look one character back; keep a little more for safety
+_CONTEXT_CHARS = 8
+
+
+def _is_run_char(ch: str) -> bool:
+    return ch.isdecimal() or ch == " " or ch == "-"
+
+
+def _past_digit_run(view: str, cut: int) -> int:
+    """
+    Moves a cut that falls inside a run of digits/spaces/dashes to the end of the run,
+    so card candidates are always grouped from the start of their run. Leaves the cut
+    alone if the run reaches the end of the view.
+    """
+    if not _is_run_char(view[cut - 1]):
+        return cut
+    i = cut
+    while i < len(view) and _is_run_char(view[i]):
+        i += 1
+    return i if i < len(view) else cut
+
+
+class GuardrailStreamScanner:
+    """
+    Incremental guardrail scan over a UTF-8 byte stream.
+
+    Text is scanned in windows of `window` characters. Each scan also sees the next
+    `overlap` characters, so a match that crosses a window edge is found whole, and
+    a few characters of already-emitted text for left context. Detectors that weigh
+    text around a match (Detector.reach) get that much left context and twice that
+    much overlap, so their findings match a scan of the whole document. Memory stays
+    bounded by window + overlap regardless of document size.
+
+    `feed` and `finish` return NDJSON-ready events:
+    - {"event": "finding", "type", "offset", "length"} per match (offsets are characters)
+    - {"event": "redacted", "offset", "text"} per window of redacted text
+    """
+
+    def __init__(
+        self,
+        scanner: GuardrailScanner = DEFAULT_SCANNER,
+        window: int | None = None,
+        overlap: int | None = None,
+    ):
+        self._scanner = scanner
+        self._window = window or settings.guardrail_stream_window_chars
+        reach = max((d.reach for d in scanner.detectors), default=0)
+        self._overlap = max(overlap or settings.guardrail_stream_overlap_chars, 2 * reach)
+        self._context_chars = max(_CONTEXT_CHARS, reach)
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self._buffer = ""  # left context + text not yet emitted
+        self._context = 0  # chars at the start of the buffer that were already emitted
+        self._offset = 0  # document offset of buffer[self._context]
+        self._counts: dict[str, int] = {}
+        self.text_length = 0
+
+    def feed(self, chunk: bytes) -> list[dict[str, Any]]:
+        text = self._decoder.decode(chunk)
+        events: list[dict[str, Any]] = []
+        # Slice oversized chunks so the buffer never holds more than one window ahead
+        for i in range(0, len(text), self._window):
+            events.extend(self._push(text[i : i + self._window]))
+        return events
+
+    def finish(self) -> list[dict[str, Any]]:
+        events = self._push(self._decoder.decode(b"", final=True))
+        if len(self._buffer) > self._context:
+            events.extend(self._emit(final=True))
+        return events
+
+    def summary(self) -> GuardrailStreamSummary:
+        findings, risk_score, allow = score_findings(self._counts, self._scanner)
+        return GuardrailStreamSummary(
+            allow=allow,
+            risk_score=risk_score,
+            findings=findings,
+            text_length=self.text_length,
+        )
+
+    def _push(self, text: str) -> list[dict[str, Any]]:
+        self.text_length += len(text)
+        self._buffer += text
+        events: list[dict[str, Any]] = []
+        while len(self._buffer) - self._context >= self._window + self._overlap:
+            events.extend(self._emit(final=False))
+        return events
+
+    def _emit(self, final: bool) -> list[dict[str, Any]]:
+        ctx = self._context
+        view = self._buffer if final else self._buffer[: ctx + self._window + self._overlap]
+        found = scan(view, self._scanner.detectors)
+
+        # Matches starting in the left context belong to the previous window and
+        # matches starting in the overlap belong to the next one. A match crossing
+        # the cut is emitted whole with this window, which can move the cut again.
+        cut = len(view)
+        if not final:
+            cut = _past_digit_run(view, ctx + self._window)
+            while True:
+                moved = max([cut, *(s.end for s in found if ctx <= s.start < cut)])
+                moved = _past_digit_run(view, moved)
+                if moved == cut:
+                    break
+                cut = moved
+        spans = [s for s in found if ctx <= s.start < cut]
+        count_spans(spans, self._counts)
+
+        events: list[dict[str, Any]] = [
+            {
+                "event": "finding",
+                "type": s.type,
+                "offset": self._offset + s.start - ctx,
+                "length": s.end - s.start,
+            }
+            for s in spans
+        ]
+        shifted = [Span(s.start - ctx, s.end - ctx, s.type) for s in resolve_overlaps(spans)]
+        events.append(
+            {
+                "event": "redacted",
+                "offset": self._offset,
+                "text": redact(view[ctx:cut], shifted),
+            }
+        )
+
+        keep_from = max(cut - self._context_chars, 0)
+        self._offset += cut - ctx
+        self._buffer = self._buffer[keep_from:]
+        self._context = cut - keep_from
+        return events
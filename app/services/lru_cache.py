@@ -0,0 +1,99 @@
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from threading import Lock
+from typing import Any, Generic, NamedTuple, TypeVar
+
+V = TypeVar("V")
+
+
+class _Entry(NamedTuple, Generic[V]):
+    value: V
+    expires_at: float  # inf without a TTL
+    size: int
+
+
+class ByteBudgetLRU(Generic[V]):
+    """
+    Thread-safe LRU map bounded by entry count and approximate memory, with optional
+    expiry after `ttl_seconds`. Subclasses say what an entry costs (`_size`) and build
+    their keys; the guardrail verdict and deliverable response caches share it.
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        max_bytes: int,
+        ttl_seconds: float | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries: OrderedDict[bytes, _Entry[V]] = OrderedDict()
+        self._lock = Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: bytes) -> V | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry.expires_at <= self._clock():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry.value
+
+    def put(self, key: bytes, value: V) -> None:
+        size = self._size(value)
+        if size > self.max_bytes:
+            return
+        expires_at = float("inf") if self.ttl_seconds is None else self._clock() + self.ttl_seconds
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = _Entry(value, expires_at, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            stats: dict[str, Any] = {
+                "entries": len(self._entries),
+                "approx_bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+            }
+            if self.ttl_seconds is not None:
+                stats.update(ttl_seconds=self.ttl_seconds, expirations=self.expirations)
+            return stats
+
+    def _size(self, value: V) -> int:
+        """Approximate bytes held by an entry for `value`, key and bookkeeping included."""
+        raise NotImplementedError
+
+    def _remove(self, key: bytes) -> None:
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
@@ -1,96 +1,134 @@
 from app.models.policy import PolicyRequest, PolicyResponse, PolicySection
+from app.services.decision_table import DecisionTable, Rule, feature_mask, features
 
+_REGULATED = features("regulated")
+# Risk appetite drives strictness
+_STRICT = features("appetite:low", "appetite:medium")
 
-def generate_ai_use_policy(req: PolicyRequest) -> PolicyResponse:
-    profile = req.profile
-    use_case = req.use_case
+_ALLOWED = "Allowed Use"
+_PROHIBITED = "Prohibited Use"
+_DATA_HANDLING = "Data Handling"
+_OVERSIGHT = "Human Oversight"
+_INCIDENT = "Incident Handling"
+_GOVERNANCE = "Governance"
 
-    data = set(use_case.data_types)
-    channels = set(use_case.channels)
-    users = set(use_case.users)
 
-    policy_title = f"AI Use Policy — {profile.org_name} — {use_case.name}"
-
-    purpose = (
-        f"This policy defines how {profile.org_name} will use AI for '{use_case.name}' "
-        f"to support staff while protecting confidentiality, privacy, and regulatory obligations."
-    )
+def _always(section: str, *bullets: str) -> list[Rule[tuple[str, str]]]:
+    return [Rule((section, bullet)) for bullet in bullets]
 
-    scope = [
-        f"Applies to: {', '.join(users) if users else 'staff'}",
-        f"Channels: {', '.join(channels) if channels else 'unspecified'}",
-        f"Data types: {', '.join(data) if data else 'unspecified'}",
-    ]
 
-    # Risk appetite drives strictness
-    strict = req.risk_appetite in ("low", "medium")
-
-    allowed = [
+# (section title, bullet); sections keep this order, bullets their order in the table
+_SECTION_RULES: list[Rule[tuple[str, str]]] = [
+    *_always(
+        _ALLOWED,
         "Draft internal documents using non-identifiable examples.",
         "Summarise internal procedures and policies without including personal identifiers.",
         "Generate checklists and templates for governance activities.",
-    ]
-
-    prohibited = [
+    ),
+    *_always(
+        _PROHIBITED,
         "Do not enter National Insurance numbers, card numbers, passwords, or authentication codes.",
         "Do not input customer names, addresses, emails, phone numbers, account numbers, or unique identifiers.",
         "Do not upload confidential documents unless explicitly approved and redacted.",
-    ]
-
-    if "health" in data or "special_category" in data:
-        prohibited.append(
-            "Do not use AI with health or special category data unless a DPIA and explicit controls are approved."
-        )
-    if "customers" in users:
-        prohibited.append(
-            "Do not allow AI to communicate directly with customers without approved scripts and human oversight."
-        )
-
-    data_handling = [
+    ),
+    Rule(
+        (
+            _PROHIBITED,
+            "Do not use AI with health or special category data unless a DPIA and explicit controls are approved.",
+        ),
+        any_of=features("data:health", "data:special_category"),
+    ),
+    Rule(
+        (
+            _PROHIBITED,
+            "Do not allow AI to communicate directly with customers without approved scripts and human oversight.",
+        ),
+        all_of=features("user:customers"),
+    ),
+    *_always(
+        _DATA_HANDLING,
         "Classify data before use: public, internal, personal, special category.",
         "Use placeholders: [CLIENT], [ACCOUNT], [DATE] instead of real identifiers.",
         "Run SAFE guardrail checks before sending text to any AI provider.",
         "Store outputs securely and only in approved systems.",
-    ]
-
-    if strict:
-        data_handling.append(
-            "Default to blocking uncertain or high-risk inputs. Escalate to Compliance or DPO."
-        )
-    else:
-        data_handling.append(
-            "If risk is unclear, pause and confirm the data classification before proceeding."
-        )
-
-    oversight = [
+    ),
+    Rule(
+        (
+            _DATA_HANDLING,
+            "Default to blocking uncertain or high-risk inputs. Escalate to Compliance or DPO.",
+        ),
+        any_of=_STRICT,
+    ),
+    Rule(
+        (
+            _DATA_HANDLING,
+            "If risk is unclear, pause and confirm the data classification before proceeding.",
+        ),
+        none_of=_STRICT,
+    ),
+    *_always(
+        _OVERSIGHT,
         "A human remains accountable for all decisions and communications.",
         "Review AI outputs for accuracy, bias, and suitability before use.",
         "Escalate when the output affects customers, compliance, or regulated decisions.",
-    ]
-
-    incident = [
+    ),
+    *_always(
+        _INCIDENT,
         "If sensitive data is entered, stop immediately and report to the DPO/Security.",
         "Capture the incident context and initiate containment steps.",
         "Review controls and update training to prevent recurrence.",
-    ]
+    ),
+    *_always(
+        _GOVERNANCE,
+        "Maintain an audit trail for usage and changes.",
+        "Review and update the policy on schedule or after incidents.",
+        "Ensure training and onboarding includes this policy.",
+    ),
+]
+
+
+def _sections(rows: list[tuple[str, str]]) -> tuple[tuple[str, tuple[str, ...]], ...]:
+    sections: dict[str, list[str]] = {}
+    for title, bullet in rows:
+        sections.setdefault(title, []).append(bullet)
+    return tuple((title, tuple(bullets)) for title, bullets in sections.items())
+
+
+_SECTIONS = DecisionTable(_SECTION_RULES, _sections)
+_REVIEW_DAYS = DecisionTable(
+    [Rule(90, all_of=_REGULATED), Rule(180, none_of=_REGULATED)], lambda days: days[0]
+)
+
+
+def generate_ai_use_policy(req: PolicyRequest) -> PolicyResponse:
+    profile = req.profile
+    use_case = req.use_case
+
+    # Deduplicated in the request's order: a set would order them by string hash, which
+    # differs between processes, and so would the body and its ETag
+    data = dict.fromkeys(use_case.data_types)
+    channels = dict.fromkeys(use_case.channels)
+    users = dict.fromkeys(use_case.users)
 
-    review_days = 90 if profile.regulated else 180
+    policy_title = f"AI Use Policy — {profile.org_name} — {use_case.name}"
 
+    purpose = (
+        f"This policy defines how {profile.org_name} will use AI for '{use_case.name}' "
+        f"to support staff while protecting confidentiality, privacy, and regulatory obligations."
+    )
+
+    scope = [
+        f"Applies to: {', '.join(users) if users else 'staff'}",
+        f"Channels: {', '.join(channels) if channels else 'unspecified'}",
+        f"Data types: {', '.join(data) if data else 'unspecified'}",
+    ]
+
+    mask = feature_mask(profile, use_case, req.risk_appetite)
     sections = [
-        PolicySection(title="Allowed Use", bullets=allowed),
-        PolicySection(title="Prohibited Use", bullets=prohibited),
-        PolicySection(title="Data Handling", bullets=data_handling),
-        PolicySection(title="Human Oversight", bullets=oversight),
-        PolicySection(title="Incident Handling", bullets=incident),
-        PolicySection(
-            title="Governance",
-            bullets=[
-                "Maintain an audit trail for usage and changes.",
-                "Review and update the policy on schedule or after incidents.",
-                "Ensure training and onboarding includes this policy.",
-            ],
-        ),
+        PolicySection(title=title, bullets=list(bullets))
+        for title, bullets in _SECTIONS.lookup(mask)
     ]
+    review_days = _REVIEW_DAYS.lookup(mask)
 
     return PolicyResponse(
         policy_title=policy_title,
@@ -0,0 +1,115 @@
+import hashlib
+import json
+from collections.abc import Callable
+from typing import Any, NamedTuple
+
+from fastapi import Request, Response, status
+from pydantic import BaseModel
+
+from app.core.config import settings
+from app.services.lru_cache import ByteBudgetLRU
+
+_ENTRY_BYTES = 512  # key, OrderedDict slot, entry tuple, audit details
+
+
+class CachedResponse(NamedTuple):
+    """A generated artefact as sent: JSON body, its ETag and the audit details describing it."""
+
+    body: bytes
+    etag: str
+    details: dict[str, Any]
+
+    @classmethod
+    def from_result(cls, result: BaseModel, details: dict[str, Any]) -> "CachedResponse":
+        body = result.model_dump_json().encode("utf-8")
+        return cls(body, f'"{hashlib.sha256(body).hexdigest()[:32]}"', details)
+
+    def audit_details(self, hit: bool, artefact_id: str | None = None) -> dict[str, Any]:
+        details = self.details
+        if artefact_id is not None:
+            details = {**details, "artefact_id": artefact_id}
+        # Served without regenerating: say so in the audit trail
+        return {**details, "response_cache": "hit"} if hit else details
+
+    def response(self, request: Request, artefact_id: str | None = None) -> Response:
+        """
+        The body, or 304 Not Modified when the client's If-None-Match already names it;
+        with the id of the stored artefact (see artefact_store) in X-Artefact-Id.
+        """
+        headers = {"ETag": self.etag}
+        if artefact_id is not None:
+            headers["X-Artefact-Id"] = artefact_id
+        if etag_matches(request.headers.get("if-none-match"), self.etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        return Response(content=self.body, media_type="application/json", headers=headers)
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    # Weak comparison (RFC 9110 13.1.2): W/"x" matches "x"
+    tags = (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+    return any(tag in ("*", etag) for tag in tags)
+
+
+class ResponseCache(ByteBudgetLRU[CachedResponse]):
+    """
+    LRU cache of serialised deliverable responses keyed by sha256(path + canonical request
+    body), so a repeated request skips generation, response model validation and JSON
+    encoding. Generation is deterministic, so entries never go stale within a process.
+
+    Only the lookup is cached: routes still guardrail-scan every request and write its
+    audit event (from the stored details) before answering. Bounded by entry count and
+    approximate memory.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int, enabled: bool = True):
+        super().__init__(max_entries, max_bytes)
+        self.enabled = enabled
+
+    @staticmethod
+    def key(path: str, payload: BaseModel) -> bytes:
+        # Validated model, not raw bytes: key order, whitespace and defaults don't matter
+        canonical = json.dumps(
+            payload.model_dump(mode="json"),
+            sort_keys=True,
+            separators=(",", ":"),
+            ensure_ascii=False,
+        )
+        h = hashlib.sha256(path.encode("utf-8"))
+        h.update(b"\0")
+        h.update(canonical.encode("utf-8", "surrogatepass"))
+        return h.digest()
+
+    def fetch(
+        self,
+        path: str,
+        payload: BaseModel,
+        generate: Callable[[], tuple[BaseModel, dict[str, Any]]],
+    ) -> tuple[CachedResponse, bool]:
+        """
+        The response for `payload` and whether it came from the cache. `generate` returns
+        the artefact and its audit details; it runs on a miss (or always, when disabled).
+        """
+        if not self.enabled:
+            return CachedResponse.from_result(*generate()), False
+        key = self.key(path, payload)
+        cached = self.get(key)
+        if cached is not None:
+            return cached, True
+        cached = CachedResponse.from_result(*generate())
+        self.put(key, cached)
+        return cached, False
+
+    def stats(self) -> dict[str, Any]:
+        return {"enabled": self.enabled, **super().stats()}
+
+    def _size(self, value: CachedResponse) -> int:
+        return _ENTRY_BYTES + len(value.body)
+
+
+response_cache = ResponseCache(
+    max_entries=settings.response_cache_max_entries,
+    max_bytes=settings.response_cache_max_bytes,
+    enabled=settings.response_cache_enabled,
+)
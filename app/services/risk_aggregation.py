@@ -0,0 +1,287 @@
+import heapq
+from collections.abc import Iterable, Sequence
+from threading import Lock
+from typing import NamedTuple, get_args
+
+import numpy as np
+
+from app.core.config import settings
+from app.models.risk_register import (
+    OwnerWorkload,
+    PortfolioRisk,
+    RiskCategory,
+    RiskHeatmap,
+    RiskItem,
+    RiskPortfolioReport,
+)
+
+CATEGORIES: tuple[str, ...] = get_args(RiskCategory)
+_CATEGORY_INDEX = {c: i for i, c in enumerate(CATEGORIES)}
+_SCALE = 5  # likelihood and impact run 1..5
+_MAX_SCORE = _SCALE * _SCALE
+HIGH_RISK_SCORE = 15
+
+
+class RiskPortfolioFullError(RuntimeError):
+    """
+    Adding the registers would take the portfolio past `risk_portfolio_max_registers`, or
+    a new portfolio the process past `risk_portfolio_max_orgs`.
+    """
+
+
+class _Risk(NamedTuple):
+    register_id: str
+    risk_id: str
+    score: int
+    category: int
+    likelihood: int
+    impact: int
+    owner: int
+    item: RiskItem
+
+
+class RiskPortfolio:
+    """
+    Live risk aggregation over many registers, updated register by register.
+
+    Every register's contribution is kept as partial sums: a categories x likelihood x
+    impact count array (the heatmaps) and per-owner arrays of risk counts, registers,
+    score totals and high risks. Adding, replacing or removing registers adds or
+    subtracts their items with one scatter-add per array per update, so a report
+    costs the same for ten registers as for ten thousand. Top risks come from
+    per-score buckets, read from the highest score down until N are found. An owner
+    left without risks is forgotten and their column reused by the next new owner.
+    """
+
+    def __init__(self, max_registers: int | None = None):
+        self.max_registers = max_registers
+        self._lock = Lock()
+        self._registers: dict[str, tuple[_Risk, ...]] = {}
+        self._heat = np.zeros((len(CATEGORIES), _SCALE, _SCALE), dtype=np.int64)
+        self._owner_index: dict[str, int] = {}
+        self._free_owners: list[int] = []  # columns of owners forgotten since
+        # Per owner: risks, registers, total score, high risks
+        self._owners = np.zeros((4, 0), dtype=np.int64)
+        self._by_score: list[dict[tuple[str, int], _Risk]] = [{} for _ in range(_MAX_SCORE + 1)]
+
+    def __len__(self) -> int:
+        return len(self._registers)
+
+    def update(
+        self,
+        registers: Iterable[tuple[str, Sequence[RiskItem]]] = (),
+        remove: Iterable[str] = (),
+    ) -> None:
+        """
+        Adds (or replaces, by id) `registers`, then removes the `remove` ids: an id given
+        in both is removed.
+        """
+        removed = set(remove)
+        registers = [(i, items) for i, items in registers if i not in removed]
+        with self._lock:
+            added_ids = {register_id for register_id, _ in registers}
+            if self.max_registers is not None:
+                after = len((self._registers.keys() | added_ids) - removed)
+                if after > self.max_registers:
+                    raise RiskPortfolioFullError(
+                        f"portfolio would hold {after} registers (max {self.max_registers})"
+                    )
+            added = {
+                register_id: self._risks(register_id, items) for register_id, items in registers
+            }
+            old = [
+                self._registers.pop(register_id)
+                for register_id in [*added, *removed]
+                if register_id in self._registers
+            ]
+            self._apply(old, -1)
+            self._apply(list(added.values()), 1)
+            self._registers.update(added)
+            if old:
+                self._forget_idle_owners()
+
+    def report(self, top_n: int = 10) -> RiskPortfolioReport:
+        with self._lock:
+            heat = self._heat.copy()
+            owners = self._owners.copy()
+            names = list(self._owner_index.items())
+            top = self._top(top_n)
+            registers_count = len(self._registers)
+
+        by_category = heat.reshape(len(CATEGORIES), -1).sum(axis=1).tolist()
+        heatmaps = [
+            RiskHeatmap(
+                category="all", risks_count=int(heat.sum()), counts=heat.sum(axis=0).tolist()
+            )
+        ]
+        heatmaps += [
+            RiskHeatmap(category=category, risks_count=count, counts=counts)  # type: ignore[arg-type]
+            for category, count, counts in zip(CATEGORIES, by_category, heat.tolist(), strict=True)
+        ]
+        workloads = []
+        for owner_role, i in names:
+            risks, registers, total, high = owners[:, i].tolist()
+            if risks:
+                workloads.append(
+                    OwnerWorkload(
+                        owner_role=owner_role,
+                        risks_count=risks,
+                        registers_count=registers,
+                        total_score=total,
+                        high_risks_count=high,
+                    )
+                )
+        # Highest total score first, then most risks, then name
+        workloads.sort(key=lambda w: (-w.total_score, -w.risks_count, w.owner_role))
+        return RiskPortfolioReport(
+            registers_count=registers_count,
+            risks_count=int(heat.sum()),
+            heatmaps=heatmaps,
+            top_risks=[
+                PortfolioRisk(
+                    register_id=r.register_id,
+                    risk_id=r.item.risk_id,
+                    category=r.item.category,
+                    title=r.item.title,
+                    likelihood=r.item.likelihood,
+                    impact=r.item.impact,
+                    risk_score=r.item.risk_score,
+                    owner_role=r.item.owner_role,
+                )
+                for r in top
+            ],
+            owner_workloads=workloads,
+        )
+
+    def _risks(self, register_id: str, items: Sequence[RiskItem]) -> tuple[_Risk, ...]:
+        risks = []
+        for item in items:
+            owner = self._owner_index.get(item.owner_role)
+            if owner is None:
+                owner = self._free_owners.pop() if self._free_owners else self._owner_columns()
+                self._owner_index[item.owner_role] = owner
+            risks.append(
+                _Risk(
+                    register_id,
+                    item.risk_id,
+                    item.risk_score,
+                    _CATEGORY_INDEX[item.category],
+                    item.likelihood,
+                    item.impact,
+                    owner,
+                    item,
+                )
+            )
+        return tuple(risks)
+
+    def _apply(self, registers: list[tuple[_Risk, ...]], sign: int) -> None:
+        risks = [risk for register in registers for risk in register]
+        if not risks:
+            return
+        if self._owners.shape[1] < self._owner_columns():
+            grown = np.zeros((4, self._owner_columns()), dtype=np.int64)
+            grown[:, : self._owners.shape[1]] = self._owners
+            self._owners = grown
+
+        cols = np.array([r[2:7] for r in risks], dtype=np.int64).T
+        scores, categories, likelihood, impact, owners = cols
+        np.add.at(self._heat, (categories, likelihood - 1, impact - 1), sign)
+        np.add.at(self._owners[0], owners, sign)
+        np.add.at(self._owners[2], owners, sign * scores)
+        np.add.at(self._owners[3], owners, sign * (scores >= HIGH_RISK_SCORE))
+        # Registers per owner: each (register, owner) pair once
+        pairs = {(r.register_id, r.owner) for r in risks}
+        np.add.at(self._owners[1], np.array([owner for _, owner in pairs], dtype=np.int64), sign)
+
+        for register in registers:
+            for i, risk in enumerate(register):
+                bucket = self._by_score[risk.score]
+                if sign > 0:
+                    bucket[(risk.register_id, i)] = risk
+                else:
+                    del bucket[(risk.register_id, i)]
+
+    def _owner_columns(self) -> int:
+        return len(self._owner_index) + len(self._free_owners)
+
+    def _forget_idle_owners(self) -> None:
+        # Every count of an owner without risks is zero: the column is ready for reuse
+        idle = [name for name, i in self._owner_index.items() if not self._owners[0, i]]
+        for name in idle:
+            self._free_owners.append(self._owner_index.pop(name))
+
+    def _top(self, n: int) -> list[_Risk]:
+        top: list[_Risk] = []
+        for score in range(_MAX_SCORE, 0, -1):
+            bucket = self._by_score[score]
+            if bucket:
+                # Ties: by register id, then risk id, then position in the register
+                top += [
+                    risk
+                    for _, risk in heapq.nsmallest(
+                        n - len(top),
+                        bucket.items(),
+                        key=lambda e: (e[0][0], e[1].risk_id, e[0][1]),
+                    )
+                ]
+                if len(top) >= n:
+                    break
+        return top
+
+
+def aggregate(
+    registers: Iterable[tuple[str, Sequence[RiskItem]]], top_n: int = 10
+) -> RiskPortfolioReport:
+    """One-off report over `registers` (register id, items), without keeping them."""
+    portfolio = RiskPortfolio()
+    portfolio.update(registers)
+    return portfolio.report(top_n)
+
+
+class RiskPortfolios:
+    """
+    The live portfolio of each organisation (X-Org-Id), held in this process's memory.
+    A portfolio exists only while it holds registers, and at most `max_orgs` do.
+    """
+
+    def __init__(self, max_registers: int | None = None, max_orgs: int | None = None):
+        self.max_registers = max_registers
+        self.max_orgs = max_orgs
+        self._portfolios: dict[str | None, RiskPortfolio] = {}
+        self._lock = Lock()
+
+    def get(self, org_id: str | None) -> RiskPortfolio | None:
+        """The org's portfolio, or None if it holds no registers (never creates one)."""
+        with self._lock:
+            return self._portfolios.get(org_id)
+
+    def update(
+        self,
+        org_id: str | None,
+        registers: Iterable[tuple[str, Sequence[RiskItem]]] = (),
+        remove: Iterable[str] = (),
+    ) -> RiskPortfolio:
+        """
+        `RiskPortfolio.update` on the org's portfolio, created by its first registers and
+        dropped once empty, so read-only or removal-only calls never hold memory.
+        """
+        with self._lock:
+            portfolio = self._portfolios.get(org_id)
+            if portfolio is None:
+                portfolio = RiskPortfolio(self.max_registers)
+            portfolio.update(registers, remove)
+            if not len(portfolio):
+                self._portfolios.pop(org_id, None)
+            elif org_id not in self._portfolios:
+                if self.max_orgs is not None and len(self._portfolios) >= self.max_orgs:
+                    raise RiskPortfolioFullError(
+                        f"{len(self._portfolios)} organisations hold portfolios (max {self.max_orgs})"
+                    )
+                self._portfolios[org_id] = portfolio
+            return portfolio
+
+
+risk_portfolios = RiskPortfolios(
+    max_registers=settings.risk_portfolio_max_registers,
+    max_orgs=settings.risk_portfolio_max_orgs,
+)
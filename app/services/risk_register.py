@@ -1,74 +1,72 @@
+from typing import Any
+
 from app.models.risk_register import RiskItem, RiskRegisterRequest, RiskRegisterResponse
+from app.services.decision_table import DecisionTable, Rule, feature_mask, features
 
 
 def _score(likelihood: int, impact: int) -> int:
     return likelihood * impact
 
 
-def build_risk_register(req: RiskRegisterRequest) -> RiskRegisterResponse:
-    profile = req.profile
-    use_case = req.use_case
-
-    data = set(use_case.data_types)
-    channels = set(use_case.channels)
-    users = set(use_case.users)
-
-    title = f"AI Risk Register — {profile.org_name} — {use_case.name}"
-
-    items: list[RiskItem] = []
+_REGULATED = features("regulated")
+_SENSITIVE_DATA = features(
+    "data:personal", "data:financial", "data:health", "data:special_category"
+)
+_SPECIAL_DATA = features("data:health", "data:special_category")
+_THIRD_PARTIES = features("third_parties")
 
+# (risk id, fields): the first row for a risk id adds it to the register, later rows
+# for the same id override some of its fields. Risks are listed in table order.
+_RULES: list[Rule[tuple[str, dict[str, Any]]]] = [
     # Baseline risks (always present)
-    items.append(
-        RiskItem(
-            risk_id="RR-001",
-            category="model_risk",
-            title="Hallucinated or inaccurate outputs",
-            description="AI output may be wrong, outdated, or misleading and could be used without validation.",
-            likelihood=3,
-            impact=3,
-            risk_score=_score(3, 3),
-            controls=[
-                "Human review required before use.",
-                "Use approved prompt templates.",
-                "Add citation/verification step for factual claims.",
-            ],
-            owner_role="Service Owner",
-            review_days=90,
+    Rule(
+        (
+            "RR-001",
+            dict(
+                category="model_risk",
+                title="Hallucinated or inaccurate outputs",
+                description="AI output may be wrong, outdated, or misleading and could be used without validation.",
+                likelihood=3,
+                impact=3,
+                controls=[
+                    "Human review required before use.",
+                    "Use approved prompt templates.",
+                    "Add citation/verification step for factual claims.",
+                ],
+                owner_role="Service Owner",
+                review_days=90,
+            ),
         )
-    )
-
-    items.append(
-        RiskItem(
-            risk_id="RR-002",
-            category="security",
-            title="Prompt injection / malicious inputs",
-            description="Users or external content could manipulate prompts to bypass controls or expose sensitive info.",
-            likelihood=3,
-            impact=4,
-            risk_score=_score(3, 4),
-            controls=[
-                "Input guardrails and redaction checks.",
-                "Do not allow system prompt disclosure.",
-                "Log and monitor abnormal usage patterns.",
-            ],
-            owner_role="Security",
-            review_days=60,
+    ),
+    Rule(
+        (
+            "RR-002",
+            dict(
+                category="security",
+                title="Prompt injection / malicious inputs",
+                description="Users or external content could manipulate prompts to bypass controls or expose sensitive info.",
+                likelihood=3,
+                impact=4,
+                controls=[
+                    "Input guardrails and redaction checks.",
+                    "Do not allow system prompt disclosure.",
+                    "Log and monitor abnormal usage patterns.",
+                ],
+                owner_role="Security",
+                review_days=60,
+            ),
         )
-    )
-
+    ),
     # Data/privacy risks
-    if "personal" in data or "financial" in data or "health" in data or "special_category" in data:
-        impact = 5 if ("health" in data or "special_category" in data) else 4
-        likelihood = 3
-        items.append(
-            RiskItem(
-                risk_id="RR-003",
+    Rule(
+        (
+            "RR-003",
+            dict(
                 category="data_privacy",
                 title="Sensitive data exposure",
                 description="Personal, financial, or special category data may be entered into AI systems or appear in outputs.",
-                likelihood=likelihood,
-                impact=impact,
-                risk_score=_score(likelihood, impact),
+                likelihood=3,
+                impact=4,
                 controls=[
                     "SAFE guardrail checks before model use.",
                     "Redaction placeholders: [REDACTED_*].",
@@ -76,19 +74,22 @@ def build_risk_register(req: RiskRegisterRequest) -> RiskRegisterResponse:
                     "Incident response procedure for accidental disclosure.",
                 ],
                 owner_role="DPO / Privacy",
-                review_days=30 if profile.regulated else 90,
-            )
-        )
-    else:
-        items.append(
-            RiskItem(
-                risk_id="RR-003",
+                review_days=90,
+            ),
+        ),
+        any_of=_SENSITIVE_DATA,
+    ),
+    Rule(("RR-003", dict(impact=5)), any_of=_SPECIAL_DATA),
+    Rule(("RR-003", dict(review_days=30)), all_of=_REGULATED, any_of=_SENSITIVE_DATA),
+    Rule(
+        (
+            "RR-003",
+            dict(
                 category="data_privacy",
                 title="Data classification gaps",
                 description="If data types are not classified, controls may be applied inconsistently.",
                 likelihood=2,
                 impact=3,
-                risk_score=_score(2, 3),
                 controls=[
                     "Define data classification for the use case.",
                     "Document allowed/prohibited data inputs.",
@@ -96,20 +97,20 @@ def build_risk_register(req: RiskRegisterRequest) -> RiskRegisterResponse:
                 ],
                 owner_role="Compliance / Risk",
                 review_days=120,
-            )
-        )
-
+            ),
+        ),
+        none_of=_SENSITIVE_DATA,
+    ),
     # Conduct/customer-facing risk
-    if "customers" in users:
-        items.append(
-            RiskItem(
-                risk_id="RR-004",
+    Rule(
+        (
+            "RR-004",
+            dict(
                 category="conduct",
                 title="Customer harm from incorrect or unsuitable guidance",
                 description="If AI influences customer outcomes, errors could lead to harm, complaints, or regulatory action.",
                 likelihood=3,
                 impact=5,
-                risk_score=_score(3, 5),
                 controls=[
                     "Human oversight for all customer-facing content.",
                     "Approved scripts and escalation routes.",
@@ -118,20 +119,20 @@ def build_risk_register(req: RiskRegisterRequest) -> RiskRegisterResponse:
                 ],
                 owner_role="Compliance / Risk",
                 review_days=30,
-            )
-        )
-
+            ),
+        ),
+        all_of=features("user:customers"),
+    ),
     # Channel risk
-    if "email" in channels:
-        items.append(
-            RiskItem(
-                risk_id="RR-005",
+    Rule(
+        (
+            "RR-005",
+            dict(
                 category="operational",
                 title="Uncontrolled copying of sensitive content into emails",
                 description="Users may paste sensitive info into emails and into AI prompts while drafting communications.",
                 likelihood=3,
                 impact=4,
-                risk_score=_score(3, 4),
                 controls=[
                     "Guardrail checks in email drafting workflow.",
                     "Training: placeholders only.",
@@ -139,20 +140,20 @@ def build_risk_register(req: RiskRegisterRequest) -> RiskRegisterResponse:
                 ],
                 owner_role="Operations",
                 review_days=60,
-            )
-        )
-
+            ),
+        ),
+        all_of=features("channel:email"),
+    ),
     # Third-party risk
-    if use_case.third_parties:
-        items.append(
-            RiskItem(
-                risk_id="RR-006",
+    Rule(
+        (
+            "RR-006",
+            dict(
                 category="third_party",
                 title="Third-party/vendor compliance risk",
                 description="External AI providers may create data residency, contract, and confidentiality risks.",
                 likelihood=3,
-                impact=4 if profile.regulated else 3,
-                risk_score=_score(3, 4 if profile.regulated else 3),
+                impact=4,
                 controls=[
                     "Vendor due diligence and DPIA.",
                     "Contractual clauses for confidentiality and sub-processors.",
@@ -161,7 +162,40 @@ def build_risk_register(req: RiskRegisterRequest) -> RiskRegisterResponse:
                 ],
                 owner_role="Procurement / DPO",
                 review_days=60,
-            )
+            ),
+        ),
+        all_of=_THIRD_PARTIES,
+    ),
+    Rule(("RR-006", dict(impact=3)), all_of=_THIRD_PARTIES, none_of=_REGULATED),
+]
+
+
+def _items(rows: list[tuple[str, dict[str, Any]]]) -> tuple[RiskItem, ...]:
+    risks: dict[str, dict[str, Any]] = {}
+    for risk_id, fields in rows:
+        risks.setdefault(risk_id, {}).update(fields)
+    return tuple(
+        RiskItem(
+            risk_id=risk_id,
+            risk_score=_score(fields["likelihood"], fields["impact"]),
+            **fields,
         )
+        for risk_id, fields in risks.items()
+    )
+
+
+_REGISTERS = DecisionTable(_RULES, _items)
+
+
+def build_risk_register(req: RiskRegisterRequest) -> RiskRegisterResponse:
+    """
+    The register's risks come from a decision table over the use case's features,
+    evaluated for every combination at startup; only the title is built per request.
+    """
+    profile = req.profile
+    use_case = req.use_case
+
+    title = f"AI Risk Register — {profile.org_name} — {use_case.name}"
 
-    return RiskRegisterResponse(register_title=title, items=items)
+    items = _REGISTERS.lookup(feature_mask(profile, use_case))
+    return RiskRegisterResponse(register_title=title, items=list(items))
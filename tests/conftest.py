@@ -0,0 +1,20 @@
+import atexit
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+# Runtime files (audit log, index and so on) go to a scratch directory, not the working
+# tree's logs/. Set before app modules import the settings; removed after everything the
+# app registers at exit has written out (atexit runs handlers last registered first).
+_LOGS_DIR = Path(tempfile.mkdtemp(prefix="safe-governance-tests-"))
+atexit.register(shutil.rmtree, _LOGS_DIR, ignore_errors=True)
+os.environ.update(
+    {
+        "AUDIT_LOG_PATH": str(_LOGS_DIR / "audit.jsonl"),
+        "AUDIT_SEGMENTS_DIR": str(_LOGS_DIR / "audit-segments"),
+        "AUDIT_INDEX_PATH": str(_LOGS_DIR / "audit-index.sqlite3"),
+        "AUDIT_ROLLUPS_DIR": str(_LOGS_DIR / "audit-rollups"),
+        "ARTEFACT_STORE_URL": f"sqlite:///{_LOGS_DIR / 'artefacts.sqlite3'}",
+    }
+)
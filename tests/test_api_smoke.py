@@ -1,6 +1,11 @@
 from fastapi.testclient import TestClient
 
+from app.api.routes import risk_portfolio as risk_portfolio_routes
 from app.main import app
+from app.models.risk_register import RiskItem
+from app.services.audit import get_audit_log
+from app.services.audit_chain import SEAL_EVENT_TYPE
+from app.services.risk_aggregation import RiskPortfolio, RiskPortfolios
 
 client = TestClient(app)
 
@@ -107,3 +112,605 @@ def test_board_brief_smoke():
     r = client.post("/api/v1/board-brief", json=payload)
     assert r.status_code == 200
     assert "decision_asks" in r.json()
+
+
+def _audit_event_lines():
+    # Audit events in the active file, not counting the writer's batch seals
+    if not get_audit_log().stream.active_path.exists():
+        return 0
+    lines = get_audit_log().stream.active_path.read_text(encoding="utf-8").splitlines()
+    return sum(1 for line in lines if f'"event_type": "{SEAL_EVENT_TYPE}"' not in line)
+
+
+def test_governance_pack_smoke():
+    payload = {
+        "profile": {
+            "org_name": "Steve Academy Ltd",
+            "sector": "Training",
+            "org_size": "sme",
+            "geography": "UK",
+            "regulated": True,
+        },
+        "use_case": {
+            "name": "AI policy assistant",
+            "description": "Draft internal policy templates without identifiers.",
+            "data_types": ["internal"],
+            "channels": ["documents"],
+            "users": ["staff"],
+            "third_parties": False,
+        },
+        "risk_appetite": "low",
+        "notes": "test",
+    }
+    get_audit_log().writer.flush()
+    lines_before = _audit_event_lines()
+    r = client.post("/api/v1/governance-pack", json=payload)
+    assert r.status_code == 200
+    data = r.json()
+    assert data["policy"]["status"] == "draft"
+    # The brief is built from the register in the same pack
+    first_risk = data["risk_register"]["items"][0]
+    assert data["board_brief"]["key_risks"][0].startswith(first_risk["risk_id"])
+    # One audit line for the whole pack (no separate guardrail_check line)
+    get_audit_log().writer.flush()
+    assert _audit_event_lines() == lines_before + 1
+
+
+def test_deliverables_follow_decision_tables():
+    from app.models.assessment import AIUseCase, AssessmentRequest, OrganisationProfile
+    from app.services.assessment import run_maturity_assessment
+    from app.services.decision_table import DecisionTable, Rule, feature_mask, features
+
+    profile = OrganisationProfile(org_name="Steve Academy Ltd", sector="Training", regulated=False)
+    use_case = AIUseCase(
+        name="Customer email drafting",
+        description="Draft replies to customer emails with account details.",
+        data_types=["personal", "health"],
+        channels=["email"],
+        users=["customers"],
+        third_parties=True,
+    )
+    assert feature_mask(profile, use_case) == features(
+        "data:personal",
+        "data:health",
+        "channel:email",
+        "user:customers",
+        "third_parties",
+        "size:sme",
+    )
+
+    table = DecisionTable(
+        [Rule("a", all_of=features("regulated")), Rule("b", any_of=features("appetite:low"))], list
+    )
+    assert table.lookup(features("regulated", "appetite:low", "data:public")) == ["a", "b"]
+    assert table.lookup(features("appetite:high")) == []
+
+    payload = {"profile": profile.model_dump(), "use_case": use_case.model_dump()}
+    register = client.post("/api/v1/risk-register", json=payload).json()
+    risks = {item["risk_id"]: item for item in register["items"]}
+    assert list(risks) == ["RR-001", "RR-002", "RR-003", "RR-004", "RR-005", "RR-006"]
+    assert risks["RR-003"]["impact"] == 5 and risks["RR-003"]["review_days"] == 90
+    assert risks["RR-006"]["risk_score"] == 9  # unregulated: vendor impact 3
+
+    policy = client.post("/api/v1/policy", json={**payload, "risk_appetite": "high"}).json()
+    prohibited = next(s for s in policy["sections"] if s["title"] == "Prohibited Use")
+    assert len(prohibited["bullets"]) == 5
+    assert policy["review_cadence_days"] == 180
+
+    # Results are shared between requests: responses get their own lists
+    request = AssessmentRequest(profile=profile, use_case=use_case)
+    first = run_maturity_assessment(request)
+    first.top_gaps.clear()
+    assert run_maturity_assessment(request).top_gaps
+
+
+def test_repeated_deliverable_is_served_from_cache_with_etag():
+    import json
+
+    from app.services.response_cache import response_cache
+
+    payload = {
+        "profile": {"org_name": "Etag Academy Ltd", "sector": "Training", "regulated": False},
+        "use_case": {
+            "name": "Policy refresh",
+            "description": "Regenerate the internal policy from a dashboard.",
+            "data_types": ["internal"],
+        },
+    }
+    hits = response_cache.stats()["hits"]
+    first = client.post("/api/v1/policy", json=payload)
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+
+    # Same validated body (different key order, explicit defaults): same bytes, same ETag
+    reordered = {"risk_appetite": "low", "use_case": payload["use_case"], **payload}
+    second = client.post("/api/v1/policy", json=reordered)
+    assert second.content == first.content and second.headers["etag"] == etag
+    assert response_cache.stats()["hits"] == hits + 1
+
+    get_audit_log().writer.flush()
+    lines_before = _audit_event_lines()
+    not_modified = client.post(
+        "/api/v1/policy", json=payload, headers={"If-None-Match": f'"stale", W/{etag}'}
+    )
+    assert not_modified.status_code == 304 and not_modified.content == b""
+    assert not_modified.headers["etag"] == etag
+
+    # Cache hits are still guardrail-scanned and audited
+    get_audit_log().writer.flush()
+    assert _audit_event_lines() == lines_before + 2  # guardrail_check + policy_created
+    lines = get_audit_log().stream.active_path.read_text(encoding="utf-8").splitlines()
+    created = json.loads(next(line for line in reversed(lines) if "policy_created" in line))
+    assert created["details"]["response_cache"] == "hit"
+
+    blocked = client.post(
+        "/api/v1/policy",
+        json={**payload, "notes": "Card 4111 1111 1111 1111"},
+        headers={"If-None-Match": etag},
+    )
+    assert blocked.status_code == 400
+
+
+_DELIVERABLE_HEADERS_SCRIPT = """
+import json, sys
+from fastapi.testclient import TestClient
+from app.main import app
+
+payload = json.loads(sys.argv[1])
+with TestClient(app) as client:
+    responses = {
+        path: client.post(path, json=payload, headers={"X-Org-Id": "seeded"})
+        for path in ("/api/v1/assess", "/api/v1/policy", "/api/v1/risk-register",
+                     "/api/v1/governance-pack")
+    }
+print(json.dumps({p: [r.headers["etag"], r.headers["x-artefact-id"]] for p, r in responses.items()}))
+"""
+
+
+def _deliverable_headers(payload, hash_seed, logs_dir, artefacts_url):
+    """ETag and X-Artefact-Id per deliverable route, from a fresh server process."""
+    import json
+    import os
+    import subprocess
+    import sys
+    from pathlib import Path
+
+    env = {
+        **os.environ,
+        "PYTHONHASHSEED": str(hash_seed),
+        "AUDIT_LOG_PATH": str(logs_dir / "audit.jsonl"),
+        "AUDIT_SEGMENTS_DIR": str(logs_dir / "audit-segments"),
+        "AUDIT_INDEX_PATH": str(logs_dir / "audit-index.sqlite3"),
+        "AUDIT_ROLLUPS_DIR": str(logs_dir / "audit-rollups"),
+        "ARTEFACT_STORE_URL": artefacts_url,
+    }
+    done = subprocess.run(
+        [sys.executable, "-c", _DELIVERABLE_HEADERS_SCRIPT, json.dumps(payload)],
+        cwd=Path(__file__).resolve().parents[1],
+        env=env,
+        capture_output=True,
+        text=True,
+        timeout=120,
+        check=True,
+    )
+    return json.loads(done.stdout.splitlines()[-1])
+
+
+_SEEDED_PAYLOAD = {
+    "profile": {"org_name": "Seed Academy Ltd", "sector": "Training"},
+    "use_case": {
+        "name": "Tutor assistant",
+        "description": "Draft feedback for tutors.",
+        "data_types": ["internal", "personal", "public", "internal"],
+        "channels": ["email", "chat", "documents", "web"],
+        "users": ["staff", "contractors", "customers"],
+    },
+}
+
+
+def test_deliverable_etags_do_not_depend_on_the_process(tmp_path):
+    runs = [
+        _deliverable_headers(
+            _SEEDED_PAYLOAD, seed, tmp_path / str(seed), f"sqlite:///{tmp_path / 'a.db'}"
+        )
+        for seed in (1, 2)
+    ]
+    assert runs[0] == runs[1]
+
+
+def test_deliverables_are_stored_once_across_processes(tmp_path):
+    import sqlite3
+
+    database = tmp_path / "artefacts.sqlite3"
+    runs = [
+        _deliverable_headers(_SEEDED_PAYLOAD, seed, tmp_path / str(seed), f"sqlite:///{database}")
+        for seed in (1, 2)
+    ]
+    ids = {artefact_id for run in runs for _, artefact_id in run.values()}
+    assert len(ids) == 4
+    conn = sqlite3.connect(database)
+    try:
+        assert conn.execute("SELECT count(*) FROM artefacts").fetchone() == (4,)
+    finally:
+        conn.close()
+
+
+def test_deliverables_are_stored_as_artefacts_listed_by_keyset(monkeypatch):
+    import json
+    import uuid
+
+    from app.core.config import settings
+    from app.services.artefact_store import artefact_store
+
+    assert artefact_store is not None
+    monkeypatch.setattr(settings, "admin_api_key", "test-admin-key")
+    admin = {"X-Admin-Key": "test-admin-key"}
+    org = {"X-Org-Id": f"artefacts-{uuid.uuid4().hex[:8]}"}
+    reader = {**org, **admin}
+    payload = {
+        "profile": {"org_name": "Archive Academy Ltd", "sector": "Training"},
+        "use_case": {
+            "name": "Course summaries",
+            "description": "Summarise course material for tutors.",
+            "data_types": ["internal"],
+        },
+    }
+    policy = client.post("/api/v1/policy", json=payload, headers=org)
+    assert policy.status_code == 200
+    policy_id = policy.headers["x-artefact-id"]
+
+    # Retrievable straight away (before the background writer commits it), as sent
+    stored = client.get(f"/api/v1/artefacts/{policy_id}", headers=reader)
+    assert stored.status_code == 200
+    assert stored.json()["kind"] == "policy"
+    assert stored.json()["artefact"] == policy.json()
+    assert client.get(f"/api/v1/artefacts/{policy_id}", headers=org).status_code == 401
+    assert client.get(f"/api/v1/artefacts/{policy_id}", headers=admin).status_code == 404
+
+    assessment = client.post("/api/v1/assess", json=payload, headers=org)
+    assessment_id = assessment.headers["x-artefact-id"]
+    artefact_store.flush()
+
+    # The same deliverable again (a cache hit, a 304) is the artefact already stored
+    repeat = client.post("/api/v1/policy", json=payload, headers=org)
+    assert repeat.headers["x-artefact-id"] == policy_id
+    revalidated = client.post(
+        "/api/v1/policy", json=payload, headers={**org, "If-None-Match": policy.headers["etag"]}
+    )
+    assert revalidated.status_code == 304
+    assert revalidated.headers["x-artefact-id"] == policy_id
+    artefact_store.flush()
+
+    listing = client.get("/api/v1/artefacts", headers=reader).json()
+    assert [a["id"] for a in listing["artefacts"]] == [assessment_id, policy_id]
+    first = client.get("/api/v1/artefacts", params={"limit": 1}, headers=reader).json()
+    assert [a["id"] for a in first["artefacts"]] == [assessment_id]
+    second = client.get(
+        "/api/v1/artefacts",
+        params={"limit": 1, "cursor": first["next_cursor"]},
+        headers=reader,
+    ).json()
+    assert [a["id"] for a in second["artefacts"]] == [policy_id]
+    assert "next_cursor" not in second
+    bad_cursor = client.get("/api/v1/artefacts", params={"cursor": "nope"}, headers=reader)
+    assert bad_cursor.status_code == 400
+
+    export = client.get("/api/v1/artefacts/export", params={"kind": "assessment"}, headers=reader)
+    records = [json.loads(line) for line in export.text.splitlines()]
+    assert [(r["id"], r["artefact"]) for r in records] == [(assessment_id, assessment.json())]
+
+    get_audit_log().writer.flush()
+    lines = get_audit_log().stream.active_path.read_text(encoding="utf-8").splitlines()
+    created = json.loads(next(line for line in reversed(lines) if "assessment_completed" in line))
+    assert created["details"]["artefact_id"] == assessment_id
+
+
+def test_assess_bulk_streams_ndjson_per_row():
+    import json
+
+    csv_body = (
+        "id,org_name,sector,regulated,name,description,data_types,channels,users,third_parties,notes\n"
+        "UC-1,Steve Academy Ltd,Training,true,Email drafting,Draft replies to learner emails.,"
+        "personal;financial,email,staff;customers,yes,Call 07700 900123\n"
+        "UC-2,Steve Academy Ltd,Training,true,Card lookups,Look up payments by card number.,"
+        "financial,chat,staff,no,Card 4111 1111 1111 1111\n"
+        "UC-3,Steve Academy Ltd,Training,maybe,Bad row,Too short,,,,,\n"
+    )
+    get_audit_log().writer.flush()
+    lines_before = _audit_event_lines()
+    r = client.post("/api/v1/assess/bulk", content=csv_body, headers={"Content-Type": "text/csv"})
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("application/x-ndjson")
+    records = [json.loads(line) for line in r.text.splitlines()]
+    assert [(rec["event"], rec.get("id")) for rec in records] == [
+        ("assessment", "UC-1"),
+        ("blocked", "UC-2"),
+        ("invalid", "UC-3"),
+        ("summary", None),
+    ]
+
+    # Same scores and gaps as one /assess call for the row
+    single = client.post(
+        "/api/v1/assess",
+        json={
+            "profile": {"org_name": "Steve Academy Ltd", "sector": "Training", "regulated": True},
+            "use_case": {
+                "name": "Email drafting",
+                "description": "Draft replies to learner emails.",
+                "data_types": ["personal", "financial"],
+                "channels": ["email"],
+                "users": ["staff", "customers"],
+                "third_parties": True,
+            },
+        },
+    ).json()
+    assert records[0]["maturity_score"] == single["maturity_score"]
+    assert records[0]["maturity_level"] == single["maturity_level"]
+    assert records[0]["top_gaps"] == [
+        {"area": g["area"], "severity": g["severity"]} for g in single["top_gaps"]
+    ]
+    assert records[1]["finding_types"] == ["credit_card"]
+    assert (
+        "4111" not in r.text and "900123" not in r.text and "Too short" not in r.text
+    )  # SAFE: no input echoed
+    assert records[-1]["rows_count"] == 3 and records[-1]["assessed_count"] == 1
+    # Findings of every scanned row, allowed ones included
+    assert records[-1]["finding_totals"] == {"phone": 1, "credit_card": 1}
+
+    # JSONL is detected; one audit event per upload
+    jsonl_body = json.dumps(
+        {
+            "profile": {"org_name": "Acme Ltd", "sector": "Finance"},
+            "use_case": {"name": "Summaries", "description": "Summarise internal policies."},
+        }
+    )
+    r = client.post("/api/v1/assess/bulk", content=jsonl_body + "\n")
+    assert [json.loads(line)["event"] for line in r.text.splitlines()] == ["assessment", "summary"]
+    get_audit_log().writer.flush()
+    # /assess above: guardrail_check + assessment_completed (or response cache hit)
+    assert _audit_event_lines() == lines_before + 4
+
+
+def test_risk_portfolio_heatmaps_top_risks_and_live_updates():
+    use_case = {
+        "profile": {"org_name": "Steve Academy Ltd", "sector": "Training", "regulated": True},
+        "use_case": {
+            "name": "Learner emails",
+            "description": "Draft replies to learner emails.",
+            "data_types": ["personal"],
+            "channels": ["email"],
+            "users": ["customers"],
+        },
+    }
+    register = client.post("/api/v1/risk-register", json=use_case).json()
+    by_id = {item["risk_id"]: item for item in register["items"]}
+
+    r = client.post(
+        "/api/v1/risk-register/aggregate",
+        json={
+            "registers": [
+                {"register_id": "emails", "request": use_case},
+                {"register_id": "copy", "risk_register": register},
+            ],
+            "top_n": 3,
+        },
+    )
+    assert r.status_code == 200
+    report = r.json()
+    assert report["registers_count"] == 2 and report["risks_count"] == 2 * len(by_id)
+    overall = report["heatmaps"][0]
+    assert overall["category"] == "all" and sum(map(sum, overall["counts"])) == 2 * len(by_id)
+    conduct = next(h for h in report["heatmaps"] if h["category"] == "conduct")
+    assert conduct["counts"][by_id["RR-004"]["likelihood"] - 1][by_id["RR-004"]["impact"] - 1] == 2
+    # Highest score first; ties by register id
+    assert [(t["register_id"], t["risk_id"]) for t in report["top_risks"]] == [
+        ("copy", "RR-004"),
+        ("emails", "RR-004"),
+        ("copy", "RR-002"),
+    ]
+    privacy = next(w for w in report["owner_workloads"] if w["owner_role"] == "DPO / Privacy")
+    assert privacy["registers_count"] == 2
+    assert privacy["total_score"] == 2 * by_id["RR-003"]["risk_score"]
+
+    # Live portfolio: replace and remove registers by id, per organisation
+    headers = {"X-Org-Id": "portfolio-test"}
+    entry = {"register_id": "emails", "risk_register": register}
+    r = client.put(
+        "/api/v1/risk-portfolio/registers",
+        json={"registers": [entry, {**entry, "register_id": "other"}]},
+        headers=headers,
+    )
+    assert r.json()["registers_count"] == 2
+    r = client.put(
+        "/api/v1/risk-portfolio/registers",
+        json={"registers": [entry], "remove": ["other"], "top_n": 1},
+        headers=headers,
+    )
+    assert r.json()["risks_count"] == len(by_id)
+    live = client.get("/api/v1/risk-portfolio", headers=headers).json()
+    assert live["heatmaps"] == r.json()["heatmaps"] and live["registers_count"] == 1
+    assert client.get("/api/v1/risk-portfolio").json()["registers_count"] == 0
+    # An id both added and removed ends up removed
+    r = client.put(
+        "/api/v1/risk-portfolio/registers",
+        json={"registers": [entry, {**entry, "register_id": "new"}], "remove": ["emails"]},
+        headers=headers,
+    )
+    assert {t["register_id"] for t in r.json()["top_risks"]} == {"new"}
+    assert r.json()["registers_count"] == 1
+
+    blocked = client.post(
+        "/api/v1/risk-register/aggregate",
+        json={
+            "registers": [
+                {
+                    "register_id": "x",
+                    "request": {**use_case, "notes": "a@b.com 4111 1111 1111 1111"},
+                }
+            ]
+        },
+    )
+    assert blocked.status_code == 400
+    assert blocked.json()["detail"]["blocked"][0]["register_id"] == "x"
+
+    # Owner roles and controls are scanned too; repeated register ids are rejected
+    for field, value in [("owner_role", "AB123456C"), ("controls", ["Card 4111 1111 1111 1111"])]:
+        leaky = {**register, "items": [{**register["items"][0], field: value}]}
+        blocked = client.post(
+            "/api/v1/risk-register/aggregate",
+            json={"registers": [{"register_id": "leaky", "risk_register": leaky}]},
+        )
+        assert blocked.status_code == 400
+    duplicate = client.post(
+        "/api/v1/risk-register/aggregate",
+        json={"registers": [entry, entry]},
+    )
+    assert duplicate.status_code == 422
+    # A given risk_score must match likelihood x impact: it drives top risks and workloads
+    item = register["items"][0]
+    inflated = {**register, "items": [{**item, "risk_score": min(25, item["risk_score"] + 1)}]}
+    r = client.post(
+        "/api/v1/risk-register/aggregate",
+        json={"registers": [{"register_id": "inflated", "risk_register": inflated}]},
+    )
+    assert r.status_code == 422
+
+
+def test_risk_portfolios_exist_only_while_holding_registers(monkeypatch):
+    portfolios = RiskPortfolios(max_orgs=2)
+    monkeypatch.setattr(risk_portfolio_routes, "risk_portfolios", portfolios)
+    register = client.post("/api/v1/risk-register", json=_SEEDED_PAYLOAD).json()
+    entry = {"register_id": "r", "risk_register": register}
+
+    # Reads and removals of unknown orgs hold nothing
+    for i in range(5):
+        assert (
+            client.get("/api/v1/risk-portfolio", headers={"X-Org-Id": f"reader-{i}"}).json()[
+                "registers_count"
+            ]
+            == 0
+        )
+        r = client.put(
+            "/api/v1/risk-portfolio/registers",
+            json={"remove": ["r"]},
+            headers={"X-Org-Id": f"reader-{i}"},
+        )
+        assert r.status_code == 200
+    assert portfolios.get("reader-0") is None
+
+    for org, status_code in [("a", 200), ("b", 200), ("c", 409)]:
+        r = client.put(
+            "/api/v1/risk-portfolio/registers",
+            json={"registers": [entry]},
+            headers={"X-Org-Id": org},
+        )
+        assert r.status_code == status_code
+    # An emptied portfolio frees its slot
+    client.put(
+        "/api/v1/risk-portfolio/registers", json={"remove": ["r"]}, headers={"X-Org-Id": "a"}
+    )
+    r = client.put(
+        "/api/v1/risk-portfolio/registers", json={"registers": [entry]}, headers={"X-Org-Id": "c"}
+    )
+    assert r.status_code == 200 and portfolios.get("a") is None
+
+
+def test_risk_portfolio_forgets_owners_without_risks():
+    item = RiskItem(
+        risk_id="RR-001",
+        category="security",
+        title="Prompt leakage",
+        description="Staff paste internal data.",
+        likelihood=3,
+        impact=4,
+        risk_score=12,
+        controls=["Training"],
+        owner_role="CISO",
+        review_days=90,
+    )
+    portfolio = RiskPortfolio()
+    for n in range(50):
+        owner = f"Owner {n}"
+        portfolio.update([("r", [item.model_copy(update={"owner_role": owner})])])
+    assert len(portfolio._owner_index) == 1 and portfolio._owners.shape[1] <= 2
+    assert [w.owner_role for w in portfolio.report().owner_workloads] == ["Owner 49"]
+    portfolio.update(remove=["r"])
+    assert not portfolio._owner_index and not portfolio.report().owner_workloads
+
+
+def test_artefact_store_fails_unexpected_errors_and_withdraws_timed_out_puts(tmp_path):
+    import sqlite3
+    import threading
+    from datetime import UTC, datetime
+
+    import pytest
+
+    from app.services.artefact_store import (
+        ArtefactStore,
+        ArtefactStoreBusyError,
+        SQLiteArtefactBackend,
+    )
+
+    class FailingBackend(SQLiteArtefactBackend):
+        def insert(self, records):
+            if failures:
+                failures.pop()
+                raise RuntimeError("unexpected")
+            return super().insert(records)
+
+    # Not a storage error: the batch fails at once, the writer carries on
+    failures = [1]
+    store = ArtefactStore(
+        FailingBackend(tmp_path / "failing.sqlite3"),
+        flush_interval=0.01,
+        max_batch=10,
+        max_queue=10,
+        timeout=2,
+    )
+    with pytest.raises(ArtefactStoreBusyError, match="not stored"):
+        store.put("acme", "policy", "Policy", b'{"a": 1}', durable=True)
+    stored = store.put("acme", "policy", "Policy", b'{"b": 2}', durable=True)
+    assert [r.id for r in store.query("acme", 10)[0]] == [stored]
+    assert store.stats()["write_errors"] == 1
+    store.close()
+
+    # A database of another schema version is refused, never dropped
+    path = tmp_path / "artefacts.sqlite3"
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA user_version = 99")
+    conn.close()
+    with pytest.raises(RuntimeError, match="schema version 99"):
+        SQLiteArtefactBackend(path).insert([])
+
+    class SlowBackend(SQLiteArtefactBackend):
+        def insert(self, records):
+            release.wait()
+            return super().insert(records)
+
+    release = threading.Event()
+    store = ArtefactStore(
+        SlowBackend(tmp_path / "slow.sqlite3"),
+        flush_interval=0.01,
+        max_batch=1,
+        max_queue=10,
+        timeout=0.2,
+    )
+    # Taken by the writer before the timeout: accepted, committed later
+    taken = store.put("acme", "policy", "Policy", b'{"a": 1}', durable=True)
+    # Still queued at the timeout: withdrawn, never stored
+    with pytest.raises(ArtefactStoreBusyError, match="in time"):
+        store.put("acme", "assessment", "Assessment", b'{"b": 2}', durable=True)
+    released_at = datetime.now(UTC).isoformat()
+    release.set()
+    store.flush()
+    records = store.query("acme", 10)[0]
+    assert [r.id for r in records] == [taken]
+    assert records[0].created_at >= released_at  # stamped at commit, not when queued
+    # The same body again is the same artefact, recognised without touching the database
+    backend, store.backend = store.backend, None
+    assert store.put("acme", "policy", "Policy", b'{"a": 1}') == taken
+    store.backend = backend
+    # Queued twice anyway (say, from another process): still one row
+    assert store.backend.insert(records) == 0
+    assert store.stats()["artefacts"] == 1
+    store.close()
@@ -0,0 +1,573 @@
+import io
+import json
+import threading
+from datetime import UTC, datetime, timedelta
+from uuid import uuid4
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.main import app
+from app.services import audit, audit_chain
+from app.services import audit_writer as audit_writer_module
+from app.services.audit import get_audit_log, write_audit_event
+from app.services.audit_chain import AuditChain, link, log_targets, unlink, verify_log
+from app.services.audit_codec import MAGIC, convert, iter_records
+from app.services.audit_index import AuditIndex, AuditQuery
+from app.services.audit_rollups import AuditRollups, RollupQuery
+from app.services.audit_segments import AuditSegmentStore, open_segment
+from app.services.audit_streams import claim_stream, list_streams, read_merged
+from app.services.audit_writer import AuditBackpressureError, AuditWriter
+
+client = TestClient(app)
+
+
+def _lines(path):
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+def test_audit_writer_group_commits_in_order(tmp_path):
+    path = tmp_path / "audit.jsonl"
+    writer = AuditWriter(path, flush_interval=0.05, max_batch=64, max_queue=1000, fsync="never")
+
+    def produce(worker):
+        for i in range(50):
+            writer.write(json.dumps({"worker": worker, "i": i}).encode() + b"\n")
+
+    threads = [threading.Thread(target=produce, args=(w,)) for w in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    writer.flush()
+
+    records = _lines(path)
+    assert len(records) == 200
+    for w in range(4):
+        assert [r["i"] for r in records if r["worker"] == w] == list(range(50))
+    stats = writer.stats()
+    assert stats["events"] == 200 and stats["batches"] < 200 and stats["fsyncs"] == 0
+    writer.close()
+
+
+def test_audit_writer_durable_write_is_committed_and_fsynced(tmp_path):
+    path = tmp_path / "audit.jsonl"
+    writer = AuditWriter(path, flush_interval=10.0, max_batch=64, max_queue=100)
+    writer.write(b'{"n": 1}\n')
+    writer.write(b'{"n": 2}\n', durable=True)  # does not wait out the flush interval
+    assert _lines(path) == [{"n": 1}, {"n": 2}]
+    assert writer.stats()["fsyncs"] == 1
+
+    writer.write(b'{"n": 3}\n')
+    writer.close()  # drains the queue
+    assert _lines(path)[-1] == {"n": 3}
+    writer.write(b'{"n": 4}\n', durable=True)  # restarts after close
+    assert len(_lines(path)) == 4
+    writer.close()
+
+
+def test_audit_writer_backpressure(tmp_path):
+    # The log path is a directory: every write fails and the queue fills up
+    writer = AuditWriter(tmp_path, flush_interval=0.01, max_batch=1, max_queue=2, timeout=0.2)
+    with pytest.raises(AuditBackpressureError):
+        for _ in range(10):
+            writer.write(b"{}\n")
+    assert writer.stats()["write_errors"] >= 1
+    writer.close()
+
+
+def test_audit_backpressure_returns_503(tmp_path, monkeypatch):
+    writer = AuditWriter(tmp_path, flush_interval=0.01, max_batch=1, max_queue=1, timeout=0.1)
+    monkeypatch.setattr(audit, "_audit_log", audit.get_audit_log()._replace(writer=writer))
+    with pytest.raises(AuditBackpressureError):
+        for _ in range(5):
+            write_audit_event(
+                "test", path="/", method="GET", client_ip=None, outcome="allow", details={}
+            )
+    r = client.post("/api/v1/guardrail/check", json={"text": "hello"})
+    assert r.status_code == 503
+    assert r.headers["Retry-After"] == "1"
+    writer.close()
+
+
+def _event(i, event_type):
+    timestamp = f"2026-01-01T00:00:{i:02d}.000000+00:00"
+    line = json.dumps({"timestamp_utc": timestamp, "event_type": event_type, "i": i}) + "\n"
+    return line.encode(), timestamp
+
+
+def test_audit_segments_rotate_compress_and_manifest(tmp_path):
+    segments = AuditSegmentStore(tmp_path / "segments", max_bytes=400, max_seconds=3600)
+    path = tmp_path / "audit.jsonl"
+    writer = AuditWriter(path, flush_interval=0.0, max_batch=1, max_queue=100, segments=segments)
+    for i in range(30):
+        data, timestamp = _event(i, "block" if i % 3 == 0 else "allow")
+        writer.write(data, timestamp=timestamp, event_type="block" if i % 3 == 0 else "allow")
+    writer.close()
+    segments.drain()
+
+    manifest = json.loads((tmp_path / "segments" / "manifest.json").read_text())["segments"]
+    assert len(manifest) > 1
+    assert all(s["file"].endswith(".jsonl.gz") and s["bytes"] <= 400 for s in manifest)
+    assert sorted(p.name for p in (tmp_path / "segments").iterdir()) == sorted(
+        [s["file"] for s in manifest] + ["manifest.json"]
+    )
+    seen = []
+    for segment in manifest:
+        with open_segment(tmp_path / "segments" / segment["file"]) as fh:
+            records = [json.loads(line) for line in fh]
+        assert len(records) == segment["events"] == sum(segment["event_types"].values())
+        assert (records[0]["timestamp_utc"], records[-1]["timestamp_utc"]) == (
+            segment["first_ts"],
+            segment["last_ts"],
+        )
+        seen += [r["i"] for r in records]
+    seen += [r["i"] for r in _lines(path)]  # still in the active file
+    assert seen == list(range(30))
+
+
+def test_audit_segments_retention(tmp_path):
+    segments = AuditSegmentStore(tmp_path, max_bytes=100, max_seconds=3600, retention_days=30)
+    path = tmp_path / "audit.jsonl"
+    writer = AuditWriter(path, flush_interval=0.0, max_batch=1, max_queue=100, segments=segments)
+    for i in range(5):
+        data, timestamp = _event(i, "allow")  # months old
+        writer.write(data, timestamp=timestamp, event_type="allow")
+    writer.close()
+    segments.drain()
+    assert segments.manifest.segments() == []
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["audit.jsonl", "manifest.json"]
+
+
+def _indexed_event(i):
+    event_type = "guardrail_check" if i % 2 else "assessment"
+    timestamp = f"2026-01-01T00:{i:02d}:00.000000+00:00"
+    event = {
+        "timestamp_utc": timestamp,
+        "event_type": event_type,
+        "http": {"path": f"/api/v1/{event_type}"},
+        "outcome": "block" if i % 3 == 0 else "allow",
+        "details": {"findings": [{"type": "email"}] if i % 5 == 0 else [], "i": i},
+    }
+    return (json.dumps(event) + "\n").encode(), timestamp, event_type
+
+
+def _write_indexed(tmp_path, index, count):
+    segments = AuditSegmentStore(tmp_path / "segments", max_bytes=1000, max_seconds=3600)
+    segments.index = index
+    writer = AuditWriter(
+        tmp_path / "audit.jsonl",
+        flush_interval=0.0,
+        max_batch=4,
+        max_queue=100,
+        segments=segments,
+        index=index,
+    )
+    for i in range(count):
+        data, timestamp, event_type = _indexed_event(i)
+        writer.write(data, timestamp=timestamp, event_type=event_type)
+    writer.flush()  # starts the writer (and its recovery) even with nothing to write
+    writer.close()
+    segments.drain()
+    return segments
+
+
+def _all_pages(index, query, limit, order="asc"):
+    seen, cursor = [], None
+    while True:
+        lines, cursor = index.query(query, limit, cursor, order)
+        seen += [json.loads(line)["details"]["i"] for line in lines]
+        if cursor is None:
+            return seen
+
+
+def test_audit_index_filters_and_keyset_pages(tmp_path):
+    index = AuditIndex(tmp_path / "index.sqlite3")
+    segments = _write_indexed(tmp_path, index, 40)
+    assert len(segments.manifest.segments()) > 1  # spans closed segments and the active file
+
+    assert _all_pages(index, AuditQuery(), 7) == list(range(40))
+    assert _all_pages(index, AuditQuery(), 7, "desc") == list(range(39, -1, -1))
+    assert _all_pages(index, AuditQuery(outcome="block", event_type="assessment"), 2) == [
+        i for i in range(40) if i % 6 == 0
+    ]
+    assert _all_pages(index, AuditQuery(finding_type="email"), 3) == list(range(0, 40, 5))
+    assert _all_pages(index, AuditQuery(path="/api/v1/guardrail_check"), 50) == list(
+        range(1, 40, 2)
+    )
+    window = AuditQuery(since=datetime(2026, 1, 1, 0, 10), until=datetime(2026, 1, 1, 0, 20))
+    assert _all_pages(index, window, 4) == list(range(10, 20))
+    with pytest.raises(ValueError):
+        index.query(AuditQuery(), 10, cursor="not-a-cursor")
+    index.close()
+
+    # A lost index is rebuilt from the segments and the active file
+    (tmp_path / "index.sqlite3").unlink()
+    rebuilt = AuditIndex(tmp_path / "index.sqlite3")
+    _write_indexed(tmp_path, rebuilt, 0)
+    assert _all_pages(rebuilt, AuditQuery(), 100) == list(range(40))
+    rebuilt.close()
+
+
+def test_audit_events_api_pages_and_exports(monkeypatch):
+    monkeypatch.setattr(settings, "admin_api_key", "test-admin-key")
+    headers = {"X-Admin-Key": "test-admin-key"}
+    path = f"/test/audit-query/{uuid4()}"
+    event_ids = [
+        write_audit_event(
+            "audit_query_test",
+            path=path,
+            method="POST",
+            client_ip=None,
+            outcome="allow",
+            details={"findings": [{"type": "phone"}]},
+        )
+        for _ in range(3)
+    ]
+    get_audit_log().writer.flush()
+
+    assert client.get("/api/v1/audit/events", params={"path": path}).status_code == 401
+    params = {"path": path, "finding_type": "phone", "limit": 2, "order": "asc"}
+    first = client.get("/api/v1/audit/events", params=params, headers=headers).json()
+    assert [e["event_id"] for e in first["events"]] == event_ids[:2]
+    second = client.get(
+        "/api/v1/audit/events", params={**params, "cursor": first["next_cursor"]}, headers=headers
+    ).json()
+    assert [e["event_id"] for e in second["events"]] == event_ids[2:]
+    assert "next_cursor" not in second
+
+    r = client.get("/api/v1/audit/events/export", params={"path": path}, headers=headers)
+    assert r.headers["content-type"].startswith("application/x-ndjson")
+    assert [json.loads(line)["event_id"] for line in r.text.splitlines()] == event_ids
+    r = client.get("/api/v1/audit/events", params={"cursor": "%%%"}, headers=headers)
+    assert r.status_code == 400
+
+    params = {"path": path, "group_by": ["outcome", "finding_type"]}
+    r = client.get("/api/v1/audit/rollups", params=params, headers=headers)
+    assert r.json() == {
+        "group_by": ["outcome", "finding_type"],
+        "finding_counts": True,
+        "rows": [{"outcome": "allow", "finding_type": "phone", "count": 3}],
+    }
+
+
+def test_audit_rollups_count_checkpoint_and_rebuild(tmp_path):
+    segments = AuditSegmentStore(tmp_path / "segments", max_bytes=1000, max_seconds=3600)
+
+    def write(rollups, events):
+        writer = AuditWriter(
+            tmp_path / "audit.jsonl",
+            flush_interval=0.0,
+            max_batch=4,
+            max_queue=100,
+            segments=segments,
+            rollups=rollups,
+            chain=AuditChain(),
+        )
+        for i in events:
+            data, timestamp, event_type = _indexed_event(i)
+            writer.write(data, timestamp=timestamp, event_type=event_type)
+        writer.close()  # saves the checkpoint
+        segments.drain()
+
+    rollups = AuditRollups(tmp_path / "rollups", checkpoint_seconds=3600)
+    write(rollups, range(30))
+    assert rollups.report(RollupQuery(), ["event_type"]) == [
+        {"event_type": "assessment", "count": 15},
+        {"event_type": "guardrail_check", "count": 15},
+    ]
+    blocked = RollupQuery(outcome="block")
+    assert rollups.report(blocked, ["hour", "finding_type"]) == [
+        {"hour": "2026-01-01T00:00:00+00:00", "finding_type": "email", "count": 2}
+    ]
+    assert rollups.report(RollupQuery(until=datetime(2026, 1, 1))) == []
+    assert (tmp_path / "rollups" / "0.json").exists()
+
+    # A restart continues from the checkpoint; without one, the log is replayed
+    write(AuditRollups(tmp_path / "rollups"), [30])
+    (tmp_path / "rollups" / "0.json").unlink()
+    rebuilt = AuditRollups(tmp_path / "rollups")
+    write(rebuilt, [31])
+    assert rebuilt.report(RollupQuery()) == [{"hour": "2026-01-01T00:00:00+00:00", "count": 32}]
+
+
+def test_audit_rollups_drop_expired_hours_and_cap_contexts(tmp_path):
+    def line(age_hours, context):
+        timestamp = datetime.now(UTC) - timedelta(hours=age_hours)
+        event = {
+            "timestamp_utc": timestamp.isoformat(),
+            "event_type": "assessment",
+            "outcome": "allow",
+            "details": {"context": context},
+        }
+        return json.dumps(event).encode(), 0
+
+    rollups = AuditRollups(
+        tmp_path / "rollups", checkpoint_seconds=3600, retention_days=1, max_contexts=2
+    )
+    rollups.add(0, [line(72, "old"), line(2, "hr"), line(2, "legal"), line(1, "sales")])
+    assert rollups.report(RollupQuery(), ["context"]) == [
+        {"context": "hr", "count": 1},
+        {"context": "legal", "count": 1},
+        {"context": "other", "count": 1},
+    ]
+    assert rollups.report(RollupQuery(context="other"), []) == [{"count": 1}]
+    assert [row["count"] for row in rollups.report(RollupQuery())] == [2, 1]
+
+    # Hours past retention leave the counters and the totals as time moves on
+    rollups.retention_days = 1.5 / 24
+    rollups.add(0, [line(0, "hr")])
+    assert rollups.report(RollupQuery(), ["context"]) == [
+        {"context": "hr", "count": 1},
+        {"context": "other", "count": 1},
+    ]
+    rollups.save()
+    assert AuditRollups(tmp_path / "rollups", stream="1").report(RollupQuery(), []) == [
+        {"count": 2}
+    ]
+
+
+def test_audit_chain_seals_batches_and_verifies(tmp_path):
+    segments = AuditSegmentStore(tmp_path / "segments", max_bytes=2000, max_seconds=3600)
+    path = tmp_path / "audit.jsonl"
+    writer = AuditWriter(
+        path,
+        flush_interval=0.0,
+        max_batch=4,
+        max_queue=100,
+        segments=segments,
+        chain=AuditChain(b"k1", "test"),
+    )
+    for i in range(30):
+        data, timestamp, event_type = _indexed_event(i)
+        writer.write(data, timestamp=timestamp, event_type=event_type)
+    writer.close()
+    segments.drain()
+    assert segments.manifest.segments()[0]["chain_head"]
+
+    report = verify_log(log_targets(path, segments.directory), key=b"k1", workers=2)
+    assert report.error is None
+    assert (report.events, report.seals) == (30, writer.stats()["seals"])
+    assert verify_log(log_targets(path, segments.directory), key=b"k2", workers=1).error.endswith(
+        "bad seal signature"
+    )
+
+    # The chain continues across a restart
+    writer.write(_indexed_event(30)[0])
+    writer.close()
+    segments.drain()
+    assert verify_log(log_targets(path, segments.directory), key=b"k1", workers=1).events == 31
+
+
+def test_audit_chain_reports_first_broken_link(tmp_path):
+    path = tmp_path / "audit.jsonl"
+    writer = AuditWriter(path, flush_interval=0.0, max_batch=3, max_queue=100, chain=AuditChain())
+    for i in range(10):
+        writer.write(_indexed_event(i)[0])
+    writer.close()
+    lines = path.read_bytes().splitlines(keepends=True)
+    assert unlink(lines[0])[0] == _indexed_event(0)[0]  # the original line is recoverable
+
+    edited = [*lines]
+    target = next(n for n, line in enumerate(edited) if b'"i": 4}' in line)
+    edited[target] = edited[target].replace(b'"allow"', b'"block"')
+    path.write_bytes(b"".join(edited))
+    report = verify_log(log_targets(path, tmp_path))
+    assert report.error == f"{path}:{target + 1}: chain hash mismatch"
+
+    # Re-chaining after the edit keeps the links valid, but not the batch's seal
+    head = "0" * 64
+    rechained = []
+    for line in edited:
+        line, head = link(head, unlink(line)[0])
+        rechained.append(line)
+    path.write_bytes(b"".join(rechained))
+    report = verify_log(log_targets(path, tmp_path))
+    assert report.error.endswith("Merkle root mismatch")
+
+    with pytest.raises(ValueError):
+        writer.write(b"not json\n")
+
+
+def test_audit_writer_retries_torn_and_unsynced_batches_whole(tmp_path, monkeypatch):
+    path = tmp_path / "audit.jsonl"
+    writer = AuditWriter(path, flush_interval=0.0, max_batch=3, max_queue=100, chain=AuditChain())
+    writer.write(_indexed_event(0)[0], durable=True)
+    monkeypatch.setattr(audit_writer_module, "_RETRY_SECONDS", 0.0)
+    real_write_all, real_fsync = audit_writer_module._write_all, audit_writer_module.os.fsync
+    failures = []
+
+    def torn_write(file, data):
+        if not failures:
+            failures.append("write")
+            file.write(data[: len(data) // 2])
+            raise OSError(28, "No space left on device")
+        real_write_all(file, data)
+
+    def failing_fsync(fd):
+        if len(failures) == 1:
+            failures.append("fsync")
+            raise OSError(5, "Input/output error")
+        real_fsync(fd)
+
+    monkeypatch.setattr(audit_writer_module, "_write_all", torn_write)
+    monkeypatch.setattr(audit_writer_module.os, "fsync", failing_fsync)
+    writer.write(_indexed_event(1)[0], durable=True)  # torn, then written but not synced
+    assert failures == ["write", "fsync"]
+    writer.write(_indexed_event(2)[0], durable=True)
+    writer.close()
+
+    assert writer.stats()["write_errors"] == 2
+    assert [r["details"]["i"] for r in _lines(path) if "details" in r] == [0, 1, 2]
+    assert verify_log(log_targets(path, tmp_path)).error is None
+
+
+def test_audit_writer_survives_unexpected_errors(tmp_path, monkeypatch):
+    path = tmp_path / "audit.jsonl"
+    writer = AuditWriter(path, flush_interval=0.0, max_batch=1, max_queue=100, chain=AuditChain())
+
+    def broken_seal(*args):
+        raise RuntimeError("unexpected")
+
+    monkeypatch.setattr(writer.chain, "seal_batch", broken_seal)
+    with pytest.raises(AuditBackpressureError):
+        writer.write(_indexed_event(0)[0], durable=True)
+    monkeypatch.undo()
+    writer.write(_indexed_event(1)[0], durable=True)  # the writer thread is still running
+    writer.close()
+    assert [r["details"]["i"] for r in _lines(path) if "details" in r] == [1]
+    assert writer.stats()["write_errors"] == 1
+
+
+def test_audit_chain_verifier_does_not_claim_a_stream(tmp_path, monkeypatch, capsys):
+    path = tmp_path / "audit.jsonl"
+    writer = AuditWriter(path, flush_interval=0.0, max_batch=3, max_queue=100, chain=AuditChain())
+    for i in range(5):
+        writer.write(_indexed_event(i)[0])
+    writer.close()
+
+    def claim():
+        raise AssertionError("the verifier opened this process's audit log")
+
+    monkeypatch.setattr(audit, "_audit_log", None)
+    monkeypatch.setattr(audit, "_open_audit_log", claim)
+    assert audit_chain.main([str(path)]) == 0
+    assert json.loads(capsys.readouterr().out)["events"] == 5
+
+
+def test_audit_codec_converts_losslessly(tmp_path):
+    head, lines = "0" * 64, []
+    for i in range(20):
+        line, head = link(head, _indexed_event(i)[0])
+        lines.append(line)
+    lines += [
+        b'{"compact":1}\n',  # not the writer's serialisation: kept verbatim
+        '{"text": "caf\u00e9 \u2713", "n": -3.5e-07, "t": "2026-01-01T00:00:00+00:00"}\n'.encode(),
+        b"not json\n",
+        b'{"torn": ',
+    ]
+    binary, jsonl = io.BytesIO(), io.BytesIO()
+    convert(io.BytesIO(b"".join(lines)), binary, "binary")
+    assert binary.getvalue().startswith(MAGIC)
+    assert len(binary.getvalue()) * 2 < len(b"".join(lines))
+    convert(io.BytesIO(binary.getvalue()), jsonl, "jsonl")
+    assert jsonl.getvalue() == b"".join(lines)
+
+
+def test_audit_binary_log_is_read_as_jsonl(tmp_path):
+    index = AuditIndex(tmp_path / "index.sqlite3")
+    segments = AuditSegmentStore(tmp_path / "segments", max_bytes=600, max_seconds=3600)
+    segments.index = index
+    path = tmp_path / "audit.jsonl"
+
+    def writer():
+        return AuditWriter(
+            path,
+            flush_interval=0.0,
+            max_batch=4,
+            max_queue=100,
+            segments=segments,
+            index=index,
+            chain=AuditChain(b"k1", "test"),
+            file_format="binary",
+        )
+
+    first = writer()
+    for i in range(30):
+        data, timestamp, event_type = _indexed_event(i)
+        first.write(data, timestamp=timestamp, event_type=event_type)
+    first.close()
+    with open(path, "ab") as fh:
+        fh.write(b"\x80")  # a record torn by a crash
+    second = writer()  # resumes the file's string table
+    data, timestamp, event_type = _indexed_event(30)
+    second.write(data, timestamp=timestamp, event_type=event_type)
+    second.close()
+    segments.drain()
+
+    assert path.read_bytes().startswith(MAGIC)
+    report = verify_log(log_targets(path, segments.directory), key=b"k1", workers=1)
+    assert (report.error, report.events) == (None, 31)
+    indexed = [json.loads(line) for line in index.export(AuditQuery())]
+    assert [e["details"]["i"] for e in indexed if "details" in e] == list(range(31))
+    with open(path, "rb") as fh:
+        assert all(unlink(line) for line, _ in iter_records(fh))
+    index.close()
+
+
+def test_audit_worker_streams_merge_in_time_order(tmp_path):
+    base, segments_dir = tmp_path / "audit.jsonl", tmp_path / "segments"
+    streams = [claim_stream(base, segments_dir), claim_stream(base, segments_dir)]
+    assert [s.name for s in streams] == ["0", "1"]  # the first slot's lock is held
+    assert streams[1].active_path.name == "audit.1.jsonl"
+
+    for n, stream in enumerate(streams):
+        segments = AuditSegmentStore(stream.segments_dir, max_bytes=600, max_seconds=3600)
+        writer = AuditWriter(
+            stream.active_path, flush_interval=0.0, max_batch=4, max_queue=100, segments=segments
+        )
+        for i in range(n, 40, 2):  # the two workers' events interleave in time
+            data, timestamp, event_type = _indexed_event(i)
+            writer.write(data, timestamp=timestamp, event_type=event_type)
+        writer.close()
+        segments.drain()
+        assert segments.manifest.segments()
+
+    assert list_streams(base, segments_dir) == streams
+    merged = [json.loads(line)["details"]["i"] for line in read_merged(streams)]
+    assert merged == list(range(40))
+    window = read_merged(streams, datetime(2026, 1, 1, 0, 5), datetime(2026, 1, 1, 0, 9))
+    assert [json.loads(line)["details"]["i"] for line in window] == [5, 6, 7, 8]
+
+
+def test_audit_events_are_stamped_in_file_order():
+    path = f"/test/audit-order/{uuid4()}"
+
+    def produce():
+        for _ in range(25):
+            write_audit_event(
+                "audit_order_test",
+                path=path,
+                method="POST",
+                client_ip=None,
+                outcome="allow",
+                details={},
+            )
+
+    threads = [threading.Thread(target=produce) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    get_audit_log().writer.flush()
+
+    records = _lines(get_audit_log().stream.active_path)
+    events = [e for e in records if e.get("http", {}).get("path") == path]
+    assert len(events) == 100
+    # Batch seals in between keep the file in timestamp order too
+    since_first = [r["timestamp_utc"] for r in records[records.index(events[0]) :]]
+    assert since_first == sorted(since_first)
+    stamps = [(e["timestamp_utc"], e["event_id"]) for e in events]
+    assert stamps == sorted(stamps) and len(set(stamps)) == 100
+    assert all(e["event_id"][14] == "7" for e in events)  # UUIDv7: ids sort by time